@@ -1,16 +1,46 @@
+import threading
+from contextlib import contextmanager, nullcontext
 import mysql.connector
+from mysql.connector import pooling
 from datetime import datetime
 import MetaTrader5 as mt5  # Assuming you're using MetaTrader5 for data fetching
 
+try:
+	import Metrics
+except ImportError:
+	# Outside the advisor (src/ not on the path) the saves are simply not timed
+	Metrics = None
+
 # Database Utility Class
 class MySQLDatabase:
-	def __init__(self, host, user, password, database):
+	def __init__(self, host, user, password, database, pool_size=None, pool_name="advisor"):
+		"""
+		:param pool_size: When set, connections come from a pool of this size so several threads can
+			write at once; otherwise one shared connection is used, serialized by a lock.
+		:param pool_name: Name of the connector pool, unique per process.
+		"""
 		self.host = host
 		self.user = user
 		self.password = password
 		self.database = database
-		self.connection = self.connect()
-		self.cursor = self.connection.cursor()
+		self.pool = None
+		self.connection = None
+		self.cursor = None
+		self.lock = threading.RLock()
+		self.local = threading.local()
+		if pool_size:
+			self.pool = pooling.MySQLConnectionPool(
+				pool_name=pool_name,
+				pool_size=pool_size,
+				pool_reset_session=True,
+				host=self.host,
+				user=self.user,
+				password=self.password,
+				database=self.database
+			)
+		else:
+			self.connection = self.connect()
+			self.cursor = self.connection.cursor()
 
 	def connect(self):
 		return mysql.connector.connect(
@@ -20,13 +50,68 @@ class MySQLDatabase:
 			database=self.database
 		)
 
+	def ensure_connected(self):
+		"""Reconnect the shared connection if the server dropped it (timeout, restart)."""
+		if not self.connection.is_connected():
+			self.connection.reconnect(attempts=3, delay=1)
+			self.cursor = self.connection.cursor()
+
+	@contextmanager
+	def session(self, prepared=False):
+		"""
+		Check out a live connection and cursor for the calling thread.
+
+		Sessions nest: the methods below open one themselves, so wrapping several calls in an outer
+		session keeps them on the same connection. A pooled connection is committed (or rolled back
+		on error) before it goes back to the pool; the shared connection keeps the explicit commit().
+		:param prepared: Also open a prepared statement cursor for insert_rows, only honoured by the outermost session.
+		:return: The cursor to execute on.
+		"""
+		current = getattr(self.local, 'session', None)
+		if current is not None:
+			yield current[1]
+			return
+
+		if self.pool is None:
+			with self.lock:
+				self.ensure_connected()
+				yield from self._use(self.connection, self.cursor, prepared)
+			return
+
+		connection = self.pool.get_connection()
+		try:
+			connection.ping(reconnect=True, attempts=3, delay=1)
+			cursor = connection.cursor()
+			try:
+				yield from self._use(connection, cursor, prepared)
+				connection.commit()
+			except Exception:
+				connection.rollback()
+				raise
+			finally:
+				cursor.close()
+		finally:
+			# Returns the connection to the pool
+			connection.close()
+
+	def _use(self, connection, cursor, prepared):
+		prepared_cursor = connection.cursor(prepared=True) if prepared else None
+		self.local.session = (connection, cursor, prepared_cursor)
+		try:
+			yield cursor
+		finally:
+			self.local.session = None
+			if prepared_cursor is not None:
+				prepared_cursor.close()
+
 	def create_table(self, table_name, schema):
 		create_table_query = f"""
 		CREATE TABLE IF NOT EXISTS {table_name} (
 				{schema}
 		);
 		"""
-		self.cursor.execute(create_table_query)
+		with self.session() as cursor:
+			cursor.execute(create_table_query)
 
 	def insert_row(self, table_name, columns, values):
 		placeholders = ", ".join(["%s"] * len(values))
@@ -35,28 +120,67 @@ class MySQLDatabase:
 		INSERT INTO {table_name} ({columns_string})
 		VALUES ({placeholders})
 		"""
-		self.cursor.execute(insert_query, values)
+		with self.session() as cursor:
+			cursor.execute(insert_query, values)
+
+	def insert_rows(self, table_name, columns, rows, update_columns=None):
+		"""
+		Insert many rows as one multi-row INSERT.
+
+		Inside a prepared session the statement text only depends on the number of rows, so every
+		full chunk of a batch reuses the same server-side prepared statement.
+		:param update_columns: Columns overwritten when a row hits an existing unique key (upsert).
+		"""
+		if not rows:
+			return 0
+		placeholders = "(" + ", ".join(["%s"] * len(columns)) + ")"
+		columns_string = ", ".join(columns)
+		upsert = ""
+		if update_columns:
+			upsert = "ON DUPLICATE KEY UPDATE " + ", ".join(f"{column} = VALUES({column})" for column in update_columns)
+
+		with self.session() as cursor:
+			prepared_cursor = self.local.session[2]
+			if prepared_cursor is not None:
+				insert_query = f"""
+				INSERT INTO {table_name} ({columns_string})
+				VALUES {", ".join([placeholders] * len(rows))}
+				{upsert}"""
+				prepared_cursor.execute(insert_query, [value for row in rows for value in row])
+			else:
+				insert_query = f"""
+				INSERT INTO {table_name} ({columns_string})
+				VALUES {placeholders}
+				{upsert}"""
+				cursor.executemany(insert_query, rows)
+		return len(rows)
 
 	def delete_oldest_rows(self, table_name, max_rows):
-		count_query = f"SELECT COUNT(*) FROM {table_name}"
-		self.cursor.execute(count_query)
-		row_count = self.cursor.fetchone()[0]
-
-		if row_count > max_rows:
-			delete_query = f"""
-			DELETE FROM {table_name} 
-			ORDER BY id ASC 
-			LIMIT {row_count - max_rows}
-			"""
-			self.cursor.execute(delete_query)
-			self.connection.commit()
+		# One statement: everything older than the max_rows-th newest id goes, nothing when the table is smaller
+		delete_query = f"""
+		DELETE FROM {table_name}
+		WHERE id < (
+			SELECT id FROM (
+				SELECT id FROM {table_name} ORDER BY id DESC LIMIT 1 OFFSET {max(max_rows - 1, 0)}
+			) AS newest
+		)
+		"""
+		with self.session() as cursor:
+			cursor.execute(delete_query)
+			self.commit()
 
 	def commit(self):
-		self.connection.commit()
+		current = getattr(self.local, 'session', None)
+		if current is not None:
+			current[0].commit()
+		elif self.connection is not None:
+			with self.lock:
+				self.connection.commit()
 
 	def close(self):
-		self.cursor.close()
-		self.connection.close()
+		if self.connection is not None:
+			self.cursor.close()
+			self.connection.close()
 
 # MetaTrader5 Data Fetcher
 class MetaTrader5Data:
@@ -81,37 +205,55 @@ class MetaTrader5Data:
 		return candles
 
 # Reusable Candle Data Saver
-	def save_candle_data(db, table_name, candles, max_rows=200):
-		# Create the table if it doesn't exist
-		schema = """
-			id INT AUTO_INCREMENT PRIMARY KEY,
-			symbol VARCHAR(10),
-			timestamp DATETIME,
-			open_price FLOAT,
-			high_price FLOAT,
-			low_price FLOAT,
-			close_price FLOAT,
-			volume FLOAT
-		"""
+CANDLE_COLUMNS = ["symbol", "timestamp", "open_price", "high_price", "low_price", "close_price", "volume"]
+
+
+def save_candle_data(db, table_name, candles, symbol, max_rows=200, chunk_size=1000, prepared=True):
+	"""
+	Bulk-save candles, upserting on (symbol, timestamp), then trim the table once.
+
+	:param candles: Candle dicts as returned by MetaTrader5Data.fetch_candles, a "symbol" key overrides `symbol`.
+	:param symbol: Symbol stored with candles that don't carry their own.
+	:param max_rows: Number of newest rows kept in the table.
+	:param chunk_size: Rows sent and committed per INSERT.
+	:param prepared: Send the inserts as server-side prepared statements.
+	"""
+	# Create the table if it doesn't exist
+	schema = """
+		id INT AUTO_INCREMENT PRIMARY KEY,
+		symbol VARCHAR(10),
+		timestamp DATETIME,
+		open_price FLOAT,
+		high_price FLOAT,
+		low_price FLOAT,
+		close_price FLOAT,
+		volume FLOAT,
+		UNIQUE KEY symbol_timestamp (symbol, timestamp)
+	"""
+	rows = [
+		(
+			candle.get("symbol", symbol),
+			candle["timestamp"],
+			# numpy scalars from the rates array are not accepted by the connector's converter
+			float(candle["open_price"]),
+			float(candle["high_price"]),
+			float(candle["low_price"]),
+			float(candle["close_price"]),
+			float(candle["volume"])
+		)
+		for candle in candles
+	]
+	# One connection for the whole batch, the insert statement is prepared once per chunk size
+	timer = Metrics.timer('persistence', symbol) if Metrics is not None else nullcontext({})
+	with timer as record, db.session(prepared=prepared):
+		record['items'] = len(rows)
 		db.create_table(table_name, schema)
+		for start in range(0, len(rows), chunk_size):
+			db.insert_rows(table_name, CANDLE_COLUMNS, rows[start:start + chunk_size], update_columns=CANDLE_COLUMNS[2:])
+			db.commit()
 
-		# Insert candles and maintain row limit
-		for candle in candles:
-			db.insert_row(
-				table_name,
-				["symbol", "timestamp", "open_price", "high_price", "low_price", "close_price", "volume"],
-				[
-					"USDCHF",  # Example symbol, update dynamically if needed
-					candle["timestamp"],
-					candle["open_price"],
-					candle["high_price"],
-					candle["low_price"],
-					candle["close_price"],
-					candle["volume"]
-				]
-			)
-			db.delete_oldest_rows(table_name, max_rows)
-		db.commit()
+		# Retention is enforced once per batch instead of after every row
+		db.delete_oldest_rows(table_name, max_rows)
 
 """# Main Program
 if __name__ == "__main__":
@@ -128,7 +270,7 @@ if __name__ == "__main__":
 			candles = MetaTrader5Data.fetch_candles("USDCHF", mt5.TIMEFRAME_M1, 200)
 
 			# Save candle data to a table
-			save_candle_data(db, "usdchf_candles", candles, max_rows=200)
+			save_candle_data(db, "usdchf_candles", candles, "USDCHF", max_rows=200)
 			print("Candle data successfully saved!")
 	except Exception as e:
 			print(f"Error: {e}")
@@ -1,19 +1,27 @@
-from datetime import datetime
-import matplotlib.pyplot as plt
+from datetime import datetime, timedelta, timezone
+import logging
+import numpy as np
 import pandas as pd
-from pandas.plotting import register_matplotlib_converters
 import MetaTrader5 as mt5
-import MovingAverage as MA
 import TradesAlgo as Algo
+import Pipeline
+import Reporting
+import Metrics
+import SymbolRegistry
+from BarStore import BarStore, as_rates, to_timestamp
 import os
 
 
-register_matplotlib_converters()
+logger = logging.getLogger(__name__)
 
 
 class MetaTrader5Client:
-	def __init__(self, symbols):
+	def __init__(self, symbols, bar_store=None, symbol_registry=None):
 		self.symbols = symbols
+		self.bar_store = bar_store
+		self.symbol_registry = symbol_registry or SymbolRegistry.REGISTRY
+		# Earliest start time already asked for per (symbol, timeframe) by get_rates_cached
+		self.history_start = {}
 		self.Ratesdata = None
 		self.account_info = None
 		self.terminal_info = None
@@ -21,7 +29,7 @@ class MetaTrader5Client:
 
 	def initialize(self):
 		if not mt5.initialize():
-			print("initialize() failed, error code =", mt5.last_error())
+			logger.error("initialize() failed, error code = %s", mt5.last_error())
 			mt5.shutdown()
 			return False
 		'''self.account_info = mt5.account_info()
@@ -29,29 +37,30 @@ class MetaTrader5Client:
 		return True
 
 	def check_symbols_availability(self):
-		available_symbols = [s.name for s in mt5.symbols_get()]
-		for pair in self.symbols:
-			if pair not in available_symbols:
-				print(f"Pair {pair} is not available. Check if it's enabled in Market Watch.")
-				return False
+		# A fresh connection may offer other symbols, reload the list once
+		if not self.symbol_registry.load():
+			return False
+		for pair in self.symbol_registry.missing(self.symbols):
+			logger.error("Pair %s is not available. Check if it's enabled in Market Watch.", pair)
+			return False
 		return True
 
 	def get_ticks_from(self, symbol, start_time, count):
-		ticks = mt5.copy_ticks_from(symbol, start_time, count, mt5.COPY_TICKS_ALL)
+		ticks = Metrics.timed_call('fetch_ticks', symbol, mt5.copy_ticks_from, symbol, start_time, count, mt5.COPY_TICKS_ALL)
 		if ticks is None:
-			print(f"Failed to retrieve {symbol} ticks, error code:", mt5.last_error())
+			logger.error("Failed to retrieve %s ticks, error code: %s", symbol, mt5.last_error())
 		return ticks
 
 	def get_ticks_range(self, symbol, start_time, end_time):
-		ticks = mt5.copy_ticks_range(symbol, start_time, end_time, mt5.COPY_TICKS_ALL)
+		ticks = Metrics.timed_call('fetch_ticks', symbol, mt5.copy_ticks_range, symbol, start_time, end_time, mt5.COPY_TICKS_ALL)
 		if ticks is None:
-			print(f"Failed to retrieve {symbol} ticks, error code:", mt5.last_error())
+			logger.error("Failed to retrieve %s ticks, error code: %s", symbol, mt5.last_error())
 		return ticks
 
 	def get_Price( symbol, price_type):
 		info = mt5.symbol_info_tick(symbol)
 		if price_type is None:
-			print(f'"price_type" missing from {symbol} arguments', mt5.last_error())
+			logger.error('"price_type" missing from %s arguments %s', symbol, mt5.last_error())
    
 		if price_type == "ask":
 			return info.ask
@@ -59,17 +68,73 @@ class MetaTrader5Client:
 			return info.bid
 
 	def get_rates_from(self, symbol, timeframe, start_time, count):
-		rates = mt5.copy_rates_from(symbol, timeframe, start_time, count)
+		rates = Metrics.timed_call('fetch', symbol, mt5.copy_rates_from, symbol, timeframe, start_time, count)
 		if rates is None:
-			print(f"Failed to retrieve {symbol} rates, error code:", mt5.last_error())
+			logger.error("Failed to retrieve %s rates, error code: %s", symbol, mt5.last_error())
+
+		return rates
+
+	def get_rates_from_pos(self, symbol, timeframe, start_pos, count):
+		rates = Metrics.timed_call('fetch', symbol, mt5.copy_rates_from_pos, symbol, timeframe, start_pos, count)
+		if rates is None:
+			logger.error("Failed to retrieve %s rates, error code: %s", symbol, mt5.last_error())
 
 		return rates
 
 	def get_rates_range(self, symbol, timeframe, start_time, end_time):
-		rates = mt5.copy_rates_range(symbol, timeframe, start_time, end_time)
+		rates = Metrics.timed_call('fetch', symbol, mt5.copy_rates_range, symbol, timeframe, start_time, end_time)
 		if rates is None:
-			print(f"Failed to retrieve {symbol} rates range, error code:", mt5.last_error())
+			logger.error("Failed to retrieve %s rates range, error code: %s", symbol, mt5.last_error())
+
+		self.Ratesdata = pd.DataFrame(rates)
+		return rates
 
+	def get_rates_cached(self, symbol, timeframe, start_time, end_time=None):
+		"""
+		Same as get_rates_range but served from the local bar store.
+
+		Only bars from the last stored one onwards are requested from the terminal and appended,
+		so each call after the first costs just the delta. Bars older than the store are asked for
+		once per start time: when the broker has no older history, later calls do not ask again.
+		:param end_time: Last bar time, every bar up to the newest one when None.
+		"""
+		if self.bar_store is None:
+			self.bar_store = BarStore()
+		# Bar times are the broker's server time, ahead of UTC, so look a day ahead for the newest bar
+		until = end_time if end_time is not None else datetime.now(timezone.utc) + timedelta(days=1)
+		key = (symbol, timeframe)
+		start = to_timestamp(start_time)
+
+		first = self.bar_store.first_time(symbol, timeframe)
+		if first is None:
+			rates = Metrics.timed_call('fetch', symbol, mt5.copy_rates_range, symbol, timeframe, start_time, until)
+			if rates is None:
+				logger.error("Failed to retrieve %s rates range, error code: %s", symbol, mt5.last_error())
+			else:
+				self.bar_store.write(symbol, timeframe, rates)
+				self.history_start[key] = start
+		else:
+			if first > start and start < self.history_start.get(key, first):
+				# Back-fill the bars older than the store, the only case that rewrites the file
+				head = Metrics.timed_call('fetch', symbol, mt5.copy_rates_range, symbol, timeframe, start_time,
+						datetime.fromtimestamp(first - 1, tz=timezone.utc))
+				if head is not None:
+					# Whatever came back, the broker has nothing older than that from `start` on
+					self.history_start[key] = start
+				if head is not None and len(head) > 0:
+					merged = np.concatenate([as_rates(head[head['time'] < first]), self.bar_store.read(symbol, timeframe)])
+					self.bar_store.write(symbol, timeframe, merged)
+
+			# Start from the last stored bar, it may have still been forming when it was saved
+			last = self.bar_store.last_time(symbol, timeframe)
+			rates = Metrics.timed_call('fetch', symbol, mt5.copy_rates_range, symbol, timeframe,
+					datetime.fromtimestamp(last, tz=timezone.utc), until)
+			if rates is None:
+				logger.error("Failed to top up %s rates, error code: %s", symbol, mt5.last_error())
+			else:
+				self.bar_store.append(symbol, timeframe, rates)
+
+		rates = self.bar_store.read(symbol, timeframe, start_time, end_time)
 		self.Ratesdata = pd.DataFrame(rates)
 		return rates
 
@@ -95,10 +160,11 @@ class DataPlotter:
 	@staticmethod
 	def plot_ticks(ticks, title):
 		if ticks is None or len(ticks) == 0:
-			print("No data to plot.")
+			logger.warning("No data to plot.")
 			return
 		ticks_frame = pd.DataFrame(ticks)
 		ticks_frame['time'] = pd.to_datetime(ticks_frame['time'], unit='s')
+		plt = Reporting.pyplot()
 		plt.plot(ticks_frame['time'], ticks_frame['ask'], 'r-', label='ask')
 		plt.plot(ticks_frame['time'], ticks_frame['bid'], 'b-', label='bid')
 		plt.legend(loc='upper left')
@@ -108,16 +174,18 @@ class DataPlotter:
 	@staticmethod
 	def plot_rates(rates, title):
 		if rates is None or len(rates) == 0:
-			print("No data to plot.")
+			logger.warning("No data to plot.")
 			return
 		rates_frame = pd.DataFrame(rates)
 		rates_frame['time'] = pd.to_datetime(rates_frame['time'], unit='s')
+		plt = Reporting.pyplot()
 		plt.plot(rates_frame['time'], rates_frame['close'], label='close')
 		plt.title(title)
 		plt.legend()
 		plt.show()
 
 if __name__ == "__main__":
+	logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
 	# Initialize client and symbols
 	symbols = ["USDJPY", "USDCHF", "USDCAD", "USDZAR", "EURUSD"]
 	client = MetaTrader5Client(symbols)
@@ -158,16 +226,16 @@ if __name__ == "__main__":
 		#rates = client.get_rates_from(symbol, client.TF, datetime.now(), 1000)
 		#client.toCSVFile(rangedRates, file_path)
 	# Plot data
-	print("Assembling dataframes......")
-	for symbol in symbols:
-		print(f"Fetching {symbol} rates...")
-		rangedRates = client.get_rates_range(symbol, client.TF, datetime(2024, 8, 1, 00), datetime.now())
-		strategy = MA.MovingAverageCrossover(symbol, data=client.Ratesdata, fast_period=50, slow_period=200)
-		print(client.Ratesdata)
-		strategy.run_moving_average_strategy(symbol, mt5.TIMEFRAME_M15, datetime(2024, 11, 28, 13), 1000)
-
-
-		# if rates is not None:
-		# 	DataPlotter.plot_rates(rates, f"{symbol} Rates")
-		# Shutdown client
+	logger.info("Assembling dataframes......")
+	# Symbols are processed in parallel and headless, the per-symbol results come back as one report
+	pipeline = Pipeline.SymbolPipeline(client, fast_period=50, slow_period=200)
+	report = pipeline.run(symbols, client.TF, datetime(2024, 8, 1, 00), datetime.now(), journal="Logs/signals.db")
+	print(report)
+	# Where each stage's milliseconds went, per symbol
+	Metrics.REGISTRY.write_prometheus("Logs/metrics.prom")
+	Metrics.REGISTRY.write_json("Logs/metrics.json")
+
+	# if rates is not None:
+	# 	DataPlotter.plot_rates(rates, f"{symbol} Rates")
+	# Shutdown client
 	client.shutdown()
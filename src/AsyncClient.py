@@ -0,0 +1,122 @@
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+import MetaTrader5 as mt5
+
+
+logger = logging.getLogger(__name__)
+
+# IPC failures between the Python package and the terminal (RES_E_INTERNAL_FAIL*), worth retrying
+TRANSIENT_ERROR_LIMIT = -10000
+
+
+class AsyncMetaTrader5Client:
+	"""
+	Asyncio facade over MetaTrader5Client.
+
+	The blocking terminal calls run on a dedicated, bounded thread pool, each with a timeout and
+	retries on transient errors reported by mt5.last_error(). Failures come back as None like
+	the synchronous client, so one slow or failing symbol does not hold up a gather().
+	A blocking call cannot be interrupted: when one times out its pool is retired, the call is
+	left to finish there on its own and the next calls run on a fresh pool instead of queueing
+	behind it.
+	"""
+
+	def __init__(self, client, max_concurrency=1, timeout=10.0, retries=2, backoff=0.1):
+		"""
+		:param client: A MetaTrader5Client (already initialized).
+		:param max_concurrency: Terminal calls allowed in flight at once, timed-out ones aside. The
+			terminal answers one request at a time over its IPC channel and last_error() is global to
+			the process, so with more than one another call's error can be read for a failed one:
+			transient and permanent failures are then told apart on a best-effort basis only.
+		:param timeout: Seconds to wait for one call before giving up on it.
+		:param retries: Extra attempts after a transient error or a timeout.
+		:param backoff: Delay before the first retry, doubled for each further one.
+		"""
+		self.client = client
+		self.timeout = timeout
+		self.retries = retries
+		self.backoff = backoff
+		self.max_concurrency = max_concurrency
+		self.executor = self._new_executor()
+		self.semaphore = asyncio.Semaphore(max_concurrency)
+
+	def _new_executor(self):
+		return ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="mt5")
+
+	def _retire(self, executor):
+		"""Stop sending calls to `executor`, whose worker is stuck in a timed-out call."""
+		if executor is self.executor:
+			self.executor = self._new_executor()
+			executor.shutdown(wait=False)
+
+	@staticmethod
+	def _invoke(method, args):
+		# last_error() is process-wide, it belongs to this call only while no other call is in flight
+		result = method(*args)
+		return result, (mt5.last_error() if result is None else None)
+
+	async def call(self, method, *args):
+		"""
+		Run a blocking callable on the terminal executor.
+
+		:param method: Client method or mt5 function returning None on failure.
+		:return: The call's result, or None once the retries are used up or the error is permanent.
+		"""
+		loop = asyncio.get_running_loop()
+		name = getattr(method, '__name__', repr(method))
+		for attempt in range(self.retries + 1):
+			async with self.semaphore:
+				executor = self.executor
+				try:
+					result, error = await asyncio.wait_for(
+						loop.run_in_executor(executor, self._invoke, method, args), self.timeout)
+				except asyncio.TimeoutError:
+					self._retire(executor)
+					logger.warning("%s%s still running after %ss, abandoned on a retired pool.", name, args, self.timeout)
+					result, error = None, (None, f"timed out after {self.timeout}s")
+			if result is not None:
+				return result
+
+			code = error[0]
+			if code is not None and code > TRANSIENT_ERROR_LIMIT:
+				logger.error("%s%s failed, error code: %s", name, args, error)
+				return None
+			if attempt < self.retries:
+				await asyncio.sleep(self.backoff * 2 ** attempt)
+		logger.error("%s%s failed after %d attempts, last error: %s", name, args, self.retries + 1, error)
+		return None
+
+	async def get_rates_from(self, symbol, timeframe, start_time, count):
+		return await self.call(self.client.get_rates_from, symbol, timeframe, start_time, count)
+
+	async def get_rates_from_pos(self, symbol, timeframe, start_pos, count):
+		return await self.call(self.client.get_rates_from_pos, symbol, timeframe, start_pos, count)
+
+	async def get_rates_range(self, symbol, timeframe, start_time, end_time):
+		# Calls mt5 directly: the client method also replaces the shared client.Ratesdata frame
+		return await self.call(mt5.copy_rates_range, symbol, timeframe, start_time, end_time)
+
+	async def get_ticks_from(self, symbol, start_time, count):
+		return await self.call(self.client.get_ticks_from, symbol, start_time, count)
+
+	async def get_ticks_range(self, symbol, start_time, end_time):
+		return await self.call(self.client.get_ticks_range, symbol, start_time, end_time)
+
+	async def symbol_info_tick(self, symbol):
+		return await self.call(mt5.symbol_info_tick, symbol)
+
+	async def gather(self, method_name, symbols, *args):
+		"""
+		Run one of the methods above for many symbols at once.
+
+		:param method_name: e.g. 'get_rates_range'.
+		:param symbols: Symbols, passed as the first argument.
+		:return: dict of symbol to result (None for the ones that failed).
+		"""
+		method = getattr(self, method_name)
+		results = await asyncio.gather(*(method(symbol, *args) for symbol in symbols))
+		return dict(zip(symbols, results))
+
+	def close(self):
+		self.executor.shutdown(wait=False)
@@ -0,0 +1,129 @@
+import os
+from datetime import datetime, timezone
+import numpy as np
+
+
+# Layout of the arrays returned by mt5.copy_rates_*
+RATES_DTYPE = np.dtype([
+	('time', '<i8'),
+	('open', '<f8'),
+	('high', '<f8'),
+	('low', '<f8'),
+	('close', '<f8'),
+	('tick_volume', '<u8'),
+	('spread', '<i4'),
+	('real_volume', '<u8'),
+])
+
+
+def to_timestamp(moment):
+	"""Seconds since the epoch for a datetime (naive values are taken as UTC, like the terminal does) or a number."""
+	if moment is None:
+		return None
+	if isinstance(moment, datetime):
+		if moment.tzinfo is None:
+			moment = moment.replace(tzinfo=timezone.utc)
+		return int(moment.timestamp())
+	return int(moment)
+
+
+def as_rates(rates):
+	"""Copy any rates-like structured array into RATES_DTYPE, matching fields by name."""
+	rates = np.asarray(rates)
+	if rates.dtype == RATES_DTYPE:
+		return rates
+	out = np.zeros(len(rates), dtype=RATES_DTYPE)
+	for name in RATES_DTYPE.names:
+		if rates.dtype.names and name in rates.dtype.names:
+			out[name] = rates[name]
+	return out
+
+
+class BarStore:
+	"""
+	Append-only bar cache on disk, one flat file of RATES_DTYPE records per symbol and timeframe.
+
+	Files are read back through np.memmap, so loading a long history costs no parsing and
+	no copy, and a top-up only writes the new records.
+	"""
+
+	def __init__(self, root="Logs/Bars"):
+		self.root = root
+
+	def path(self, symbol, timeframe):
+		return os.path.join(self.root, f"{symbol}_{timeframe}.bin")
+
+	def count(self, symbol, timeframe):
+		path = self.path(symbol, timeframe)
+		if not os.path.exists(path):
+			return 0
+		return os.path.getsize(path) // RATES_DTYPE.itemsize
+
+	def read(self, symbol, timeframe, start_time=None, end_time=None):
+		"""
+		Map the stored bars without copying them.
+
+		:param start_time: Optional first bar time (datetime or epoch seconds), inclusive.
+		:param end_time: Optional last bar time, inclusive.
+		:return: Read-only RATES_DTYPE array, empty when nothing is stored.
+		"""
+		count = self.count(symbol, timeframe)
+		if count == 0:
+			return np.empty(0, dtype=RATES_DTYPE)
+		bars = np.memmap(self.path(symbol, timeframe), dtype=RATES_DTYPE, mode='r', shape=(count,))
+		lo, hi = 0, count
+		if start_time is not None:
+			lo = np.searchsorted(bars['time'], to_timestamp(start_time), side='left')
+		if end_time is not None:
+			hi = np.searchsorted(bars['time'], to_timestamp(end_time), side='right')
+		return bars[lo:hi]
+
+	def first_time(self, symbol, timeframe):
+		return self._record_time(symbol, timeframe, 0)
+
+	def last_time(self, symbol, timeframe):
+		"""Time of the newest stored bar, read straight from the end of the file, or None."""
+		return self._record_time(symbol, timeframe, self.count(symbol, timeframe) - 1)
+
+	def _record_time(self, symbol, timeframe, index):
+		if index < 0 or self.count(symbol, timeframe) == 0:
+			return None
+		with open(self.path(symbol, timeframe), 'rb') as f:
+			f.seek(index * RATES_DTYPE.itemsize)
+			return int(np.frombuffer(f.read(8), dtype='<i8')[0])
+
+	def write(self, symbol, timeframe, rates):
+		"""Replace everything stored for the symbol and timeframe."""
+		rates = as_rates(rates)
+		os.makedirs(self.root, exist_ok=True)
+		tmp_path = self.path(symbol, timeframe) + '.tmp'
+		with open(tmp_path, 'wb') as f:
+			f.write(rates.tobytes())
+		os.replace(tmp_path, self.path(symbol, timeframe))
+		return len(rates)
+
+	def append(self, symbol, timeframe, rates):
+		"""
+		Add bars newer than the stored ones.
+
+		A bar with the same time as the last stored one replaces it, so a bar fetched while it
+		was still forming gets its final values on the next top-up.
+		:return: Number of records written.
+		"""
+		if rates is None or len(rates) == 0:
+			return 0
+		rates = as_rates(rates)
+		last = self.last_time(symbol, timeframe)
+		if last is None:
+			return self.write(symbol, timeframe, rates)
+
+		rates = rates[rates['time'] >= last]
+		if len(rates) == 0:
+			return 0
+		with open(self.path(symbol, timeframe), 'r+b') as f:
+			if rates['time'][0] == last:
+				f.seek(-RATES_DTYPE.itemsize, os.SEEK_END)
+			else:
+				f.seek(0, os.SEEK_END)
+			f.write(rates.tobytes())
+		return len(rates)
@@ -0,0 +1,242 @@
+"""
+Benchmark harness for the indicator, signal, backtest and order paths.
+
+Runs every scenario over synthetic (or recorded) bars for a set of sizes and symbol counts on the
+FakeMetaTrader5 backend, reports wall time and peak traced memory, and compares them with a stored
+baseline so regressions can fail a CI job:
+
+	python src/Benchmark.py --sizes 10000 1000000 10000000 --symbols 1 5
+	python src/Benchmark.py --save-baseline
+"""
+import argparse
+import contextlib
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+import FakeMetaTrader5
+
+FakeMetaTrader5.install()
+
+import numpy as np
+import pandas as pd
+import MetaTrader5 as mt5
+import MovingAverage as MA
+import TradesAlgo as Trades
+import PositionBook
+
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'target', 'reports', 'benchmark.json')
+RECORDED_SYMBOLS = ["USDJPY", "USDCHF", "USDCAD", "USDZAR", "EURUSD"]
+
+
+def make_rates(symbol, size, recorded=False, seed=0):
+	"""Rates for one symbol, the recorded bars tiled up to `size` or a random walk."""
+	if recorded and symbol in RECORDED_SYMBOLS:
+		base = mt5.copy_rates_range(symbol, mt5.TIMEFRAME_H1, 0, 2 ** 40)
+		reps = -(-size // len(base))
+		rates = np.tile(base, reps)[:size]
+		rates['time'] = base['time'][0] + 3600 * np.arange(size)
+		return rates
+	return FakeMetaTrader5.synthetic_rates(size, mt5.TIMEFRAME_M1, end_time=1_700_000_000, seed=seed)
+
+
+def rates_frame(rates):
+	"""Same conversion run_moving_average_strategy applies before the strategy steps."""
+	frame = pd.DataFrame(rates)
+	frame['time'] = pd.to_datetime(frame['time'], unit='s')
+	frame.set_index('time', inplace=True)
+	return frame
+
+
+def prepared_strategy(symbol, rates, upto):
+	"""A strategy with every step before `upto` already applied, so only the measured step is timed."""
+	strategy = MA.MovingAverageCrossover(symbol, rates_frame(rates))
+	steps = ['calculate_moving_averages', 'generate_signals', 'identify_entry_levels', 'backtest_strategy']
+	for step in steps[:steps.index(upto)]:
+		if step != 'identify_entry_levels':
+			getattr(strategy, step)()
+	return strategy
+
+
+class Scenario:
+	"""One measured call. setup() builds fresh inputs per symbol, run() is the timed part."""
+
+	limit = None
+
+	def __init__(self, name):
+		self.name = name
+
+	def setup(self, symbol, rates):
+		raise NotImplementedError
+
+	def run(self, state):
+		raise NotImplementedError
+
+
+class StrategyStep(Scenario):
+	def setup(self, symbol, rates):
+		return prepared_strategy(symbol, rates, self.name)
+
+	def run(self, strategy):
+		getattr(strategy, self.name)()
+
+
+class ExecuteTrades(Scenario):
+	# One order per signal change, larger frames take minutes per symbol
+	limit = 1_000_000
+
+	def setup(self, symbol, rates):
+		strategy = prepared_strategy(symbol, rates, 'identify_entry_levels')
+		# Every repeat starts flat, with a book loaded from the emptied fake account
+		FakeMetaTrader5.reset_positions()
+		# The fake broker has no rate limit, let the dispatcher send as fast as it can
+		algo = Trades.MT5TradingAlgorithm(strategy.data, symbol, orders_per_second=1e9, burst=1000,
+				book=PositionBook.PositionBook())
+		algo.load_position()
+		return algo
+
+	def run(self, algo):
+		algo.execute_trades(algo.data, wait=True)
+		algo.dispatcher.close()
+
+
+class RunStrategy(Scenario):
+	"""The whole headless run_moving_average_strategy(), in the default or the low-memory mode."""
+
+	def __init__(self, name, low_memory=False):
+		super().__init__(name)
+		self.low_memory = low_memory
+
+	def setup(self, symbol, rates):
+		return MA.MovingAverageCrossover(symbol, rates, low_memory=self.low_memory)
+
+	def run(self, strategy):
+		strategy.run_moving_average_strategy(strategy.symbol, None, None, None, plot=False, save_signals=False)
+
+
+class FusedBacktest(Scenario):
+	"""Signals and backtest straight from the close prices with the fused kernel."""
+
+	def setup(self, symbol, rates):
+		return MA.MovingAverageCrossover(symbol, rates_frame(rates))
+
+	def run(self, strategy):
+		strategy.fused_backtest()
+
+
+SCENARIOS = {
+	'calculate_moving_averages': StrategyStep('calculate_moving_averages'),
+	'generate_signals': StrategyStep('generate_signals'),
+	'identify_entry_levels': StrategyStep('identify_entry_levels'),
+	'backtest_strategy': StrategyStep('backtest_strategy'),
+	'execute_trades': ExecuteTrades('execute_trades'),
+	'run_strategy': RunStrategy('run_strategy'),
+	'run_strategy_low_memory': RunStrategy('run_strategy_low_memory', low_memory=True),
+	'fused_backtest': FusedBacktest('fused_backtest'),
+}
+
+
+def measure(scenario, size, n_symbols, repeat=3, recorded=False):
+	"""
+	Time a scenario over `n_symbols` symbols of `size` bars each.
+
+	Timing runs without tracemalloc, then one extra traced run records the peak memory.
+	:return: dict with the best and median wall time in seconds and the peak traced bytes.
+	"""
+	symbols = [f"SYM{i:03d}" if not recorded else RECORDED_SYMBOLS[i % len(RECORDED_SYMBOLS)] for i in range(n_symbols)]
+	FakeMetaTrader5.configure(symbols=sorted(set(symbols) | set(RECORDED_SYMBOLS)))
+	FakeMetaTrader5.reset_positions()
+	mt5.initialize()
+	inputs = {symbol: make_rates(symbol, size, recorded, seed=i) for i, symbol in enumerate(symbols)}
+
+	def once(traced):
+		states = [scenario.setup(symbol, rates) for symbol, rates in inputs.items()]
+		if traced:
+			tracemalloc.start()
+		start = time.perf_counter()
+		for state in states:
+			scenario.run(state)
+		elapsed = time.perf_counter() - start
+		peak = tracemalloc.get_traced_memory()[1] if traced else 0
+		if traced:
+			tracemalloc.stop()
+		return elapsed, peak
+
+	with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+		timings = [once(False)[0] for _ in range(repeat)]
+		_, peak = once(True)
+	return {'best': min(timings), 'median': statistics.median(timings), 'peak_bytes': peak}
+
+
+def compare(results, baseline, tolerance):
+	"""List the result keys whose time or memory grew by more than `tolerance` over the baseline."""
+	regressions = []
+	for key, result in results.items():
+		if key not in baseline:
+			continue
+		before = baseline[key]
+		for metric in ('best', 'peak_bytes'):
+			if before.get(metric) and result[metric] > before[metric] * (1 + tolerance):
+				regressions.append((key, metric, before[metric], result[metric]))
+	return regressions
+
+
+def main(argv=None):
+	parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+	parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 1_000_000, 10_000_000])
+	parser.add_argument('--symbols', type=int, nargs='+', default=[1])
+	parser.add_argument('--scenarios', nargs='+', choices=sorted(SCENARIOS), default=list(SCENARIOS))
+	parser.add_argument('--repeat', type=int, default=3)
+	parser.add_argument('--recorded', action='store_true', help="tile the recorded Logs/Rates bars instead of random walks")
+	parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+	parser.add_argument('--save-baseline', action='store_true')
+	parser.add_argument('--tolerance', type=float, default=0.25, help="allowed slowdown or memory growth, 0.25 = 25%%")
+	args = parser.parse_args(argv)
+
+	results = {}
+	# backtest_strategy writes Logs/Rates/<symbol>_rates.csv, keep that out of the repository
+	workdir = tempfile.mkdtemp(prefix='advisor-bench-')
+	cwd = os.getcwd()
+	os.chdir(workdir)
+	try:
+		for name in args.scenarios:
+			scenario = SCENARIOS[name]
+			for size in args.sizes:
+				for n_symbols in args.symbols:
+					key = f"{name}[bars={size},symbols={n_symbols}]"
+					if scenario.limit is not None and size > scenario.limit:
+						print(f"{key:<60} skipped, above the {scenario.limit} bar limit of this scenario")
+						continue
+					results[key] = measure(scenario, size, n_symbols, args.repeat, args.recorded)
+					r = results[key]
+					print(f"{key:<60} best {r['best'] * 1000:10.2f} ms  median {r['median'] * 1000:10.2f} ms  "
+							f"peak {r['peak_bytes'] / 2 ** 20:9.1f} MiB")
+	finally:
+		os.chdir(cwd)
+
+	baseline = {}
+	if os.path.exists(args.baseline):
+		with open(args.baseline) as f:
+			baseline = json.load(f)
+
+	if args.save_baseline:
+		os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+		with open(args.baseline, 'w') as f:
+			json.dump({**baseline, **results}, f, indent=2, sort_keys=True)
+		print(f"Baseline saved to {args.baseline}.")
+		return 0
+
+	regressions = compare(results, baseline, args.tolerance)
+	for key, metric, before, after in regressions:
+		print(f"REGRESSION {key} {metric}: {before:.6g} -> {after:.6g} ({after / before - 1:+.0%})")
+	if not baseline:
+		print(f"No baseline at {args.baseline}, run with --save-baseline to record one.")
+	return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+	sys.exit(main())
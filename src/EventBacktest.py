@@ -0,0 +1,172 @@
+import numpy as np
+import pandas as pd
+
+try:
+	from numba import njit
+except ImportError:
+	njit = None
+
+
+def _simulate_loop(open_, close, spread, wanted, start_side, slippage, units, position, equity, fill_price):
+	"""
+	Bar by bar reference engine, compiled with Numba when it is installed.
+
+	The position wanted at the close of bar i-1 is filled at the open of bar i: buys at the ask
+	(open + spread) and sells at the bid (open), both worsened by `slippage`. Open positions are
+	marked at the close price they would be closed at, bid for longs and ask for shorts.
+	"""
+	held = start_side
+	mark_prev = open_[0] + (spread[0] if start_side < 0 else 0.0)
+	cumulative = 0.0
+	trades = 0
+	for i in range(len(close)):
+		target = held
+		if i > 0 and wanted[i - 1] != 0:
+			target = wanted[i - 1]
+		pnl = 0.0
+		reference = mark_prev
+		if target != held:
+			if held > 0:
+				pnl += held * ((open_[i] - slippage) - mark_prev)
+			elif held < 0:
+				pnl += held * ((open_[i] + spread[i] + slippage) - mark_prev)
+			reference = open_[i] + spread[i] + slippage if target > 0 else open_[i] - slippage
+			fill_price[i] = reference
+			held = target
+			trades += 1
+		mark = close[i] + (spread[i] if held < 0 else 0.0)
+		pnl += held * (mark - reference)
+		cumulative += pnl * units
+		equity[i] = cumulative
+		position[i] = held
+		mark_prev = mark
+	return trades
+
+
+_simulate_compiled = njit(cache=True, nogil=True)(_simulate_loop) if njit is not None else None
+
+
+def _simulate_vectorized(open_, close, spread, wanted, start_side, slippage, units, position, equity, fill_price):
+	"""The same simulation as _simulate_loop, as a handful of whole-array NumPy passes."""
+	n = len(close)
+	# Signal known at the close of bar i-1, acted on at the open of bar i
+	decided = np.empty(n, dtype=np.int8)
+	decided[0] = 0
+	decided[1:] = wanted[:-1]
+	# A zero signal keeps the position: carry the last non-zero decision forward
+	last = np.where(decided != 0, np.arange(n), -1)
+	np.maximum.accumulate(last, out=last)
+	held = np.where(last >= 0, decided[np.maximum(last, 0)], start_side).astype(np.int8)
+	previous = np.empty(n, dtype=np.int8)
+	previous[0] = start_side
+	previous[1:] = held[:-1]
+	traded = held != previous
+
+	mark = close + np.where(held < 0, spread, 0.0)
+	mark_prev = np.empty(n, dtype=np.float64)
+	mark_prev[0] = open_[0] + (spread[0] if start_side < 0 else 0.0)
+	mark_prev[1:] = mark[:-1]
+	entry = np.where(held > 0, open_ + spread + slippage, open_ - slippage)
+	exit_ = np.where(previous > 0, open_ - slippage, open_ + spread + slippage)
+	reference = np.where(traded, entry, mark_prev)
+	pnl = held * (mark - reference) + np.where(traded & (previous != 0), previous * (exit_ - mark_prev), 0.0)
+
+	np.cumsum(pnl * units, out=equity)
+	position[:] = held
+	fill_price[traded] = entry[traded]
+	return int(np.count_nonzero(traded))
+
+
+ENGINES = {'python': _simulate_loop, 'numpy': _simulate_vectorized}
+if _simulate_compiled is not None:
+	ENGINES['numba'] = _simulate_compiled
+
+
+class EventBacktester:
+	"""
+	Event-driven backtest of a Signal column with bid/ask fills, per-bar spread and slippage.
+
+	Orders are placed on the bars execute_trades acts on (see signal_transitions): a positive signal
+	wants to be long, a negative one short, zero keeps what is held, and a change of side reverses
+	the whole position at the next bar's open. That is a stop-and-reverse of 2 * lot_size, where
+	the live algorithm sends one lot_size order, which on a netting account only takes a long or
+	short position to flat. Prices are the terminal's bid bars.
+	"""
+
+	def __init__(self, point, lot_size=0.1, contract_size=100_000.0, slippage=0.0, engine='auto'):
+		"""
+		:param point: Symbol point size, the unit of the `spread` column.
+		:param lot_size: Lots traded per order, as in MT5TradingAlgorithm.
+		:param contract_size: Units per lot (symbol_info().trade_contract_size).
+		:param slippage: Points lost on every fill on top of the spread.
+		:param engine: 'numba', 'numpy', 'python' (the uncompiled loop) or 'auto' for Numba when installed, else NumPy.
+		"""
+		if engine == 'auto':
+			engine = 'numba' if 'numba' in ENGINES else 'numpy'
+		if engine not in ENGINES:
+			raise ValueError(f"Unknown or unavailable engine '{engine}', choose from {sorted(ENGINES)}.")
+		self.point = point
+		self.lot_size = lot_size
+		self.contract_size = contract_size
+		self.slippage = slippage
+		self.engine = engine
+
+	def run(self, open_, close, spread, signal, current_side=0):
+		"""
+		Simulate over arrays.
+
+		:param open_: Bid open prices.
+		:param close: Bid close prices.
+		:param spread: Spread of each bar in points, or one number for all bars.
+		:param signal: Strategy signal per bar, decided at that bar's close.
+		:param current_side: Position held before the first bar, 1, -1 or 0.
+		:return: dict with per-bar `position`, `equity` (profit in the quote currency) and
+			`fill_price` (NaN where nothing traded) arrays, and the number of `trades`.
+		"""
+		close = np.ascontiguousarray(close, dtype=np.float64)
+		n = len(close)
+		open_ = np.ascontiguousarray(open_, dtype=np.float64)
+		spread = np.ascontiguousarray(np.broadcast_to(np.asarray(spread, dtype=np.float64) * self.point, (n,)))
+		signal = np.asarray(signal)
+		wanted = ((signal > 0).astype(np.int8) - (signal < 0).astype(np.int8))
+
+		position = np.zeros(n, dtype=np.int8)
+		equity = np.zeros(n, dtype=np.float64)
+		fill_price = np.full(n, np.nan, dtype=np.float64)
+		trades = 0
+		if n:
+			trades = ENGINES[self.engine](open_, close, spread, wanted, int(current_side), self.slippage * self.point,
+					self.lot_size * self.contract_size, position, equity, fill_price)
+		return {'position': position, 'equity': equity, 'fill_price': fill_price, 'trades': int(trades)}
+
+	def run_frame(self, data, spread=None, current_side=0):
+		"""
+		Simulate a strategy frame with open, close and Signal columns.
+
+		:param spread: Per-bar spreads aligned with `data`, the frame's own 'spread' column when None.
+		:return: DataFrame on the same index with Position, Fill_Price and Equity columns.
+		"""
+		if spread is None:
+			if 'spread' not in data.columns:
+				raise ValueError("No spread available, pass one or keep the 'spread' column.")
+			spread = data['spread'].to_numpy()
+		result = self.run(data['open'].to_numpy(), data['close'].to_numpy(), spread, data['Signal'].to_numpy(), current_side)
+		return pd.DataFrame({
+			'Position': result['position'],
+			'Fill_Price': result['fill_price'],
+			'Equity': result['equity'],
+		}, index=data.index)
+
+	@staticmethod
+	def summary(equity, fill_price, position):
+		"""Headline figures of a run: final profit, max drawdown, trades and share of bars in the market."""
+		equity = np.asarray(equity)
+		if len(equity) == 0:
+			return {'profit': 0.0, 'max_drawdown': 0.0, 'trades': 0, 'exposure': 0.0}
+		peak = np.maximum.accumulate(np.maximum(equity, 0.0))
+		return {
+			'profit': float(equity[-1]),
+			'max_drawdown': float(np.max(peak - equity)),
+			'trades': int(np.count_nonzero(~np.isnan(fill_price))),
+			'exposure': float(np.count_nonzero(position)) / len(equity),
+		}
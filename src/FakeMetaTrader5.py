@@ -0,0 +1,567 @@
+"""
+Drop-in stand-in for the MetaTrader5 package, for benchmarking and load testing without a terminal.
+
+It replays the recorded Logs/Rates/*_rates.csv files, or a seeded random walk, behind the same
+functions and constants the advisor uses. Call install() before importing Advisor, MovingAverage
+or TradesAlgo so their `import MetaTrader5 as mt5` picks it up:
+
+	import FakeMetaTrader5
+	FakeMetaTrader5.install(latency=0.002)
+	import Advisor
+"""
+import os
+import sys
+import time
+from collections import namedtuple
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from BarStore import RATES_DTYPE, to_timestamp
+from MetaTrader5_helper import timeframe_seconds
+
+
+TIMEFRAME_M1 = 1
+TIMEFRAME_M2 = 2
+TIMEFRAME_M3 = 3
+TIMEFRAME_M4 = 4
+TIMEFRAME_M5 = 5
+TIMEFRAME_M6 = 6
+TIMEFRAME_M10 = 10
+TIMEFRAME_M12 = 12
+TIMEFRAME_M15 = 15
+TIMEFRAME_M20 = 20
+TIMEFRAME_M30 = 30
+TIMEFRAME_H1 = 16385
+TIMEFRAME_H2 = 16386
+TIMEFRAME_H3 = 16387
+TIMEFRAME_H4 = 16388
+TIMEFRAME_H6 = 16390
+TIMEFRAME_H8 = 16392
+TIMEFRAME_H12 = 16396
+TIMEFRAME_D1 = 16408
+TIMEFRAME_W1 = 32769
+TIMEFRAME_MN1 = 49153
+
+COPY_TICKS_ALL = -1
+COPY_TICKS_INFO = 1
+COPY_TICKS_TRADE = 2
+
+ORDER_TYPE_BUY = 0
+ORDER_TYPE_SELL = 1
+TRADE_ACTION_DEAL = 1
+ORDER_TIME_GTC = 0
+ORDER_FILLING_FOK = 0
+ORDER_FILLING_IOC = 1
+ORDER_FILLING_RETURN = 2
+POSITION_TYPE_BUY = 0
+POSITION_TYPE_SELL = 1
+
+TRADE_RETCODE_DONE = 10009
+TRADE_RETCODE_INVALID = 10013
+TRADE_RETCODE_INVALID_VOLUME = 10014
+TRADE_RETCODE_INVALID_PRICE = 10015
+
+RES_S_OK = 1
+RES_E_FAIL = -1
+RES_E_INVALID_PARAMS = -2
+RES_E_NOT_FOUND = -4
+RES_E_INTERNAL_FAIL = -10000
+RES_E_INTERNAL_FAIL_CONNECT = -10004
+RES_E_INTERNAL_FAIL_TIMEOUT = -10005
+
+TICK_DTYPE = np.dtype([
+	('time', '<i8'),
+	('bid', '<f8'),
+	('ask', '<f8'),
+	('last', '<f8'),
+	('volume', '<u8'),
+	('time_msc', '<i8'),
+	('flags', '<u4'),
+	('volume_real', '<f8'),
+])
+
+SymbolInfo = namedtuple('SymbolInfo', [
+	'name', 'description', 'visible', 'select', 'digits', 'point', 'spread',
+	'trade_contract_size', 'trade_tick_size', 'trade_tick_value',
+	'volume_min', 'volume_max', 'volume_step',
+	'currency_base', 'currency_profit', 'currency_margin',
+])
+Tick = namedtuple('Tick', ['time', 'bid', 'ask', 'last', 'volume', 'time_msc', 'flags', 'volume_real'])
+OrderSendResult = namedtuple('OrderSendResult', [
+	'retcode', 'deal', 'order', 'volume', 'price', 'bid', 'ask', 'comment',
+	'request_id', 'retcode_external', 'request',
+])
+TradePosition = namedtuple('TradePosition', [
+	'ticket', 'time', 'time_msc', 'type', 'magic', 'identifier', 'volume',
+	'price_open', 'price_current', 'symbol', 'comment',
+])
+AccountInfo = namedtuple('AccountInfo', ['login', 'server', 'currency', 'balance', 'equity', 'leverage'])
+TerminalInfo = namedtuple('TerminalInfo', ['name', 'path', 'connected', 'trade_allowed'])
+
+DEFAULT_DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Logs', 'Rates')
+
+
+class _State:
+	def __init__(self):
+		self.initialized = False
+		self.error = (RES_S_OK, 'Success')
+		self.data_dir = DEFAULT_DATA_DIR
+		self.synthetic = False
+		self.symbols = None
+		self.history = 5000
+		self.latency = 0.0
+		self.jitter = 0.0
+		self.spread = 10
+		self.ticks_per_bar = 4
+		self.seed = 0
+		self.rng = np.random.default_rng(0)
+		self.now = None
+		self.series = {}
+		self.recordings = {}
+		self.names = None
+		self.positions = {}
+		self.ticket = 0
+
+
+_state = _State()
+
+
+def configure(data_dir=None, synthetic=None, symbols=None, history=None, latency=None, jitter=None,
+		spread=None, ticks_per_bar=None, seed=None, now=None):
+	"""
+	Set up what the fake terminal serves. Unset arguments keep their current value.
+
+	:param data_dir: Directory holding the recorded `<symbol>_rates.csv` files.
+	:param synthetic: Serve seeded random walks for every symbol instead of the recordings.
+	:param symbols: Symbols reported by symbols_get(), defaults to the recorded ones.
+	:param history: Number of bars generated per synthetic series.
+	:param latency: Seconds every call sleeps before answering.
+	:param jitter: Extra random delay of up to this many seconds per call.
+	:param spread: Spread in points used when the data has none.
+	:param ticks_per_bar: Ticks synthesised from each bar by copy_ticks_*.
+	:param seed: Seed of the random walks and the jitter.
+	:param now: Replay clock (datetime or epoch seconds), bars after it are not served yet.
+	"""
+	for name, value in (('data_dir', data_dir), ('synthetic', synthetic), ('symbols', symbols),
+			('history', history), ('latency', latency), ('jitter', jitter), ('spread', spread),
+			('ticks_per_bar', ticks_per_bar), ('seed', seed)):
+		if value is not None:
+			setattr(_state, name, value)
+	if seed is not None:
+		_state.rng = np.random.default_rng(seed)
+	if now is not None:
+		_state.now = to_timestamp(now)
+	_state.series = {}
+	_state.recordings = {}
+	_state.names = None
+
+
+def install(**settings):
+	"""Register this module as `MetaTrader5` so every later `import MetaTrader5` gets the fake."""
+	if settings:
+		configure(**settings)
+	module = sys.modules[__name__]
+	sys.modules['MetaTrader5'] = module
+	return module
+
+
+def set_time(moment):
+	"""Move the replay clock to a datetime or epoch seconds."""
+	_state.now = to_timestamp(moment)
+
+
+def advance(seconds):
+	"""Move the replay clock forward, e.g. by one bar to simulate a candle close."""
+	_state.now = current_time() + int(seconds)
+
+
+def current_time():
+	"""Replay clock in epoch seconds, the wall clock until set_time() or advance() is used."""
+	return _state.now if _state.now is not None else int(time.time())
+
+
+def synthetic_rates(count, timeframe, end_time=None, start_price=1.0, volatility=0.0005, digits=5, spread=10, seed=0):
+	"""
+	Generate a reproducible random-walk rates array in the copy_rates_* layout.
+
+	:param count: Number of bars.
+	:param timeframe: MT5 timeframe constant.
+	:param end_time: Open time of the last bar (datetime or epoch seconds), defaults to now.
+	"""
+	step = timeframe_seconds(timeframe)
+	end = to_timestamp(end_time) if end_time is not None else int(time.time())
+	end -= end % step
+	rng = np.random.default_rng(seed)
+
+	rates = np.zeros(count, dtype=RATES_DTYPE)
+	rates['time'] = end - step * np.arange(count - 1, -1, -1, dtype=np.int64)
+	close = start_price * np.exp(np.cumsum(rng.normal(0.0, volatility, count)))
+	opens = np.empty(count)
+	opens[0] = start_price
+	opens[1:] = close[:-1]
+	wick = np.abs(rng.normal(0.0, volatility / 2, (2, count)))
+	rates['open'] = np.round(opens, digits)
+	rates['close'] = np.round(close, digits)
+	rates['high'] = np.round(np.maximum(opens, close) * (1 + wick[0]), digits)
+	rates['low'] = np.round(np.minimum(opens, close) * (1 - wick[1]), digits)
+	rates['tick_volume'] = rng.integers(50, 500, count)
+	rates['spread'] = spread
+	return rates
+
+
+def _digits(symbol):
+	return 3 if 'JPY' in symbol else 5
+
+
+def _recorded_symbols():
+	if not os.path.isdir(_state.data_dir):
+		return []
+	suffix = '_rates.csv'
+	return sorted(name[:-len(suffix)] for name in os.listdir(_state.data_dir) if name.endswith(suffix))
+
+
+def _load_recording(symbol):
+	if symbol not in _state.recordings:
+		_state.recordings[symbol] = _read_recording(symbol)
+	return _state.recordings[symbol]
+
+
+def _read_recording(symbol):
+	path = os.path.join(_state.data_dir, f"{symbol}_rates.csv")
+	if _state.synthetic or not os.path.exists(path):
+		return None, None
+	frame = pd.read_csv(path)
+	rates = np.zeros(len(frame), dtype=RATES_DTYPE)
+	rates['time'] = pd.to_datetime(frame['time']).to_numpy().astype('datetime64[s]').astype(np.int64)
+	for column in ('open', 'high', 'low', 'close'):
+		rates[column] = frame[column].to_numpy()
+	for column in ('tick_volume', 'spread', 'real_volume'):
+		if column in frame.columns:
+			rates[column] = frame[column].to_numpy()
+	if 'spread' not in frame.columns:
+		rates['spread'] = _state.spread
+	recorded_step = int(np.median(np.diff(rates['time']))) if len(rates) > 1 else 3600
+	return rates, recorded_step
+
+
+def _series(symbol, timeframe):
+	"""Bars of one symbol and timeframe, resampled from the recording when it is finer."""
+	key = (symbol, timeframe)
+	if key in _state.series:
+		return _state.series[key]
+
+	step = timeframe_seconds(timeframe)
+	recorded, recorded_step = _load_recording(symbol)
+	if recorded is not None and step == recorded_step:
+		rates = recorded
+	elif recorded is not None and step > recorded_step and step % recorded_step == 0:
+		rates = _resample(recorded, step)
+	else:
+		start_price = recorded['open'][0] if recorded is not None else 1.0 + (sum(map(ord, symbol)) % 100) / 100
+		end = recorded['time'][-1] if recorded is not None else (_state.now or int(time.time()))
+		rates = synthetic_rates(_state.history, timeframe, end, start_price, digits=_digits(symbol),
+				spread=_state.spread, seed=_state.seed + sum(map(ord, symbol)) + timeframe)
+	_state.series[key] = rates
+	return rates
+
+
+def _resample(rates, step):
+	buckets = rates['time'] - rates['time'] % step
+	starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+	ends = np.r_[starts[1:], len(rates)] - 1
+	out = np.zeros(len(starts), dtype=RATES_DTYPE)
+	out['time'] = buckets[starts]
+	out['open'] = rates['open'][starts]
+	out['close'] = rates['close'][ends]
+	out['high'] = np.maximum.reduceat(rates['high'], starts)
+	out['low'] = np.minimum.reduceat(rates['low'], starts)
+	out['tick_volume'] = np.add.reduceat(rates['tick_volume'], starts)
+	out['spread'] = rates['spread'][ends]
+	out['real_volume'] = np.add.reduceat(rates['real_volume'], starts)
+	return out
+
+
+def _call(*symbols):
+	"""Common prologue of every terminal call: latency injection, connection and symbol checks."""
+	if _state.latency or _state.jitter:
+		time.sleep(_state.latency + (_state.rng.uniform(0, _state.jitter) if _state.jitter else 0.0))
+	if not _state.initialized:
+		_state.error = (RES_E_INTERNAL_FAIL_CONNECT, 'No IPC connection')
+		return False
+	for symbol in symbols:
+		if symbol not in _symbol_set():
+			_state.error = (RES_E_NOT_FOUND, f'Symbol {symbol} not found')
+			return False
+	_state.error = (RES_S_OK, 'Success')
+	return True
+
+
+def _symbol_names():
+	return _state.symbols if _state.symbols is not None else _recorded_symbols()
+
+
+def _symbol_set():
+	if _state.names is None:
+		_state.names = set(_symbol_names())
+	return _state.names
+
+
+def _served(symbol, timeframe):
+	"""Bars that already exist at the replay clock."""
+	rates = _series(symbol, timeframe)
+	if _state.now is None:
+		return rates
+	return rates[:np.searchsorted(rates['time'], _state.now, side='right')]
+
+
+# Terminal connection
+
+def initialize(path=None, **kwargs):
+	_state.initialized = True
+	_state.error = (RES_S_OK, 'Success')
+	return True
+
+
+def shutdown():
+	_state.initialized = False
+	return True
+
+
+def last_error():
+	return _state.error
+
+
+def version():
+	return (500, 4000, '01 Jan 2025')
+
+
+def account_info():
+	if not _call():
+		return None
+	return AccountInfo(0, 'FakeMetaTrader5', 'USD', 10000.0, 10000.0, 100)
+
+
+def terminal_info():
+	if not _call():
+		return None
+	return TerminalInfo('FakeMetaTrader5', os.path.abspath(_state.data_dir), True, True)
+
+
+# Symbols
+
+def symbols_total():
+	return len(_symbol_names()) if _call() else 0
+
+
+def symbols_get(group=None):
+	if not _call():
+		return None
+	return tuple(_symbol_info(name) for name in _symbol_names())
+
+
+def symbol_select(symbol, enable=True):
+	return _call(symbol)
+
+
+def symbol_info(symbol):
+	if not _call(symbol):
+		return None
+	return _symbol_info(symbol)
+
+
+def _symbol_info(symbol):
+	"""symbol_info() without the call prologue, for calls that already went through it."""
+	digits = _digits(symbol)
+	point = 10.0 ** -digits
+	return SymbolInfo(
+		name=symbol, description=symbol, visible=True, select=True, digits=digits, point=point,
+		spread=_state.spread, trade_contract_size=100000.0, trade_tick_size=point, trade_tick_value=1.0,
+		volume_min=0.01, volume_max=100.0, volume_step=0.01,
+		currency_base=symbol[:3], currency_profit=symbol[3:6], currency_margin=symbol[:3],
+	)
+
+
+def symbol_info_tick(symbol):
+	if not _call(symbol):
+		return None
+	return _tick(symbol)
+
+
+def _tick(symbol):
+	"""symbol_info_tick() without the call prologue, for calls that already went through it."""
+	rates = _served(symbol, TIMEFRAME_M1 if _state.synthetic else _base_timeframe(symbol))
+	if len(rates) == 0:
+		_state.error = (RES_E_NOT_FOUND, f'No quotes for {symbol}')
+		return None
+	bar = rates[-1]
+	now = max(int(bar['time']), current_time())
+	bid = float(bar['close'])
+	ask = round(bid + int(bar['spread']) * 10.0 ** -_digits(symbol), _digits(symbol))
+	return Tick(now, bid, ask, 0.0, 0, now * 1000, 6, 0.0)
+
+
+def _base_timeframe(symbol):
+	"""Timeframe of the recording, the finest data there is for ticks and quotes."""
+	_, step = _load_recording(symbol)
+	if step is None or step % 3600:
+		return TIMEFRAME_M1 if step is None else step // 60
+	return 0x4000 | (step // 3600)
+
+
+# Rates
+
+def copy_rates_from(symbol, timeframe, date_from, count):
+	if not _call(symbol):
+		return None
+	rates = _served(symbol, timeframe)
+	end = np.searchsorted(rates['time'], to_timestamp(date_from), side='right')
+	return rates[max(0, end - count):end].copy()
+
+
+def copy_rates_from_pos(symbol, timeframe, start_pos, count):
+	if not _call(symbol):
+		return None
+	rates = _served(symbol, timeframe)
+	end = len(rates) - start_pos
+	if end <= 0:
+		return np.empty(0, dtype=RATES_DTYPE)
+	return rates[max(0, end - count):end].copy()
+
+
+def copy_rates_range(symbol, timeframe, date_from, date_to):
+	if not _call(symbol):
+		return None
+	rates = _served(symbol, timeframe)
+	lo = np.searchsorted(rates['time'], to_timestamp(date_from), side='left')
+	hi = np.searchsorted(rates['time'], to_timestamp(date_to), side='right')
+	return rates[lo:hi].copy()
+
+
+# Ticks
+
+def _ticks(symbol, rates):
+	"""Walk open, low/high, close inside every bar, evenly spaced over the bar."""
+	per_bar = max(2, _state.ticks_per_bar)
+	tf = _base_timeframe(symbol) if not _state.synthetic else TIMEFRAME_M1
+	step_msc = timeframe_seconds(tf) * 1000 // per_bar
+	n = len(rates)
+	prices = np.empty((n, per_bar))
+	prices[:, 0] = rates['open']
+	prices[:, -1] = rates['close']
+	if per_bar > 2:
+		up = rates['close'] >= rates['open']
+		middle = np.linspace(0, 1, per_bar - 2)
+		# Bullish bars dip to the low first, bearish ones reach the high first
+		first = np.where(up, rates['low'], rates['high'])
+		second = np.where(up, rates['high'], rates['low'])
+		prices[:, 1:-1] = first[:, None] + (second - first)[:, None] * middle[None, :]
+
+	ticks = np.zeros(n * per_bar, dtype=TICK_DTYPE)
+	ticks['time_msc'] = (rates['time'][:, None] * 1000 + step_msc * np.arange(per_bar)[None, :]).ravel()
+	ticks['time'] = ticks['time_msc'] // 1000
+	ticks['bid'] = prices.ravel()
+	ticks['ask'] = ticks['bid'] + np.repeat(rates['spread'], per_bar) * 10.0 ** -_digits(symbol)
+	ticks['flags'] = 6
+	return ticks
+
+
+def copy_ticks_from(symbol, date_from, count, flags=COPY_TICKS_ALL):
+	if not _call(symbol):
+		return None
+	rates = _served(symbol, TIMEFRAME_M1 if _state.synthetic else _base_timeframe(symbol))
+	start = to_timestamp(date_from)
+	per_bar = max(2, _state.ticks_per_bar)
+	lo = max(0, np.searchsorted(rates['time'], start, side='right') - 1)
+	ticks = _ticks(symbol, rates[lo:lo + count // per_bar + 2])
+	ticks = ticks[ticks['time'] >= start]
+	if _state.now is not None:
+		ticks = ticks[ticks['time'] <= _state.now]
+	return ticks[:count]
+
+
+def copy_ticks_range(symbol, date_from, date_to, flags=COPY_TICKS_ALL):
+	if not _call(symbol):
+		return None
+	rates = _served(symbol, TIMEFRAME_M1 if _state.synthetic else _base_timeframe(symbol))
+	start, end = to_timestamp(date_from), to_timestamp(date_to)
+	lo = max(0, np.searchsorted(rates['time'], start, side='right') - 1)
+	hi = np.searchsorted(rates['time'], end, side='right')
+	ticks = _ticks(symbol, rates[lo:hi])
+	return ticks[(ticks['time'] >= start) & (ticks['time'] <= end)]
+
+
+# Trading
+
+def positions_total():
+	return len(_state.positions) if _call() else 0
+
+
+def positions_get(symbol=None, group=None, ticket=None):
+	if not _call():
+		return None
+	positions = _state.positions.values()
+	if symbol is not None:
+		positions = [p for p in positions if p.symbol == symbol]
+	if ticket is not None:
+		positions = [p for p in positions if p.ticket == ticket]
+	return tuple(positions)
+
+
+def order_send(request):
+	"""Fill market deals at the current quote, netting them into one position per symbol."""
+	symbol = request.get('symbol')
+	if not _call(symbol):
+		return None
+	# One call, one round trip: the quote and the specification are read without another prologue
+	tick = _tick(symbol)
+	if tick is None:
+		return None
+	info = _symbol_info(symbol)
+	volume = float(request.get('volume', 0.0))
+	order_type = request.get('type')
+
+	def result(retcode, price=0.0, comment=''):
+		_state.ticket += 1
+		return OrderSendResult(retcode, _state.ticket if retcode == TRADE_RETCODE_DONE else 0,
+				_state.ticket, volume, price, tick.bid, tick.ask, comment, _state.ticket, 0, request)
+
+	if request.get('action') != TRADE_ACTION_DEAL or order_type not in (ORDER_TYPE_BUY, ORDER_TYPE_SELL):
+		return result(TRADE_RETCODE_INVALID, comment='Invalid request')
+	steps = volume / info.volume_step
+	if volume < info.volume_min or volume > info.volume_max or abs(steps - round(steps)) > 1e-6:
+		return result(TRADE_RETCODE_INVALID_VOLUME, comment='Invalid volume')
+
+	price = tick.ask if order_type == ORDER_TYPE_BUY else tick.bid
+	signed = volume if order_type == ORDER_TYPE_BUY else -volume
+	held = _state.positions.get(symbol)
+	if held is not None:
+		signed += held.volume if held.type == POSITION_TYPE_BUY else -held.volume
+	signed = round(signed, 8)
+
+	deal = result(TRADE_RETCODE_DONE, price, 'Request executed')
+	if signed == 0:
+		_state.positions.pop(symbol, None)
+	else:
+		same_side = held is not None and (held.type == POSITION_TYPE_BUY) == (signed > 0)
+		_state.positions[symbol] = TradePosition(
+			ticket=held.ticket if same_side else deal.order,
+			time=current_time(), time_msc=current_time() * 1000,
+			type=POSITION_TYPE_BUY if signed > 0 else POSITION_TYPE_SELL,
+			magic=request.get('magic', 0), identifier=held.identifier if same_side else deal.order,
+			volume=abs(signed), price_open=held.price_open if same_side else price,
+			price_current=price, symbol=symbol, comment=request.get('comment', ''),
+		)
+	return deal
+
+
+def reset_positions():
+	_state.positions = {}
+	_state.ticket = 0
+
+
+if __name__ == "__main__":
+	install()
+	initialize()
+	print([s.name for s in symbols_get()])
+	rates = copy_rates_range("EURUSD", TIMEFRAME_H1, datetime(2024, 8, 1), datetime(2025, 1, 1))
+	print(f"Replayed {len(rates)} EURUSD H1 bars, last tick: {symbol_info_tick('EURUSD')}")
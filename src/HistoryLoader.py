@@ -0,0 +1,159 @@
+import json
+import logging
+import os
+import numpy as np
+import pandas as pd
+from BarStore import RATES_DTYPE, to_timestamp
+
+
+logger = logging.getLogger(__name__)
+
+MANIFEST = "manifest.json"
+
+
+class HistoryLoader:
+	"""
+	Columnar cache of the recorded `<symbol>_rates.csv` files.
+
+	Each CSV is parsed once into one .npy file per column (time as int64 epoch seconds) and
+	converted again only when the CSV changes. Loads memory-map just the requested columns and
+	slice the requested time range with a binary search on `time`, so nothing is parsed or copied.
+	"""
+
+	def __init__(self, source_dir=os.path.join('Logs', 'Rates'), cache_dir=os.path.join('Logs', 'Columns')):
+		"""
+		:param source_dir: Directory holding the `<symbol>_rates.csv` files.
+		:param cache_dir: Directory the column files are written to, one sub-directory per symbol.
+		"""
+		self.source_dir = source_dir
+		self.cache_dir = cache_dir
+
+	def source_path(self, symbol):
+		return os.path.join(self.source_dir, f"{symbol}_rates.csv")
+
+	def symbol_dir(self, symbol):
+		return os.path.join(self.cache_dir, symbol)
+
+	def symbols(self):
+		"""Symbols with a recorded CSV."""
+		if not os.path.isdir(self.source_dir):
+			return []
+		suffix = '_rates.csv'
+		return sorted(name[:-len(suffix)] for name in os.listdir(self.source_dir) if name.endswith(suffix))
+
+	def _manifest(self, symbol):
+		path = os.path.join(self.symbol_dir(symbol), MANIFEST)
+		if not os.path.exists(path):
+			return None
+		with open(path) as file:
+			return json.load(file)
+
+	def is_stale(self, symbol):
+		"""Whether the column files are missing or older than the CSV they were converted from."""
+		manifest = self._manifest(symbol)
+		if manifest is None:
+			return True
+		source = os.stat(self.source_path(symbol))
+		return manifest['source_mtime_ns'] != source.st_mtime_ns or manifest['source_size'] != source.st_size
+
+	def convert(self, symbol, force=False):
+		"""
+		Parse the symbol's CSV into column files, unless they are already up to date.
+
+		:param force: Convert even when the cache is current.
+		:return: The manifest (rows and column names).
+		"""
+		path = self.source_path(symbol)
+		if not os.path.exists(path):
+			raise FileNotFoundError(f"No recorded rates for {symbol} at {path}.")
+		if not force and not self.is_stale(symbol):
+			return self._manifest(symbol)
+
+		source = os.stat(path)
+		frame = pd.read_csv(path)
+		frame = frame.loc[:, ~frame.columns.str.startswith('Unnamed')]
+		if 'time' not in frame.columns:
+			raise ValueError(f"{path} has no 'time' column.")
+		times = frame['time']
+		if not pd.api.types.is_integer_dtype(times):
+			times = pd.to_datetime(times).to_numpy().astype('datetime64[s]').astype(np.int64)
+		columns = {'time': np.asarray(times, dtype=np.int64)}
+		for name in frame.columns.drop('time'):
+			# Text columns have no columnar use for the backtests
+			if pd.api.types.is_numeric_dtype(frame[name]):
+				columns[name] = frame[name].to_numpy()
+
+		directory = self.symbol_dir(symbol)
+		os.makedirs(directory, exist_ok=True)
+		for name, values in columns.items():
+			temporary = os.path.join(directory, f".{name}.npy")
+			np.save(temporary, values)
+			os.replace(temporary, os.path.join(directory, f"{name}.npy"))
+
+		# Written last, a conversion interrupted before this point is redone on the next load
+		manifest = {
+			'rows': len(frame),
+			'columns': list(columns),
+			'source_mtime_ns': source.st_mtime_ns,
+			'source_size': source.st_size,
+		}
+		temporary = os.path.join(directory, f".{MANIFEST}")
+		with open(temporary, 'w') as file:
+			json.dump(manifest, file)
+		os.replace(temporary, os.path.join(directory, MANIFEST))
+		logger.info("%s: %d rows converted to %s.", symbol, len(frame), directory)
+		return manifest
+
+	def columns(self, symbol):
+		"""Column names available for the symbol, converting its CSV first if needed."""
+		return self.convert(symbol)['columns']
+
+	def load(self, symbol, columns=None, start_time=None, end_time=None):
+		"""
+		Map the requested columns over a time range without copying them.
+
+		:param columns: Column names to load, all of them when None. `time` is always included.
+		:param start_time: Optional first bar time (datetime or epoch seconds), inclusive.
+		:param end_time: Optional last bar time, inclusive.
+		:return: dict of column name to a read-only array view.
+		"""
+		available = self.convert(symbol)['columns']
+		columns = available if columns is None else ['time'] + [name for name in columns if name != 'time']
+		missing = [name for name in columns if name not in available]
+		if missing:
+			raise ValueError(f"{symbol} has no column(s) {missing}, available: {available}")
+
+		directory = self.symbol_dir(symbol)
+		times = np.load(os.path.join(directory, 'time.npy'), mmap_mode='r')
+		lo, hi = 0, len(times)
+		if start_time is not None:
+			lo = np.searchsorted(times, to_timestamp(start_time), side='left')
+		if end_time is not None:
+			hi = np.searchsorted(times, to_timestamp(end_time), side='right')
+		return {name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode='r')[lo:hi] for name in columns}
+
+	def load_frame(self, symbol, columns=None, start_time=None, end_time=None):
+		"""
+		load() as a DataFrame indexed by bar time, the layout the strategy steps work on.
+
+		Building the frame copies the selected range, keep the column list short for long histories.
+		"""
+		arrays = self.load(symbol, columns, start_time, end_time)
+		index = pd.DatetimeIndex(arrays.pop('time').astype('datetime64[s]'), name='time')
+		return pd.DataFrame(arrays, index=index)
+
+	def load_rates(self, symbol, start_time=None, end_time=None):
+		"""The range in the copy_rates_* layout, for code that expects terminal rates (e.g. MovingAverageCrossover)."""
+		arrays = self.load(symbol, None, start_time, end_time)
+		rates = np.zeros(len(arrays['time']), dtype=RATES_DTYPE)
+		for name in RATES_DTYPE.names:
+			if name in arrays:
+				rates[name] = arrays[name]
+		return rates
+
+
+if __name__ == "__main__":
+	# Convert every recorded CSV ahead of the backtests
+	loader = HistoryLoader()
+	for symbol in loader.symbols():
+		loader.convert(symbol)
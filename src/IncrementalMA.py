@@ -0,0 +1,122 @@
+import math
+import numpy as np
+
+
+class RollingMean:
+	"""Fixed-window running mean backed by a ring buffer."""
+
+	def __init__(self, period):
+		if period < 1:
+			raise ValueError("period must be a positive integer.")
+		self.period = int(period)
+		self.buffer = np.zeros(self.period, dtype=np.float64)
+		self.position = 0
+		self.count = 0
+		self.total = 0.0
+
+	@property
+	def ready(self):
+		return self.count >= self.period
+
+	@property
+	def value(self):
+		"""Mean of the last `period` values, NaN until the window is full."""
+		if not self.ready:
+			return math.nan
+		return self.total / self.period
+
+	def push(self, value):
+		"""Add one value to the window, evicting the oldest one once full."""
+		value = float(value)
+		self.total += value - self.buffer[self.position]
+		self.buffer[self.position] = value
+		self.position += 1
+		if self.position == self.period:
+			# Re-sum once per lap so floating point drift can't build up over a long session
+			self.position = 0
+			self.total = float(self.buffer.sum())
+		if self.count < self.period:
+			self.count += 1
+
+
+class IncrementalMovingAverageCrossover:
+	"""
+	Streaming counterpart of MovingAverageCrossover.calculate_moving_averages and generate_signals.
+
+	Every closed bar is processed in constant time and yields the same Fast_MA, Slow_MA,
+	Signal and Crossover values as the batch pandas path, including the one bar `.shift()`.
+	"""
+
+	def __init__(self, symbol, fast_period=50, slow_period=200):
+		"""
+		:param symbol: The symbol this state belongs to (e.g., 'EURUSD').
+		:param fast_period: Period for the fast-moving average.
+		:param slow_period: Period for the slow-moving average.
+		"""
+		self.symbol = symbol
+		self.fast_period = fast_period
+		self.slow_period = slow_period
+		self.fast = RollingMean(fast_period)
+		self.slow = RollingMean(slow_period)
+		self.last_signal = None
+		self.last_time = None
+		self.bars = 0
+
+	@property
+	def ready(self):
+		"""True once both averages are defined, i.e. the row would survive dropna() in the batch path."""
+		return self.bars > max(self.fast_period, self.slow_period)
+
+	def update(self, bar):
+		"""
+		Feed one closed bar and return the indicator row for it.
+
+		:param bar: Anything indexable by 'time' and 'close' (rates record, dict or Series).
+		:return: dict with time, close, Fast_MA, Slow_MA, Signal and Crossover.
+		"""
+		time, close = bar['time'], bar['close']
+		if self.last_time is not None and time <= self.last_time:
+			raise ValueError(f"Bar at {time} for {self.symbol} is not newer than the last bar {self.last_time}.")
+
+		# The averages are read before the close is pushed, which is what `.shift()` does in the batch path
+		fast_ma = self.fast.value
+		slow_ma = self.slow.value
+		self.fast.push(close)
+		self.slow.push(close)
+
+		# Same rule as generate_signals: the second np.where overwrites the first one
+		signal = -1 if fast_ma < slow_ma else 0
+		crossover = math.nan if self.last_signal is None else float(signal - self.last_signal)
+
+		self.last_signal = signal
+		self.last_time = time
+		self.bars += 1
+		return {
+			'time': time,
+			'close': close,
+			'Fast_MA': fast_ma,
+			'Slow_MA': slow_ma,
+			'Signal': signal,
+			'Crossover': crossover,
+		}
+
+	def warm_up(self, data):
+		"""
+		Seed the state from historical bars so live updates can continue from the last one.
+
+		:param data: DataFrame or rates array with 'close' (and 'time' as a column or the index).
+		:return: The indicator row of the last bar, or None when data is empty.
+		"""
+		if data is None or len(data) == 0:
+			return None
+		if hasattr(data, 'columns'):
+			times = data['time'].to_numpy() if 'time' in data.columns else data.index.to_numpy()
+			closes = data['close'].to_numpy()
+		else:
+			times = data['time']
+			closes = data['close']
+
+		row = None
+		for time, close in zip(times, closes):
+			row = self.update({'time': time, 'close': close})
+		return row
@@ -0,0 +1,140 @@
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+
+
+def bar_times(data):
+	"""Bar open times of a frame ('time' column or index) or rates array as int64 epoch seconds."""
+	if hasattr(data, 'columns'):
+		times = data['time'] if 'time' in data.columns else data.index
+	else:
+		times = data['time']
+	times = np.asarray(times)
+	if np.issubdtype(times.dtype, np.datetime64):
+		return times.astype('datetime64[s]').astype(np.int64)
+	return times.astype(np.int64)
+
+
+def shifted_sma(close, period):
+	"""close.rolling(period).mean().shift() as a float64 array, the moving average calculate_moving_averages builds."""
+	return pd.Series(close, dtype=np.float64).rolling(window=period).mean().shift().to_numpy()
+
+
+INDICATORS = {'sma': shifted_sma}
+
+
+class _Entry:
+	__slots__ = ('times', 'values')
+
+	def __init__(self, times, values):
+		self.times = times
+		self.values = values
+
+
+class IndicatorCache:
+	"""
+	LRU cache of indicator series keyed by (symbol, timeframe, indicator, period).
+
+	A series is stored per bar time. When a consumer asks again with newer bars, only the bars
+	past the cached ones are computed (from the last `period` closes), so every strategy and
+	filter reading the same indicator on the same symbol and timeframe shares one computation.
+	"""
+
+	def __init__(self, max_entries=256, max_bars=100_000):
+		"""
+		:param max_entries: Series kept before the least recently used one is evicted.
+		:param max_bars: Newest bars kept per series.
+		"""
+		self.max_entries = max_entries
+		self.max_bars = max_bars
+		self.entries = OrderedDict()
+		self.lock = threading.Lock()
+		self.hits = 0
+		self.misses = 0
+		self.extensions = 0
+
+	def get(self, symbol, timeframe, indicator, period, times, close):
+		"""
+		The indicator over `close`, served from the cache where the bars are already known.
+
+		:param timeframe: Timeframe of the bars (e.g., mt5.TIMEFRAME_H1), part of the key.
+		:param indicator: Name of the indicator, one of INDICATORS.
+		:param period: Indicator period.
+		:param times: Bar times (int64 epoch seconds, see bar_times()), oldest first.
+		:param close: Close prices aligned with `times`.
+		:return: float64 array aligned with `times`, equal to computing the indicator over `close` from scratch.
+		"""
+		if indicator not in INDICATORS:
+			raise ValueError(f"Unknown indicator '{indicator}', choose from {sorted(INDICATORS)}.")
+		compute = INDICATORS[indicator]
+		times = np.asarray(times, dtype=np.int64)
+		close = np.asarray(close, dtype=np.float64)
+		n = len(times)
+		key = (symbol, timeframe, indicator, period)
+
+		with self.lock:
+			entry = self.entries.get(key)
+			if entry is not None:
+				self.entries.move_to_end(key)
+
+		reused = 0
+		values = np.empty(n, dtype=np.float64)
+		if entry is not None and n:
+			# The cached bars this request starts with, matched by time at both ends of the overlap
+			start = int(np.searchsorted(entry.times, times[0]))
+			overlap = min(len(entry.times) - start, n)
+			if overlap > 0 and entry.times[start] == times[0] and entry.times[start + overlap - 1] == times[overlap - 1]:
+				values[:overlap] = entry.values[start:start + overlap]
+				reused = overlap
+				# Cached values left undefined for lack of history, this request may be able to fill them
+				unknown = np.flatnonzero(np.isnan(values[period:reused]))
+				if len(unknown):
+					reused = period + int(unknown[0])
+
+		if reused < n:
+			# Each value only depends on the `period` closes before it
+			lo = max(0, reused - period)
+			values[reused:] = compute(close[lo:], period)[reused - lo:]
+
+		with self.lock:
+			if reused == n and n:
+				self.hits += 1
+			elif reused:
+				self.extensions += 1
+			else:
+				self.misses += 1
+			if reused < n:
+				self._store(key, entry, times, values)
+		# Bars without a full window before them inside this request stay undefined, as in a fresh computation
+		values[:min(period, n)] = np.nan
+		return values
+
+	def _store(self, key, entry, times, values):
+		if entry is not None and len(entry.times) and entry.times[-1] < times[0]:
+			# A gap between the cached bars and these, start the series over
+			entry = None
+		if entry is not None and len(entry.times):
+			keep = entry.times < times[0]
+			times = np.concatenate([entry.times[keep], times])
+			values = np.concatenate([entry.values[keep], values])
+		if len(times) > self.max_bars:
+			times, values = times[-self.max_bars:], values[-self.max_bars:]
+		self.entries[key] = _Entry(times.copy(), values.copy())
+		self.entries.move_to_end(key)
+		while len(self.entries) > self.max_entries:
+			self.entries.popitem(last=False)
+
+	def sma(self, symbol, timeframe, data, period):
+		"""Shifted simple moving average of a frame or rates array, as calculate_moving_averages computes it."""
+		return self.get(symbol, timeframe, 'sma', period, bar_times(data), data['close'])
+
+	def invalidate(self, symbol=None, timeframe=None):
+		"""Drop the cached series of a symbol and/or timeframe, all of them when both are None."""
+		with self.lock:
+			for key in [key for key in self.entries
+					if (symbol is None or key[0] == symbol) and (timeframe is None or key[1] == timeframe)]:
+				del self.entries[key]
+
+	def stats(self):
+		return {'entries': len(self.entries), 'hits': self.hits, 'extensions': self.extensions, 'misses': self.misses}
@@ -0,0 +1,192 @@
+import numpy as np
+from ParameterSweep import rolling_means
+
+try:
+	from numba import njit
+except ImportError:
+	njit = None
+
+
+def _fused_loop(close, fast_period, slow_period, fast_ma, slow_ma, first, signal, crossover, position, equity):
+	"""
+	One pass over `close` filling the signal, crossover, position and equity arrays.
+
+	Unless `fast_ma` and `slow_ma` are given (empty otherwise), the shifted moving averages are
+	kept as running sums of the last `period` closes (relative to the first close, with Kahan
+	compensation so millions of additions and removals do not drift).
+	Signal, crossover and position follow generate_signals and backtest_strategy, the returns only
+	count from `first`, the first bar backtest_strategy keeps.
+	:return: (trades, sum of strategy returns, sum of their squares, max drawdown)
+	"""
+	n = len(close)
+	given = len(fast_ma) > 0
+	base = close[0]
+	fast_sum = 0.0
+	fast_c = 0.0
+	slow_sum = 0.0
+	slow_c = 0.0
+	previous_signal = 0
+	value = 1.0
+	peak = 1.0
+	max_drawdown = 0.0
+	total = 0.0
+	squares = 0.0
+	trades = 0
+	for i in range(n):
+		# Signal rule of generate_signals: -1 while the fast average is below the slow one, else 0
+		current = 0
+		if given:
+			if fast_ma[i] < slow_ma[i]:
+				current = -1
+		elif i >= fast_period and i >= slow_period and fast_sum / fast_period < slow_sum / slow_period:
+			current = -1
+		signal[i] = current
+		crossover[i] = current - previous_signal if i > 0 else 0
+		held = previous_signal if i > 0 else 0
+		position[i] = held
+		previous_signal = current
+
+		if i >= first:
+			returns = (close[i] / close[i - 1] - 1.0) * held
+			value *= 1.0 + returns
+			if value > peak:
+				peak = value
+			drawdown = value / peak - 1.0
+			if drawdown < max_drawdown:
+				max_drawdown = drawdown
+			total += returns
+			squares += returns * returns
+			if i > first and held != position[i - 1]:
+				trades += 1
+			equity[i] = value
+		else:
+			equity[i] = np.nan
+
+		if given:
+			continue
+		# Slide both windows onto close[i - period + 1:i + 1], the averages of the next bar
+		x = close[i] - base
+		y = x - fast_c
+		t = fast_sum + y
+		fast_c = (t - fast_sum) - y
+		fast_sum = t
+		y = x - slow_c
+		t = slow_sum + y
+		slow_c = (t - slow_sum) - y
+		slow_sum = t
+		if i >= fast_period:
+			y = -(close[i - fast_period] - base) - fast_c
+			t = fast_sum + y
+			fast_c = (t - fast_sum) - y
+			fast_sum = t
+		if i >= slow_period:
+			y = -(close[i - slow_period] - base) - slow_c
+			t = slow_sum + y
+			slow_c = (t - slow_sum) - y
+			slow_sum = t
+	return trades, total, squares, max_drawdown
+
+
+_fused_compiled = njit(cache=True, nogil=True)(_fused_loop) if njit is not None else None
+
+
+def _fused_vectorized(close, fast_period, slow_period, fast_ma, slow_ma, first, signal, crossover, position, equity):
+	"""The same results as _fused_loop, as whole-array NumPy passes for when Numba is not installed."""
+	n = len(close)
+	if len(fast_ma) == 0:
+		fast_ma, slow_ma = rolling_means(close, [fast_period, slow_period])
+	np.negative(fast_ma < slow_ma, out=signal, dtype=np.int8)
+	crossover[0] = 0
+	np.subtract(signal[1:], signal[:-1], out=crossover[1:])
+	position[0] = 0
+	position[1:] = signal[:-1]
+
+	returns = np.zeros(n, dtype=np.float64)
+	np.divide(close[first:], close[first - 1:-1], out=returns[first:])
+	returns[first:] -= 1.0
+	returns *= position
+	equity[:] = np.nan
+	if first >= n:
+		return 0, 0.0, 0.0, 0.0
+	np.cumprod(1.0 + returns[first:], out=equity[first:])
+	peak = np.maximum.accumulate(np.maximum(equity[first:], 1.0))
+	max_drawdown = min(0.0, float(np.min(equity[first:] / peak - 1.0)))
+	trades = int(np.count_nonzero(position[first + 1:] != position[first:-1]))
+	return trades, float(returns.sum()), float(np.dot(returns, returns)), max_drawdown
+
+
+ENGINES = {'python': _fused_loop, 'numpy': _fused_vectorized}
+if _fused_compiled is not None:
+	ENGINES['numba'] = _fused_compiled
+
+
+def crossover_backtest(close, fast_period=50, slow_period=200, periods_per_year=None, engine='auto',
+		fast_ma=None, slow_ma=None):
+	"""
+	Moving-average crossover signals, positions, equity and summary statistics in one fused kernel.
+
+	Gives what calculate_moving_averages, generate_signals and backtest_strategy compute, with the
+	statistics sweep_moving_averages reports, without building a Series per intermediate step:
+	the Numba engine makes a single pass and only allocates the four per-bar outputs.
+
+	:param close: 1-D array of close prices, oldest first.
+	:param fast_period: Period for the fast-moving average.
+	:param slow_period: Period for the slow-moving average.
+	:param periods_per_year: Annualisation factor for the Sharpe ratio, left per-bar when None.
+	:param engine: 'numba', 'numpy', 'python' (the uncompiled loop) or 'auto' for Numba when installed, else NumPy.
+	:param fast_ma: Optional shifted fast average aligned with `close`, e.g. the Fast_MA column, used instead
+		of the kernel's own. Passing both averages reproduces the batch signals even where they tie to the
+		last bit, which the kernel's running sums may break the other way.
+	:param slow_ma: Optional shifted slow average aligned with `close`.
+	:return: dict with per-bar `signal`, `crossover` and `position` (int8) and `equity` (float64, NaN before
+		`first`) arrays, `first` (the first bar backtest_strategy keeps) and the `bars`, `total_return`,
+		`market_return`, `sharpe`, `max_drawdown` and `trades` statistics.
+	"""
+	if engine == 'auto':
+		engine = 'numba' if 'numba' in ENGINES else 'numpy'
+	if engine not in ENGINES:
+		raise ValueError(f"Unknown or unavailable engine '{engine}', choose from {sorted(ENGINES)}.")
+	if fast_period < 1 or slow_period < 1:
+		raise ValueError("Periods must be positive integers.")
+	close = np.ascontiguousarray(close, dtype=np.float64)
+	n = len(close)
+	first = max(fast_period, slow_period) + 1
+	if (fast_ma is None) != (slow_ma is None):
+		raise ValueError("Pass both moving averages or neither.")
+	if fast_ma is None:
+		fast_ma = slow_ma = np.empty(0, dtype=np.float64)
+	else:
+		fast_ma = np.ascontiguousarray(fast_ma, dtype=np.float64)
+		slow_ma = np.ascontiguousarray(slow_ma, dtype=np.float64)
+		if len(fast_ma) != n or len(slow_ma) != n:
+			raise ValueError("The moving averages must be aligned with `close`.")
+
+	signal = np.zeros(n, dtype=np.int8)
+	crossover = np.zeros(n, dtype=np.int8)
+	position = np.zeros(n, dtype=np.int8)
+	equity = np.full(n, np.nan, dtype=np.float64)
+	trades, total, squares, max_drawdown = 0, 0.0, 0.0, 0.0
+	if n:
+		trades, total, squares, max_drawdown = ENGINES[engine](close, fast_period, slow_period, fast_ma, slow_ma, first,
+				signal, crossover, position, equity)
+
+	bars = max(0, n - first)
+	sharpe = np.nan
+	if bars > 1:
+		mean = total / bars
+		std = np.sqrt(max(0.0, (squares - bars * mean ** 2) / (bars - 1)))
+		if std > 0:
+			sharpe = mean / std * (np.sqrt(periods_per_year) if periods_per_year else 1.0)
+	return {
+		'signal': signal,
+		'crossover': crossover,
+		'position': position,
+		'equity': equity,
+		'first': first,
+		'bars': bars,
+		'total_return': float(equity[-1]) - 1 if bars else np.nan,
+		'market_return': float(close[-1] / close[first - 1]) - 1 if bars else np.nan,
+		'sharpe': sharpe,
+		'max_drawdown': float(max_drawdown) if bars else np.nan,
+		'trades': int(trades),
+	}
@@ -0,0 +1,144 @@
+import asyncio
+import inspect
+import logging
+import time
+import MetaTrader5 as mt5
+from AsyncClient import AsyncMetaTrader5Client
+from IncrementalMA import IncrementalMovingAverageCrossover
+import Metrics
+from MetaTrader5_helper import timeframe_seconds
+
+
+class BarCloseScheduler:
+	"""
+	Long-running loop that wakes up at each bar close of every (symbol, timeframe) subscription.
+
+	At a close it fetches only the bars that just closed, feeds them to the symbol's incremental
+	moving-average state and hands the resulting row to `on_bar`, then sleeps until the next
+	boundary. All subscriptions share one asyncio event loop.
+	"""
+
+	def __init__(self, client, subscriptions, on_bar=None, fast_period=50, slow_period=200,
+			clock_offset=None, settle=0.05, retry_delay=0.05, max_wait=10.0):
+		"""
+		:param client: A connected MetaTrader5Client, or an AsyncMetaTrader5Client wrapping one.
+		:param subscriptions: Iterable of (symbol, timeframe) pairs.
+		:param on_bar: Callable (or coroutine function) taking (symbol, timeframe, row) for every closed bar.
+		:param fast_period: Period for the fast-moving average.
+		:param slow_period: Period for the slow-moving average.
+		:param clock_offset: Seconds between the broker's server time and the local clock, estimated from a tick when None.
+		:param settle: Delay after the boundary before the first fetch, gives the terminal time to close the bar.
+		:param retry_delay: First delay between fetches while the closed bar is not published yet, doubled each time.
+		:param max_wait: Give up on a boundary after this long (market closed, no ticks) and wait for the next one.
+		"""
+		self.client = client if isinstance(client, AsyncMetaTrader5Client) else AsyncMetaTrader5Client(client)
+		self.subscriptions = list(subscriptions)
+		self.on_bar = on_bar
+		self.clock_offset = clock_offset
+		self.settle = settle
+		self.retry_delay = retry_delay
+		self.max_wait = max_wait
+		self.states = {
+			(symbol, timeframe): IncrementalMovingAverageCrossover(symbol, fast_period, slow_period)
+			for symbol, timeframe in self.subscriptions
+		}
+		self.running = False
+
+	def server_time(self):
+		"""Current broker server time in epoch seconds."""
+		return time.time() + (self.clock_offset or 0.0)
+
+	async def estimate_clock_offset(self):
+		"""Offset of the server clock from the latest tick, rounded to the half hour brokers' time zones use."""
+		tick = await self.client.symbol_info_tick(self.subscriptions[0][0])
+		if tick is None:
+			return 0.0
+		return round((tick.time - time.time()) / 1800) * 1800.0
+
+	@staticmethod
+	def next_close(timeframe, now):
+		"""Time of the next bar boundary of `timeframe` strictly after `now`."""
+		step = timeframe_seconds(timeframe)
+		return (int(now) // step + 1) * step
+
+	async def warm_up(self):
+		"""Seed every state with enough closed bars for both averages to be defined, all fetched concurrently."""
+		async def seed(state, symbol, timeframe):
+			count = max(state.fast_period, state.slow_period) + 1
+			# Position 0 is the bar still forming, history starts at 1
+			rates = await self.client.get_rates_from_pos(symbol, timeframe, 1, count)
+			if rates is not None and len(rates) > 0:
+				state.warm_up(rates)
+
+		await asyncio.gather(*(seed(state, symbol, timeframe) for (symbol, timeframe), state in self.states.items()))
+
+	async def _fetch_closed(self, symbol, timeframe, close):
+		"""Fetch the bars closed since the last one seen, waiting briefly if the terminal lags the boundary."""
+		state = self.states[(symbol, timeframe)]
+		step = timeframe_seconds(timeframe)
+		expected = close - step
+		missed = 1 if state.last_time is None else max(1, (expected - int(state.last_time)) // step)
+		delay = self.retry_delay
+		deadline = time.monotonic() + self.max_wait
+		while self.running:
+			rates = await self.client.get_rates_from_pos(symbol, timeframe, 1, int(min(missed, 1000)))
+			if rates is not None and len(rates) > 0 and rates['time'][-1] >= expected:
+				if state.last_time is not None:
+					rates = rates[rates['time'] > state.last_time]
+				return rates
+			if time.monotonic() + delay > deadline:
+				return None
+			await asyncio.sleep(delay)
+			delay = min(delay * 2, 1.0)
+		return None
+
+	async def _watch(self, symbol, timeframe):
+		state = self.states[(symbol, timeframe)]
+		while self.running:
+			close = self.next_close(timeframe, self.server_time())
+			await asyncio.sleep(max(0.0, close - self.server_time()) + self.settle)
+			rates = await self._fetch_closed(symbol, timeframe, close)
+			if rates is None:
+				continue
+			for bar in rates:
+				with Metrics.timer('indicator', symbol) as record:
+					row = state.update(bar)
+					record['items'] = 1
+				if self.on_bar is not None:
+					result = self.on_bar(symbol, timeframe, row)
+					if inspect.isawaitable(result):
+						await result
+
+	async def run(self):
+		"""Warm up, then watch every subscription until stop() is called. Terminal calls go through the async client's executor."""
+		self.running = True
+		if self.clock_offset is None:
+			self.clock_offset = await self.estimate_clock_offset()
+		await self.warm_up()
+		await asyncio.gather(*(self._watch(symbol, timeframe) for symbol, timeframe in self.subscriptions))
+
+	def stop(self):
+		self.running = False
+
+
+if __name__ == "__main__":
+	from Advisor import MetaTrader5Client
+
+	logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+	symbols = ["USDJPY", "USDCHF", "USDCAD", "USDZAR", "EURUSD"]
+	client = MetaTrader5Client(symbols)
+	if not client.initialize() or not client.check_symbols_availability():
+		client.shutdown()
+		exit()
+
+	def report(symbol, timeframe, row):
+		print(f"{symbol} {timeframe} closed at {row['time']}: close {row['close']} "
+				f"fast {row['Fast_MA']:.5f} slow {row['Slow_MA']:.5f} signal {row['Signal']} crossover {row['Crossover']}")
+
+	scheduler = BarCloseScheduler(client, [(symbol, mt5.TIMEFRAME_M1) for symbol in symbols] + [(symbol, mt5.TIMEFRAME_H1) for symbol in symbols], on_bar=report)
+	try:
+		asyncio.run(scheduler.run())
+	except KeyboardInterrupt:
+		pass
+	finally:
+		client.shutdown()
@@ -19,3 +19,21 @@ def initialize(
     
     # Initialize MetaTrader 5 with the path as a positional argument
     return mt5.initialize(terminal_path)
+
+
+def timeframe_seconds(timeframe: int) -> int:
+    """
+    Returns the length of a MetaTrader 5 timeframe constant in seconds.
+
+    The constants encode their unit in the high bits: minutes (TIMEFRAME_M*), 0x4000 for
+    hours (TIMEFRAME_H*, D1 is 24 hours), 0x8000 for weeks and 0xC000 for months (taken as 30 days).
+    """
+    unit = timeframe & 0xC000
+    value = timeframe & 0x3FFF
+    if unit == 0:
+        return value * 60
+    if unit == 0x4000:
+        return value * 3600
+    if unit == 0x8000:
+        return value * 7 * 86400
+    return value * 30 * 86400
@@ -0,0 +1,232 @@
+import bisect
+import functools
+import json
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+
+# Upper bounds of the latency buckets in seconds, from sub-millisecond indicator steps to slow terminal calls
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+	"""Fixed-bucket latency histogram, in the cumulative-bucket form Prometheus expects."""
+
+	def __init__(self, buckets=DEFAULT_BUCKETS):
+		self.buckets = tuple(sorted(buckets))
+		self.counts = [0] * (len(self.buckets) + 1)
+		self.count = 0
+		self.sum = 0.0
+		self.min = math.inf
+		self.max = 0.0
+
+	def observe(self, value):
+		self.counts[bisect.bisect_left(self.buckets, value)] += 1
+		self.count += 1
+		self.sum += value
+		if value < self.min:
+			self.min = value
+		if value > self.max:
+			self.max = value
+
+	def cumulative(self):
+		"""(upper bound, observations at or below it) pairs, ending with +Inf."""
+		total = 0
+		pairs = []
+		for bound, count in zip(self.buckets + (math.inf,), self.counts):
+			total += count
+			pairs.append((bound, total))
+		return pairs
+
+	def merge(self, other):
+		"""Add the observations of a histogram with the same buckets."""
+		for i, count in enumerate(other.counts):
+			self.counts[i] += count
+		self.count += other.count
+		self.sum += other.sum
+		self.min = min(self.min, other.min)
+		self.max = max(self.max, other.max)
+
+	def quantile(self, q):
+		"""Estimate of the q-quantile, the upper bound of the bucket it falls in (capped at the max seen)."""
+		if self.count == 0:
+			return math.nan
+		rank = q * self.count
+		for bound, total in self.cumulative():
+			if total >= rank:
+				return min(bound, self.max)
+		return self.max
+
+
+class MetricsRegistry:
+	"""
+	Per-stage, per-symbol latency histograms and item counters.
+
+	Stages are the steps of an advisor cycle (fetch, indicator, signal, persistence, order_send...);
+	the item counters record how many bars, rows or orders each stage handled, for throughput.
+	Recording is a perf_counter() pair and a lock, cheap enough for every call.
+	"""
+
+	def __init__(self, namespace="advisor", buckets=DEFAULT_BUCKETS):
+		self.namespace = namespace
+		self.buckets = buckets
+		self.histograms = {}
+		self.items = {}
+		self.lock = threading.Lock()
+
+	def observe(self, stage, seconds, symbol=None, items=None):
+		"""Record one duration of `stage`, and optionally the number of items it processed."""
+		key = (stage, symbol or '')
+		with self.lock:
+			histogram = self.histograms.get(key)
+			if histogram is None:
+				histogram = self.histograms[key] = Histogram(self.buckets)
+			histogram.observe(seconds)
+			if items is not None:
+				self.items[key] = self.items.get(key, 0) + items
+
+	@contextmanager
+	def timer(self, stage, symbol=None):
+		"""
+		Time the enclosed block as one observation of `stage`.
+
+		Yields a dict, set its 'items' key to record how many items the block processed.
+		"""
+		record = {'items': None}
+		start = time.perf_counter()
+		try:
+			yield record
+		finally:
+			self.observe(stage, time.perf_counter() - start, symbol, record['items'])
+
+	def timed_call(self, stage, symbol, function, *args, count=len):
+		"""
+		Call `function(*args)` as one observation of `stage`, e.g. a terminal fetch.
+
+		:param count: Callable giving the number of items in a result other than None, its length by default.
+		:return: Whatever the function returned, None included.
+		"""
+		with self.timer(stage, symbol) as record:
+			result = function(*args)
+			record['items'] = 0 if result is None else count(result)
+		return result
+
+	def reset(self):
+		with self.lock:
+			self.histograms.clear()
+			self.items.clear()
+
+	def drain(self):
+		"""Take the recorded series and start over, e.g. to ship a worker process's metrics to its parent."""
+		with self.lock:
+			histograms, items = self.histograms, self.items
+			self.histograms, self.items = {}, {}
+		return histograms, items
+
+	def merge(self, histograms, items):
+		"""Fold in series taken with drain() from another registry."""
+		with self.lock:
+			for key, histogram in histograms.items():
+				if key in self.histograms:
+					self.histograms[key].merge(histogram)
+				else:
+					self.histograms[key] = histogram
+			for key, count in items.items():
+				self.items[key] = self.items.get(key, 0) + count
+
+	def snapshot(self):
+		"""Plain dict of every series: count, sum, min, max, p50/p90/p99 estimates, buckets and items."""
+		with self.lock:
+			series = []
+			for (stage, symbol), histogram in sorted(self.histograms.items()):
+				series.append({
+					'stage': stage,
+					'symbol': symbol or None,
+					'count': histogram.count,
+					'sum': histogram.sum,
+					'min': histogram.min if histogram.count else None,
+					'max': histogram.max,
+					'p50': histogram.quantile(0.5),
+					'p90': histogram.quantile(0.9),
+					'p99': histogram.quantile(0.99),
+					'items': self.items.get((stage, symbol)),
+					'buckets': [[bound if bound != math.inf else '+Inf', total] for bound, total in histogram.cumulative()],
+				})
+		return {'namespace': self.namespace, 'time': time.time(), 'series': series}
+
+	def to_json(self):
+		return json.dumps(self.snapshot(), indent=1)
+
+	def to_prometheus(self):
+		"""The series in the Prometheus text exposition format."""
+		duration = f"{self.namespace}_stage_duration_seconds"
+		items = f"{self.namespace}_stage_items_total"
+		lines = [
+			f"# HELP {duration} Time spent per pipeline stage and symbol.",
+			f"# TYPE {duration} histogram",
+		]
+		counters = []
+		with self.lock:
+			for (stage, symbol), histogram in sorted(self.histograms.items()):
+				labels = f'stage="{_escape(stage)}",symbol="{_escape(symbol)}"'
+				for bound, total in histogram.cumulative():
+					le = '+Inf' if bound == math.inf else repr(bound)
+					lines.append(f'{duration}_bucket{{{labels},le="{le}"}} {total}')
+				lines.append(f"{duration}_sum{{{labels}}} {histogram.sum!r}")
+				lines.append(f"{duration}_count{{{labels}}} {histogram.count}")
+				if (stage, symbol) in self.items:
+					counters.append(f"{items}{{{labels}}} {self.items[(stage, symbol)]}")
+		if counters:
+			lines += [f"# HELP {items} Bars, rows or orders handled per pipeline stage and symbol.", f"# TYPE {items} counter"]
+			lines += counters
+		return "\n".join(lines) + "\n"
+
+	def write_prometheus(self, path):
+		"""Write the text format atomically, e.g. for node_exporter's textfile collector."""
+		_write_atomic(path, self.to_prometheus())
+
+	def write_json(self, path):
+		_write_atomic(path, self.to_json())
+
+
+def _escape(value):
+	return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _write_atomic(path, text):
+	if os.path.dirname(path):
+		os.makedirs(os.path.dirname(path), exist_ok=True)
+	temporary = path + ".tmp"
+	with open(temporary, 'w') as file:
+		file.write(text)
+	os.replace(temporary, path)
+
+
+# Process-wide registry the advisor modules record into
+REGISTRY = MetricsRegistry()
+timer = REGISTRY.timer
+timed_call = REGISTRY.timed_call
+observe = REGISTRY.observe
+
+
+def timed(stage, items=None):
+	"""
+	Decorator recording every call of a method as one observation of `stage` in REGISTRY.
+
+	The series is labelled with the instance's `symbol` attribute.
+	:param items: Optional callable taking the instance and returning how many items the call handled.
+	"""
+	def decorate(method):
+		@functools.wraps(method)
+		def wrapper(self, *args, **kwargs):
+			start = time.perf_counter()
+			try:
+				return method(self, *args, **kwargs)
+			finally:
+				REGISTRY.observe(stage, time.perf_counter() - start, getattr(self, 'symbol', None),
+						items(self) if items is not None else None)
+		return wrapper
+	return decorate
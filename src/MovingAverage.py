@@ -1,27 +1,47 @@
+import logging
 import pandas as pd
-import matplotlib.pyplot as plt
 import MetaTrader5 as mt5
 import Advisor as adv
 import os
 import numpy as np
 import TradesAlgo as Trades
+from IncrementalMA import IncrementalMovingAverageCrossover
+from ParameterSweep import sweep_moving_averages
+from SignalJournal import SignalJournal
+from EventBacktest import EventBacktester
+from Kernels import crossover_backtest
+import Reporting
+from Metrics import timed
+import SymbolRegistry
+
+
+logger = logging.getLogger(__name__)
+
+
+def _bars(strategy):
+	return len(strategy.data)
 
 
 class MovingAverageCrossover:
 
-	def __init__(self,  symbol, data, fast_period=50, slow_period=200):
+	def __init__(self,  symbol, data, fast_period=50, slow_period=200, low_memory=False):
 		"""
 		Initialize the strategy with data and parameters.
 		
 		:param data: DataFrame containing historical data (must include 'close').
 		:param fast_period: Period for the fast-moving average.
 		:param slow_period: Period for the slow-moving average.
+		:param low_memory: Keep the signal and backtest columns as int8 / float32 and fill them in place
+			instead of building a Series per step. Several symbols then fit in one worker.
+			The averages stay float64 so the signals match the default mode bar for bar.
 		"""
 		self.data = data
 		self.fast_period = fast_period
 		self.slow_period = slow_period
+		self.low_memory = low_memory
 		self.signals = None
 		self.results = None
+		self.spread = None
 		self.symbol = symbol
 
 	def get_rates_from(self, symbol, timeframe, start_time, count):
@@ -29,83 +49,180 @@ class MovingAverageCrossover:
 		"""Fetch historical rates from MetaTrader 5."""
 		rates = mt5.copy_rates_from(symbol, timeframe, start_time, count)
 		if rates is None:
-				print(f"Failed to retrieve {symbol} rates, error code:", mt5.last_error())
+				logger.error("Failed to retrieve %s rates, error code: %s", symbol, mt5.last_error())
 		return rates
 
-	def calculate_moving_averages(self):
-		"""Calculate the fast and slow moving averages."""
+	@timed('indicator', items=_bars)
+	def calculate_moving_averages(self, cache=None, timeframe=None):
+		"""
+		Calculate the fast and slow moving averages.
+
+		:param cache: Optional IndicatorCache; averages already computed for this symbol and timeframe,
+			by this or any other strategy, are reused and only newer bars are computed.
+		:param timeframe: Timeframe of the bars, part of the cache key.
+		"""
 		if 'close' not in self.data.columns:
 				raise ValueError("'close' column is missing in the data.")
-		self.data['Fast_MA'] = self.data['close'].rolling(window=self.fast_period).mean().shift()
-		self.data['Slow_MA'] = self.data['close'].rolling(window=self.slow_period).mean().shift()
-		print("Moving averages calculated.")
+		if cache is not None:
+			self.data['Fast_MA'] = cache.sma(self.symbol, timeframe, self.data, self.fast_period)
+			self.data['Slow_MA'] = cache.sma(self.symbol, timeframe, self.data, self.slow_period)
+		else:
+			self.data['Fast_MA'] = self.data['close'].rolling(window=self.fast_period).mean().shift()
+			self.data['Slow_MA'] = self.data['close'].rolling(window=self.slow_period).mean().shift()
+		logger.debug("Moving averages calculated.")
 
+	@timed('signal', items=_bars)
 	def generate_signals(self):
 		"""Generate buy and sell signals based on moving average crossover."""
 		if 'Fast_MA' not in self.data.columns or 'Slow_MA' not in self.data.columns:
 				raise ValueError("Moving averages are missing. Please run 'calculate_moving_averages()' first.")
 		
+		if self.low_memory:
+			self._generate_signals_in_place()
+			logger.debug("%s", self.data)
+			logger.debug("Signals and crossovers generated.")
+			return
+
 		self.data['Signal'] = np.where(self.data['Fast_MA'] > self.data['Slow_MA'], 1, 0)
 		self.data['Signal'] = np.where(self.data['Fast_MA'] < self.data['Slow_MA'], -1, 0)
 	
 		self.data['Crossover'] = self.data['Signal'].diff()
+		# Keep the per-bar spread for event_backtest()
+		self.spread = self.data['spread'] if 'spread' in self.data.columns else None
 		# Remove unwanted columns
 		self.data = self.data.drop(columns=['tick_volume', 'spread', 'real_volume'])
 
 		# Remove rows with missing or empty values
 		self.data = self.data.dropna()
 		#print(self.data[['Signal', 'Crossover']].tail())
-		print( self.data)
-		print("Signals and crossovers generated.")
+		logger.debug("%s", self.data)
+		logger.debug("Signals and crossovers generated.")
+
+	def _generate_signals_in_place(self):
+		"""generate_signals() with int8 columns, the unwanted columns dropped in place and the warm-up trimmed by slicing."""
+		fast = self.data['Fast_MA'].to_numpy()
+		slow = self.data['Slow_MA'].to_numpy()
+		# Same values as the batch path: -1 where fast < slow, 0 everywhere else
+		signal = np.zeros(len(fast), dtype=np.int8)
+		signal[fast < slow] = -1
+		crossover = np.zeros(len(fast), dtype=np.int8)
+		np.subtract(signal[1:], signal[:-1], out=crossover[1:])
+		self.data['Signal'] = signal
+		self.data['Crossover'] = crossover
+		self.spread = self.data['spread'] if 'spread' in self.data.columns else None
+		self.data.drop(columns=['tick_volume', 'spread', 'real_volume'], inplace=True, errors='ignore')
+
+		# The averages are only undefined over the leading warm-up bars, slice them off instead of dropna()
+		defined = ~(np.isnan(fast) | np.isnan(slow))
+		first = int(np.argmax(defined)) if defined.any() else len(defined)
+		if defined[first:].all():
+			self.data = self.data.iloc[first:].copy()
+		else:
+			self.data = self.data[defined]
+
+	def incremental_state(self):
+		"""
+		Build a streaming indicator state seeded with this strategy's history.
+
+		Each new closed bar can then be passed to `update()` in constant time instead of
+		re-running calculate_moving_averages() over the whole frame.
+		"""
+		state = IncrementalMovingAverageCrossover(self.symbol, self.fast_period, self.slow_period)
+		state.warm_up(self.data)
+		return state
 	
 	def toCSVFile(self, rates):
-			# Convert rates to DataFrame
-			self.data = pd.DataFrame(rates)
-			file_path = f'Logs\Rates\{self.symbol}_rates.csv'
+			# Convert rates to DataFrame, a frame is written as is
+			if not isinstance(rates, pd.DataFrame):
+				rates = pd.DataFrame(rates)
+			self.data = rates
+			file_path = os.path.join('Logs', 'Rates', f'{self.symbol}_rates.csv')
 			# Ensure the directory exists before writing
 			os.makedirs(os.path.dirname(file_path), exist_ok=True)
 
 			# Write DataFrame to CSV, creating the file if it doesn’t exist
 			self.data.to_csv(file_path, index=True, mode='w', header=True)
 	 
-	def identify_entry_levels(self):
-		"""Identify entry levels (buy and sell) based on crossovers."""
+	@timed('entry_levels', items=_bars)
+	def identify_entry_levels(self, transitions_only=False):
+		"""
+		Identify entry levels (buy and sell) based on crossovers.
+
+		:param transitions_only: Keep only the bars where the position changes, the ones execute_trades
+			would place an order on, instead of every bar with a signal.
+		"""
 		if 'Crossover' not in self.data.columns:
 				raise ValueError("Crossover data is missing. Please run 'generate_signals()' first.")
 
 		data_with_time = self.data.reset_index()
-		buy_signals = data_with_time[data_with_time['Signal'] == 1]
-		sell_signals = data_with_time[data_with_time['Signal'] == -1]
-
-		entry_levels = pd.concat([
-				buy_signals[['time', 'close']].rename(columns={'close': 'Buy_Level'}),
-				sell_signals[['time', 'close']].rename(columns={'close': 'Sell_Level'})
-		], axis=1)
+		if transitions_only:
+			bars, _ = Trades.signal_transitions(data_with_time['Signal'].to_numpy())
+			data_with_time = data_with_time.iloc[bars]
+		entries = data_with_time[data_with_time['Signal'] != 0]
 
-		self.signals = entry_levels.reset_index(drop=True)
-		print("Entry levels identified.")
+		# One row per signal: symbol, time, side (1 buy, -1 sell) and the close as entry level
+		self.signals = pd.DataFrame({
+				'symbol': self.symbol,
+				'time': entries['time'].to_numpy(),
+				'side': np.sign(entries['Signal'].to_numpy()).astype(np.int8),
+				'level': entries['close'].to_numpy(),
+		})
+		logger.debug("Entry levels identified.")
 
-	def save_signals_to_csv(self, file_name="Logs/Signal_log.csv"):
+	@timed('persistence')
+	def save_signals_to_csv(self, file_name="Logs/signals.csv"):
 		"""
 		Save identified entry levels to a CSV file.
 		- Creates the file if it doesn't exist.
 		- Appends to the file if it already exists.
+		- Refuses a file with other columns, e.g. the legacy Logs/Signal_log.csv layout.
 		"""
 		if self.signals is not None:
 			file_exists = os.path.isfile(file_name)
 			if not file_exists:
 				self.signals.to_csv(file_name, index=False, mode='w')
-				print(f"New file created and entry levels saved to {file_name}.")
+				logger.info("New file created and entry levels saved to %s.", file_name)
 			else:
+				with open(file_name) as file:
+					header = file.readline().rstrip('\r\n').split(',')
+				if header != list(self.signals.columns):
+					raise ValueError(f"{file_name} has the columns {header}, not {list(self.signals.columns)}; "
+							"pick another file.")
 				self.signals.to_csv(file_name, index=False, mode='a', header=False)
-				print(f"Entry levels appended to existing file {file_name}.")
+				logger.info("Entry levels appended to existing file %s.", file_name)
 		else:
-				print("No signals to save. Please run 'identify_entry_levels()' first.")
+				logger.warning("No signals to save. Please run 'identify_entry_levels()' first.")
+
+	def save_signals_to_journal(self, journal=None):
+		"""
+		Append identified entry levels to the SQLite signal journal, tagged with the strategy periods.
+
+		:param journal: A SignalJournal, the default Logs/signals.db one (opened and closed here) when None.
+		:return: Number of signals written.
+		"""
+		if self.signals is None:
+				logger.warning("No signals to save. Please run 'identify_entry_levels()' first.")
+				return 0
+		if journal is None:
+			with SignalJournal() as journal:
+				return self.save_signals_to_journal(journal)
+		written = journal.append_frame(self.signals, fast_period=self.fast_period, slow_period=self.slow_period)
+		logger.info("%d entry levels appended to %s.", written, journal.path)
+		return written
 
-	def backtest_strategy(self):
-		"""Backtest the strategy by calculating strategy returns."""
-		print("data", self.data)
-		self.toCSVFile(self.data)
+	@timed('backtest', items=_bars)
+	def backtest_strategy(self, save_rates=False):
+		"""
+		Backtest the strategy by calculating strategy returns.
+
+		:param save_rates: Dump the frame to Logs/Rates/<symbol>_rates.csv first. Off by default: the files
+			there are the recordings FakeMetaTrader5 replays.
+		"""
+		logger.debug("data %s", self.data)
+		if save_rates:
+			self.toCSVFile(self.data)
+		if self.low_memory:
+			return self._backtest_in_place()
 		self.data['Position'] = self.data['Signal'].shift(1)  # Avoid lookahead bias
 		self.data['Market_Returns'] = self.data['close'].pct_change()
 		self.data['Strategy_Returns'] = self.data['Market_Returns'] * self.data['Position']
@@ -114,20 +231,139 @@ class MovingAverageCrossover:
 		self.results = self.data.dropna().copy()  # Corrected version
 
 		
-		print("data after backtest", self.data)
-		print("Backtest completed.")
+		logger.debug("data after backtest %s", self.data)
+		logger.debug("Backtest completed.")
 		return self.results
 
+	def _backtest_in_place(self):
+		"""backtest_strategy() into preallocated float32 / int8 arrays."""
+		close = self.data['close'].to_numpy()
+		n = len(close)
+		position = np.zeros(n, dtype=np.int8)
+		position[1:] = self.data['Signal'].to_numpy()[:-1]  # Avoid lookahead bias
+		market = np.empty(n, dtype=np.float32)
+		market[:1] = np.nan
+		np.divide(close[1:], close[:-1], out=market[1:])
+		market[1:] -= 1
+		strategy = np.multiply(market, position, dtype=np.float32)
+
+		self.data['Position'] = position
+		self.data['Market_Returns'] = market
+		self.data['Strategy_Returns'] = strategy
+		self.data['Cumulative_Market_Returns'] = self._cumulative(market)
+		self.data['Cumulative_Strategy_Returns'] = self._cumulative(strategy)
+		# Only the first bar has no previous close or position, the rows dropna() would keep
+		self.results = self.data.iloc[1:].copy()
+
+		logger.debug("data after backtest %s", self.data)
+		logger.debug("Backtest completed.")
+		return self.results
+
+	@staticmethod
+	def _cumulative(returns):
+		"""(1 + returns).cumprod() into a new float32 array, accumulated in float64."""
+		growth = np.add(returns, 1, dtype=np.float32)
+		np.multiply.accumulate(growth[1:], dtype=np.float64, out=growth[1:])
+		return growth
+
+	@timed('event_backtest', items=_bars)
+	def event_backtest(self, lot_size=0.1, slippage=0.0, current_side=0, point=None, contract_size=None, engine='auto',
+			spread=None):
+		"""
+		Backtest with bid/ask fills at the next bar's open, the per-bar spread and stop-and-reverse positions
+		(see EventBacktester for how they differ from the live orders).
+
+		:param lot_size: Lots per order, as in MT5TradingAlgorithm.
+		:param slippage: Points lost on every fill on top of the spread.
+		:param current_side: Position held before the first bar, 1, -1 or 0.
+		:param point: Symbol point size, from the symbol registry when None.
+		:param contract_size: Units per lot, from the symbol registry when None.
+		:param engine: EventBacktester engine, 'auto' picks Numba when installed.
+		:param spread: Spread in points, one number or per bar, instead of the spreads recorded by
+			generate_signals() (or the symbol's, when none were recorded).
+		:return: DataFrame with Position, Fill_Price and Equity (profit in the quote currency) per bar.
+		"""
+		if 'Signal' not in self.data.columns:
+				raise ValueError("Signal data is missing. Please run 'generate_signals()' first.")
+		if spread is None and self.spread is not None:
+			spread = self.spread.reindex(self.data.index).to_numpy()
+		info = SymbolRegistry.REGISTRY.info(self.symbol) if point is None or contract_size is None or spread is None else None
+		if (point is None or contract_size is None) and info is None:
+				raise ValueError(f"Symbol info for {self.symbol} is unavailable, pass point and contract_size.")
+		if spread is None and info is None:
+				raise ValueError(f"No spread recorded and symbol info for {self.symbol} is unavailable, pass spread.")
+		point = info.point if point is None else point
+		contract_size = info.trade_contract_size if contract_size is None else contract_size
+		# Without recorded spreads, fall back to the symbol's spread as of the registry's load
+		spread = info.spread if spread is None else spread
+
+		backtester = EventBacktester(point, lot_size, contract_size, slippage, engine)
+		return backtester.run_frame(self.data, spread, current_side)
+
+	def _check_untrimmed(self, method):
+		"""Refuse a frame generate_signals() has trimmed: the kernels drop the warm-up themselves and would drop a second one."""
+		trimmed = 'Signal' in self.data.columns
+		if not trimmed and 'Slow_MA' in self.data.columns and len(self.data):
+			# Shifted averages start undefined, unless the warm-up rows were dropped
+			trimmed = not np.isnan(self.data['Slow_MA'].iloc[0])
+		if trimmed:
+				raise ValueError(f"The warm-up rows are already trimmed, run {method}() before generate_signals().")
+
+	def sweep_parameters(self, fast_periods, slow_periods, periods_per_year=None):
+		"""
+		Backtest a whole grid of fast/slow periods on the raw close prices in one pass.
+
+		Run this before generate_signals(), which trims the warm-up rows from `self.data` (a trimmed frame
+		raises ValueError).
+		:param fast_periods: Candidate fast-moving average periods.
+		:param slow_periods: Candidate slow-moving average periods.
+		:param periods_per_year: Optional annualisation factor for the Sharpe ratio.
+		:return: DataFrame of summary statistics, one row per (fast, slow) pair.
+		"""
+		if 'close' not in self.data.columns:
+				raise ValueError("'close' column is missing in the data.")
+		self._check_untrimmed('sweep_parameters')
+		return sweep_moving_averages(self.data['close'].to_numpy(), fast_periods, slow_periods, periods_per_year)
+
+	@timed('fused_backtest', items=_bars)
+	def fused_backtest(self, periods_per_year=None, engine='auto'):
+		"""
+		Signals, backtest and summary statistics from the close prices in one fused kernel.
+
+		Run this before generate_signals(), which trims the warm-up rows from `self.data` (a trimmed frame
+		raises ValueError). The averages of calculate_moving_averages() are used when it has run,
+		otherwise the kernel computes them in the same pass. Nothing is added to `self.data`, so it is cheap enough for multi-million-bar histories.
+		:param periods_per_year: Optional annualisation factor for the Sharpe ratio.
+		:param engine: Kernels engine, 'auto' picks Numba when installed.
+		:return: (DataFrame with close, Signal, Crossover, Position and Cumulative_Strategy_Returns over the
+			bars backtest_strategy() keeps, dict of the total_return, market_return, sharpe, max_drawdown and trades)
+		"""
+		if 'close' not in self.data.columns:
+				raise ValueError("'close' column is missing in the data.")
+		close = self.data['close'].to_numpy()
+		self._check_untrimmed('fused_backtest')
+		means = {}
+		if 'Fast_MA' in self.data.columns and 'Slow_MA' in self.data.columns:
+			means = {'fast_ma': self.data['Fast_MA'].to_numpy(), 'slow_ma': self.data['Slow_MA'].to_numpy()}
+		kernel = crossover_backtest(close, self.fast_period, self.slow_period, periods_per_year, engine, **means)
+		first = kernel.pop('first')
+		results = pd.DataFrame({
+				'close': close[first:],
+				'Signal': kernel.pop('signal')[first:],
+				'Crossover': kernel.pop('crossover')[first:],
+				'Position': kernel.pop('position')[first:],
+				'Cumulative_Strategy_Returns': kernel.pop('equity')[first:],
+		}, index=self.data.index[first:])
+		return results, kernel
+
 	def plot_performance(self):
 		"""Visualize the strategy performance against market performance."""
 		if self.results is None:
 				raise ValueError("No results available. Run backtest_strategy() first.")
 		
+		plt = Reporting.pyplot()
 		plt.figure(figsize=(12, 6))
-		plt.plot(self.results.index, self.results['Cumulative_Market_Returns'], label='Market Returns', color='blue')
-		plt.plot(self.results.index, self.results['Cumulative_Strategy_Returns'], label='Strategy Returns', color='green')
-		plt.title('Moving Average Crossover Strategy Performance')
-		plt.legend()
+		Reporting.draw_performance(plt.gca(), self.results)
 		plt.show()
 			
 	def plot_charts(self):
@@ -140,33 +376,15 @@ class MovingAverageCrossover:
 		if 'close' not in self.data.columns or self.data['close'].empty:
 				raise ValueError("No Close data available")
 
+		plt = Reporting.pyplot()
 		plt.figure(figsize=(12, 6))
-
-		# Plot the close price
-		plt.plot(self.data.index, self.data['close'], label="Close", color='black')
-
-		# Plot the fast and slow moving averages
-		plt.plot(self.data.index, self.data['Fast_MA'], label=f"Fast MA ({self.fast_period})", color='blue')
-		plt.plot(self.data.index, self.data['Slow_MA'], label=f"Slow MA ({self.slow_period})", color='red')
-
-		# Plot buy signals (crossover == 2)
-		plt.plot(self.results.loc[self.results['Crossover'] == 2].index, 
-						self.results.loc[self.results['Crossover'] == 2, 'Fast_MA'], 
-						'^', color='green', markersize=12, label="Buy Signal")
-
-		# Plot sell signals (crossover == -2)
-		plt.plot(self.results.loc[self.results['Crossover'] == -2].index, 
-						self.results.loc[self.results['Crossover'] == -2, 'Fast_MA'], 
-						'v', color='red', markersize=12, label="Sell Signal")
-
-		# Add title and legend
-		plt.title('Moving Average Crossover Signals')
-		plt.legend(loc='upper left')
+		Reporting.draw_signals(plt.gca(), self.data, self.results, self.fast_period, self.slow_period)
 		plt.show()
 
 
 			
-	def run_moving_average_strategy(self, symbol, timeframe, start_time, count):
+	def run_moving_average_strategy(self, symbol, timeframe, start_time, count, plot=False, save_signals=True, report=None,
+			cache=None, save_rates=False):
 		"""
 		Fetch rates data and apply the Moving Average Crossover strategy.
 
@@ -174,13 +392,18 @@ class MovingAverageCrossover:
 		:param timeframe: Timeframe for the rates (e.g., mt5.TIMEFRAME_M15).
 		:param start_time: Starting datetime for fetching rates.
 		:param count: Number of bars to fetch.
+		:param plot: Show the signal and performance charts (blocks until they are closed), for interactive use only.
+		:param save_signals: Append the identified entry levels to the signal journal.
+		:param report: Optional Reporting.ReportWriter that renders the charts to files in the background.
+		:param cache: Optional IndicatorCache shared with other strategies on the same symbol and timeframe.
+		:param save_rates: Let backtest_strategy() dump the frame to Logs/Rates/<symbol>_rates.csv.
 		"""
 		# Fetch data
 		rates = self.data
-		print(rates)
+		logger.debug("%s", rates)
 		
 		if rates is None:
-				print(f"Failed to retrieve data for {symbol}.")
+				logger.error("Failed to retrieve data for %s.", symbol)
 				return None
 
 		# Convert rates to a DataFrame
@@ -189,16 +412,23 @@ class MovingAverageCrossover:
 		rates_frame.set_index('time', inplace=True)
 
 		# Apply the strategy
-		strategy = MovingAverageCrossover( self.symbol ,rates_frame, self.fast_period, self.slow_period)
-		strategy.calculate_moving_averages()
+		# The strategy takes over the converted frame, `self.data` keeps the rates so the run can be repeated
+		strategy = MovingAverageCrossover(self.symbol, rates_frame, self.fast_period, self.slow_period, self.low_memory)
+		strategy.calculate_moving_averages(cache, timeframe)
 		strategy.generate_signals()
 		strategy.identify_entry_levels()
-		strategy.save_signals_to_csv()
-		results = strategy.backtest_strategy()
+		if save_signals:
+			strategy.save_signals_to_journal()
+		results = strategy.backtest_strategy(save_rates)
+		self.signals = strategy.signals
+		self.results = results
 
 		# Plot the results
-		strategy.plot_charts()
-		strategy.plot_performance()
+		if report is not None:
+			report.submit_strategy(strategy)
+		if plot:
+			strategy.plot_charts()
+			strategy.plot_performance()
 		return results
 
 
@@ -0,0 +1,106 @@
+import numpy as np
+import pandas as pd
+
+
+def rolling_means(close, periods):
+	"""
+	Compute the shifted rolling mean of `close` for every period from a single cumulative sum.
+
+	Row i of the result equals `close.rolling(periods[i]).mean().shift()`, with NaN during warm-up.
+	:param close: 1-D array of close prices.
+	:param periods: Iterable of window lengths.
+	:return: (len(periods), len(close)) float64 array.
+	"""
+	close = np.asarray(close, dtype=np.float64)
+	n = len(close)
+	# Work relative to the first price so the running sum stays small on long histories
+	base = close[0] if n else 0.0
+	csum = np.empty(n + 1, dtype=np.float64)
+	csum[0] = 0.0
+	np.cumsum(close - base, out=csum[1:])
+
+	means = np.full((len(periods), n), np.nan, dtype=np.float64)
+	for row, period in enumerate(periods):
+		if period < 1:
+			raise ValueError("Periods must be positive integers.")
+		if period < n:
+			# mean(close[t - period:t]) lands on row t, which is the `.shift()` of the batch path
+			means[row, period:] = (csum[period:n] - csum[:n - period]) / period + base
+	return means
+
+
+def sweep_moving_averages(close, fast_periods, slow_periods, periods_per_year=None, max_cells=20_000_000):
+	"""
+	Backtest every (fast, slow) pair of a moving-average crossover grid in one vectorized pass.
+
+	Each row of the result matches what backtest_strategy() would report for that pair on the same
+	data, without building a DataFrame per combination or touching the disk.
+
+	:param close: 1-D array (or Series) of close prices, oldest first.
+	:param fast_periods: Candidate fast-moving average periods.
+	:param slow_periods: Candidate slow-moving average periods. Pairs with fast >= slow are skipped.
+	:param periods_per_year: Annualisation factor for the Sharpe ratio, left per-bar when None.
+	:param max_cells: Upper bound on grid rows x bars held in memory at once.
+	:return: DataFrame with one row of summary statistics per pair.
+	"""
+	close = np.asarray(close, dtype=np.float64)
+	n = len(close)
+	pairs = [(fast, slow) for fast in fast_periods for slow in slow_periods if fast < slow]
+	columns = ['fast_period', 'slow_period', 'bars', 'total_return', 'market_return',
+			'sharpe', 'max_drawdown', 'trades']
+	if not pairs or n < 3:
+		return pd.DataFrame(columns=columns)
+
+	periods = sorted({period for pair in pairs for period in pair})
+	row_of = {period: row for row, period in enumerate(periods)}
+	means = rolling_means(close, periods)
+
+	market_returns = np.zeros(n, dtype=np.float64)
+	market_returns[1:] = close[1:] / close[:-1] - 1
+	market_curve = np.cumprod(1 + market_returns)
+
+	fast = np.array([pair[0] for pair in pairs])
+	slow = np.array([pair[1] for pair in pairs])
+	# First row that survives both dropna() calls of generate_signals and backtest_strategy
+	first = np.maximum(fast, slow) + 1
+	bars = np.clip(n - first, 0, None)
+	steps = np.arange(n)
+
+	stats = {name: np.full(len(pairs), np.nan) for name in columns[3:]}
+	chunk = max(1, max_cells // n)
+	for lo in range(0, len(pairs), chunk):
+		hi = min(lo + chunk, len(pairs))
+		valid = steps[None, :] >= first[lo:hi, None]
+
+		# Signal rule of generate_signals: -1 while the fast average is below the slow one, else 0
+		signal = -(means[[row_of[p] for p in fast[lo:hi]]] < means[[row_of[p] for p in slow[lo:hi]]]).astype(np.int8)
+		position = np.zeros_like(signal)
+		position[:, 1:] = signal[:, :-1]
+
+		strategy_returns = market_returns * position
+		strategy_returns[~valid] = 0.0
+		equity = np.cumprod(1 + strategy_returns, axis=1)
+		drawdown = equity / np.maximum.accumulate(equity, axis=1) - 1
+
+		count = bars[lo:hi]
+		total = strategy_returns.sum(axis=1)
+		mean = np.divide(total, count, out=np.full(hi - lo, np.nan), where=count > 0)
+		variance = np.divide((strategy_returns ** 2).sum(axis=1) - count * mean ** 2, count - 1,
+				out=np.full(hi - lo, np.nan), where=count > 1)
+		std = np.sqrt(np.clip(variance, 0, None))
+		sharpe = np.divide(mean, std, out=np.full(hi - lo, np.nan), where=std > 0)
+		if periods_per_year:
+			sharpe *= np.sqrt(periods_per_year)
+
+		changes = (position[:, 1:] != position[:, :-1]) & valid[:, :-1] & valid[:, 1:]
+		start = np.minimum(first[lo:hi] - 1, n - 1)
+
+		stats['total_return'][lo:hi] = equity[:, -1] - 1
+		stats['market_return'][lo:hi] = market_curve[-1] / market_curve[start] - 1
+		stats['sharpe'][lo:hi] = sharpe
+		stats['max_drawdown'][lo:hi] = drawdown.min(axis=1)
+		stats['trades'][lo:hi] = changes.sum(axis=1)
+
+	results = pd.DataFrame({'fast_period': fast, 'slow_period': slow, 'bars': bars, **stats}, columns=columns)
+	results['trades'] = results['trades'].astype(np.int64)
+	return results
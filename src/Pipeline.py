@@ -0,0 +1,157 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import pandas as pd
+import MovingAverage as MA
+import Metrics
+import SharedPrices
+from SignalJournal import SignalJournal
+
+
+def run_symbol(symbol, rates, fast_period=50, slow_period=200, low_memory=False):
+	"""
+	Run the crossover strategy for one symbol without plotting, writing the signal journal or dumping the rates CSV.
+
+	Module level so it can be pickled into a process pool worker.
+	:return: (summary dict, entry levels DataFrame)
+	"""
+	strategy = MA.MovingAverageCrossover(symbol, rates, fast_period, slow_period, low_memory=low_memory)
+	results = strategy.run_moving_average_strategy(symbol, None, None, None, plot=False, save_signals=False,
+			save_rates=False)
+	summary = {
+		'symbol': symbol,
+		'bars': len(rates),
+		'signals': 0 if strategy.signals is None else len(strategy.signals),
+		'total_return': None,
+		'market_return': None,
+		'last_time': None,
+		'last_signal': None,
+		'error': None,
+	}
+	if results is not None and len(results) > 0:
+		last = results.iloc[-1]
+		summary['total_return'] = last['Cumulative_Strategy_Returns'] - 1
+		summary['market_return'] = last['Cumulative_Market_Returns'] - 1
+		summary['last_time'] = results.index[-1]
+		summary['last_signal'] = int(last['Signal'])
+	return summary, strategy.signals
+
+
+def run_symbol_in_worker(symbol, rates, fast_period=50, slow_period=200, low_memory=False):
+	"""run_symbol() in a pool process, also returning the stage metrics it recorded there for the parent to merge."""
+	Metrics.REGISTRY.drain()
+	summary, signals = run_symbol(symbol, rates, fast_period, slow_period, low_memory)
+	return summary, signals, Metrics.REGISTRY.drain()
+
+
+def run_symbol_shared(symbol, timeframe, count=None, prefix="prices", fast_period=50, slow_period=200, low_memory=False):
+	"""
+	run_symbol_in_worker() on the bars a SharedPrices.PriceIngestor publishes.
+
+	Only the symbol crosses the process boundary, the bars are copied out of the shared ring.
+	The copy is taken inside the ring's sequence check, so a bar published meanwhile cannot
+	change them under the run.
+	:param count: Newest bars to run on, everything the ring holds by default.
+	"""
+	rates = SharedPrices.attach_ring(symbol, timeframe, prefix).read(count, copy=True)
+	return run_symbol_in_worker(symbol, rates, fast_period, slow_period, low_memory)
+
+
+class SymbolPipeline:
+	"""Fan the per-symbol strategy run out over a process or thread pool and gather one report."""
+
+	def __init__(self, client, fast_period=50, slow_period=200, max_workers=None, executor='process', low_memory=False):
+		"""
+		:param client: A connected MetaTrader5Client.
+		:param fast_period: Period for the fast-moving average.
+		:param slow_period: Period for the slow-moving average.
+		:param max_workers: Pool size, defaults to the number of CPUs.
+		:param executor: 'process' for CPU-bound runs, 'thread' when workers must share the interpreter.
+		:param low_memory: Run each symbol in the strategy's low-memory mode.
+		"""
+		if executor not in ('process', 'thread'):
+			raise ValueError("executor must be 'process' or 'thread'.")
+		self.client = client
+		self.fast_period = fast_period
+		self.slow_period = slow_period
+		self.max_workers = max_workers or os.cpu_count() or 1
+		self.executor = executor
+		self.low_memory = low_memory
+
+	def fetch(self, symbols, timeframe, start_time, end_time):
+		"""
+		Fetch the rates of every symbol.
+
+		The terminal answers one request at a time over its IPC channel, so fetching stays in the
+		calling process and only the strategy work is spread over the pool.
+		"""
+		rates = {}
+		for symbol in symbols:
+			rates[symbol] = self.client.get_rates_range(symbol, timeframe, start_time, end_time)
+		return rates
+
+	def run(self, symbols, timeframe, start_time, end_time, journal=None):
+		"""
+		Fetch, calculate, signal and backtest every symbol in parallel, headless.
+
+		:param symbols: Symbols to process.
+		:param timeframe: Timeframe for the rates (e.g., mt5.TIMEFRAME_H1).
+		:param start_time: Start of the rates range.
+		:param end_time: End of the rates range.
+		:param journal: Optional SignalJournal (or its path, then opened and closed here) the gathered entry levels are
+			appended to, from this process only.
+		:return: DataFrame with one summary row per symbol.
+		"""
+		if isinstance(journal, str):
+			with SignalJournal(journal) as journal:
+				return self.run(symbols, timeframe, start_time, end_time, journal)
+		rates = self.fetch(symbols, timeframe, start_time, end_time)
+		rows = {}
+		pool_class = ProcessPoolExecutor if self.executor == 'process' else ThreadPoolExecutor
+		with pool_class(max_workers=self.max_workers) as pool:
+			futures = {}
+			for symbol in symbols:
+				if rates[symbol] is None or len(rates[symbol]) == 0:
+					rows[symbol] = {'symbol': symbol, 'bars': 0, 'error': 'no rates returned'}
+					continue
+				task = run_symbol_in_worker if self.executor == 'process' else run_symbol
+				futures[symbol] = pool.submit(task, symbol, rates[symbol], self.fast_period, self.slow_period, self.low_memory)
+			self._gather(futures, rows, journal, {symbol: len(rates[symbol]) for symbol in futures})
+
+		report = pd.DataFrame([rows[symbol] for symbol in symbols])
+		return report.set_index('symbol')
+
+	def run_shared(self, symbols, timeframe, count=None, prefix="prices", journal=None):
+		"""
+		Same as run(), on the rings a SharedPrices.PriceIngestor keeps up to date instead of fetching.
+
+		Every worker copies its bars out of shared memory, nothing is fetched or pickled per symbol.
+		:param count: Newest bars to run on, everything the rings hold by default.
+		:param prefix: Block name prefix the ingestor was given.
+		"""
+		if self.executor != 'process':
+			raise ValueError("run_shared() spreads the work over processes, use the 'process' executor.")
+		if isinstance(journal, str):
+			with SignalJournal(journal) as journal:
+				return self.run_shared(symbols, timeframe, count, prefix, journal)
+		rows = {}
+		with ProcessPoolExecutor(max_workers=self.max_workers) as pool:
+			futures = {symbol: pool.submit(run_symbol_shared, symbol, timeframe, count, prefix, self.fast_period,
+					self.slow_period, self.low_memory) for symbol in symbols}
+			self._gather(futures, rows, journal)
+
+		report = pd.DataFrame([rows[symbol] for symbol in symbols])
+		return report.set_index('symbol')
+
+	def _gather(self, futures, rows, journal, bars=None):
+		for symbol, future in futures.items():
+			try:
+				summary, signals, *metrics = future.result()
+			except Exception as e:
+				rows[symbol] = {'symbol': symbol, 'bars': (bars or {}).get(symbol), 'error': repr(e)}
+				continue
+			rows[symbol] = summary
+			if metrics:
+				Metrics.REGISTRY.merge(*metrics[0])
+			if journal is not None and signals is not None:
+				# Workers never touch the journal, all appends go through this process
+				journal.append_frame(signals, fast_period=self.fast_period, slow_period=self.slow_period)
@@ -0,0 +1,189 @@
+import logging
+import math
+import threading
+import numpy as np
+import MetaTrader5 as mt5
+import SymbolRegistry
+
+
+logger = logging.getLogger(__name__)
+
+SIDES = {'buy': 1, 'sell': -1}
+
+
+class _Holding:
+	__slots__ = ('lots', 'base', 'quote', 'contract_size')
+
+	def __init__(self, base, quote, contract_size):
+		self.lots = 0.0
+		self.base = base
+		self.quote = quote
+		self.contract_size = contract_size
+
+
+class PositionBook:
+	"""
+	Net position per symbol and net exposure per currency for the whole account.
+
+	Open positions are read from positions_get() once, then every fill is applied as it comes
+	back from order_send(), so the book never asks the terminal again. Exposures live in a NumPy
+	array indexed by currency: a fill of `lots` at `price` adds lots * contract size to the base
+	currency and takes lots * contract size * price from the quote currency. A limit check only
+	touches the symbol's two currencies, so it costs microseconds and no round trip.
+	"""
+
+	def __init__(self, symbols=None, max_lots=None, max_exposure=None):
+		"""
+		:param symbols: SymbolRegistry the contract sizes and currencies are read from, the process-wide one by default.
+		:param max_lots: Largest net lots per symbol, a number for every symbol or a dict by symbol.
+		:param max_exposure: Largest absolute net exposure per currency in units of that currency,
+			a number for every currency or a dict by currency.
+		"""
+		self.symbols = symbols or SymbolRegistry.REGISTRY
+		self.holdings = {}
+		self.currencies = {}
+		self.exposure = np.zeros(8, dtype=np.float64)
+		self.limits = np.full(8, np.inf, dtype=np.float64)
+		self.loaded = False
+		self.lock = threading.Lock()
+		self.set_limits(max_lots, max_exposure)
+
+	def set_limits(self, max_lots=None, max_exposure=None):
+		"""Replace the limits, see __init__. None lifts a limit."""
+		with self.lock:
+			self.max_lots = max_lots
+			self.max_exposure = max_exposure
+			for currency, index in self.currencies.items():
+				self.limits[index] = self._exposure_limit(currency)
+
+	def _exposure_limit(self, currency):
+		if self.max_exposure is None:
+			return np.inf
+		if isinstance(self.max_exposure, dict):
+			return self.max_exposure.get(currency, np.inf)
+		return self.max_exposure
+
+	def _lot_limit(self, symbol):
+		if self.max_lots is None:
+			return math.inf
+		if isinstance(self.max_lots, dict):
+			return self.max_lots.get(symbol, math.inf)
+		return self.max_lots
+
+	def _currency(self, currency):
+		index = self.currencies.get(currency)
+		if index is None:
+			index = len(self.currencies)
+			if index == len(self.exposure):
+				self.exposure = np.concatenate([self.exposure, np.zeros(index)])
+				self.limits = np.concatenate([self.limits, np.full(index, np.inf)])
+			self.currencies[currency] = index
+			self.limits[index] = self._exposure_limit(currency)
+		return index
+
+	def _holding(self, symbol):
+		holding = self.holdings.get(symbol)
+		if holding is None:
+			info = self.symbols.info(symbol)
+			if info is None:
+				logger.warning("No symbol info for %s, its currency exposure is not tracked.", symbol)
+				holding = _Holding(-1, -1, 0.0)
+			else:
+				holding = _Holding(self._currency(info.currency_base), self._currency(info.currency_profit),
+						info.trade_contract_size)
+			self.holdings[symbol] = holding
+		return holding
+
+	def load(self):
+		"""(Re)build the book from the terminal's open positions, e.g. at start-up. False when the terminal fails."""
+		positions = mt5.positions_get()
+		if positions is None:
+			logger.error("positions_get() failed, error code: %s", mt5.last_error())
+			return False
+		with self.lock:
+			self.holdings = {}
+			self.exposure[:] = 0.0
+			for position in positions:
+				side = 1 if position.type == mt5.POSITION_TYPE_BUY else -1
+				self._apply(position.symbol, side * position.volume, position.price_open)
+			self.loaded = True
+		logger.info("Position book loaded %d open positions.", len(positions))
+		return True
+
+	def ensure_loaded(self):
+		"""Load the book on first use only."""
+		return self.loaded or self.load()
+
+	def _apply(self, symbol, lots, price):
+		holding = self._holding(symbol)
+		holding.lots = round(holding.lots + lots, 8)
+		if holding.base >= 0:
+			units = lots * holding.contract_size
+			self.exposure[holding.base] += units
+			self.exposure[holding.quote] -= units * price
+
+	def fill(self, symbol, action, volume, price, reserved=None):
+		"""
+		Apply a deal done by order_send().
+
+		:param action: 'buy' or 'sell'.
+		:param volume: Lots filled (the result's volume).
+		:param price: Fill price (the result's price).
+		:param reserved: (volume, price) the order was reserved with by check(), replaced by the fill.
+		"""
+		with self.lock:
+			if reserved is not None:
+				self._apply(symbol, -SIDES[action] * reserved[0], reserved[1])
+			self._apply(symbol, SIDES[action] * volume, price)
+
+	def release(self, symbol, action, volume, price):
+		"""Undo the reservation check() made for an order that was not filled."""
+		with self.lock:
+			self._apply(symbol, -SIDES[action] * volume, price)
+
+	def check(self, symbol, action, volume, price, reserve=False):
+		"""
+		Why an order would breach a limit, without asking the terminal.
+
+		An order that brings a position or an exposure closer to zero is always allowed.
+		:param reserve: Count an allowed order in the book at once, under the same lock, so orders checked
+			while it is in flight see it too. Replace the reservation with fill(..., reserved=(volume, price))
+			or undo it with release().
+		:return: Reason string, or None when the order is within every limit.
+		"""
+		lots = SIDES[action] * volume
+		with self.lock:
+			holding = self._holding(symbol)
+			held = holding.lots
+			after = held + lots
+			if abs(after) > self._lot_limit(symbol) and abs(after) > abs(held):
+				return f"{symbol} net position would be {after:g} lots, above the {self._lot_limit(symbol):g} lot limit."
+			if holding.base >= 0:
+				units = lots * holding.contract_size
+				for index, change in ((holding.base, units), (holding.quote, -units * price)):
+					now = self.exposure[index]
+					if abs(now + change) > self.limits[index] and abs(now + change) > abs(now):
+						currency = next(name for name, i in self.currencies.items() if i == index)
+						return f"{currency} exposure would be {now + change:,.2f}, above the {self.limits[index]:,.2f} limit."
+			if reserve:
+				self._apply(symbol, lots, price)
+		return None
+
+	def lots(self, symbol):
+		"""Net lots held in `symbol`, positive long and negative short."""
+		holding = self.holdings.get(symbol)
+		return holding.lots if holding is not None else 0.0
+
+	def side(self, symbol):
+		"""'buy', 'sell' or None, the way MT5TradingAlgorithm tracks its position."""
+		lots = self.lots(symbol)
+		return 'buy' if lots > 0 else 'sell' if lots < 0 else None
+
+	def exposures(self):
+		"""Net exposure by currency."""
+		with self.lock:
+			return {currency: float(self.exposure[index]) for currency, index in self.currencies.items()}
+
+
+# Process-wide book the trading algorithms share, limits set with BOOK.set_limits()
+BOOK = PositionBook()
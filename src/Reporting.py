@@ -0,0 +1,146 @@
+import base64
+import importlib.util
+import io
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+
+logger = logging.getLogger(__name__)
+
+
+def matplotlib_available():
+	"""Whether matplotlib is installed, checked without importing it."""
+	return importlib.util.find_spec("matplotlib") is not None
+
+
+def _register_converters():
+	from pandas.plotting import register_matplotlib_converters
+	register_matplotlib_converters()
+
+
+def pyplot():
+	"""
+	matplotlib.pyplot, imported on first use only.
+
+	For the interactive plot_* methods; the trading loop never pays for the import or a GUI backend.
+	"""
+	import matplotlib.pyplot as plt
+	_register_converters()
+	return plt
+
+
+def new_figure(figsize=(12, 6)):
+	"""A standalone Agg figure, safe to draw and save off the main thread since it bypasses pyplot's global state."""
+	from matplotlib.figure import Figure
+	_register_converters()
+	return Figure(figsize=figsize)
+
+
+def draw_signals(ax, data, results, fast_period, slow_period):
+	"""Close price, both moving averages and the buy / sell crossovers."""
+	ax.plot(data.index, data['close'], label="Close", color='black')
+	ax.plot(data.index, data['Fast_MA'], label=f"Fast MA ({fast_period})", color='blue')
+	ax.plot(data.index, data['Slow_MA'], label=f"Slow MA ({slow_period})", color='red')
+
+	# Plot buy signals (crossover == 2)
+	buys = results['Crossover'] == 2
+	ax.plot(results.index[buys], results.loc[buys, 'Fast_MA'], '^', color='green', markersize=12, label="Buy Signal")
+
+	# Plot sell signals (crossover == -2)
+	sells = results['Crossover'] == -2
+	ax.plot(results.index[sells], results.loc[sells, 'Fast_MA'], 'v', color='red', markersize=12, label="Sell Signal")
+
+	ax.set_title('Moving Average Crossover Signals')
+	ax.legend(loc='upper left')
+
+
+def draw_performance(ax, results):
+	"""Cumulative strategy returns against the market's."""
+	ax.plot(results.index, results['Cumulative_Market_Returns'], label='Market Returns', color='blue')
+	ax.plot(results.index, results['Cumulative_Strategy_Returns'], label='Strategy Returns', color='green')
+	ax.set_title('Moving Average Crossover Strategy Performance')
+	ax.legend()
+
+
+class ReportWriter:
+	"""
+	Renders strategy charts to PNG and/or HTML files on a background thread.
+
+	submit_strategy() only snapshots the columns the charts need and returns; the figures are
+	drawn with the Agg backend and written by a single worker, away from the trading loop.
+	When disabled, or when matplotlib is not installed, submissions are dropped.
+	"""
+
+	def __init__(self, directory="Logs/Reports", formats=('png',), enabled=True):
+		"""
+		:param directory: Folder the report files are written to.
+		:param formats: Any of 'png' and 'html' (a page embedding the charts).
+		:param enabled: False turns every submission into a no-op, e.g. in production.
+		"""
+		unknown = set(formats) - {'png', 'html'}
+		if unknown:
+			raise ValueError(f"Unsupported report formats: {sorted(unknown)}")
+		self.directory = directory
+		self.formats = tuple(formats)
+		self.enabled = enabled and matplotlib_available()
+		if enabled and not self.enabled:
+			logger.warning("matplotlib is not installed, reports are disabled.")
+		self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="report") if self.enabled else None
+
+	def submit_strategy(self, strategy, name=None):
+		"""
+		Queue the signal and performance charts of a backtested MovingAverageCrossover.
+
+		:param name: File name prefix, the strategy's symbol by default.
+		:return: Future resolving to the list of written paths, or None when reports are disabled.
+		"""
+		if not self.enabled:
+			return None
+		if strategy.results is None:
+			raise ValueError("No results available. Run backtest_strategy() first.")
+		# Copies, so the strategy can go on changing its frames while the worker draws
+		data = strategy.data[['close', 'Fast_MA', 'Slow_MA']].copy()
+		results = strategy.results[['Crossover', 'Fast_MA', 'Cumulative_Market_Returns', 'Cumulative_Strategy_Returns']].copy()
+		return self.executor.submit(self._render_strategy, name or strategy.symbol, data, results,
+				strategy.fast_period, strategy.slow_period)
+
+	def _render_strategy(self, name, data, results, fast_period, slow_period):
+		charts = {}
+		figure = new_figure()
+		draw_signals(figure.subplots(), data, results, fast_period, slow_period)
+		charts['signals'] = figure
+		figure = new_figure()
+		draw_performance(figure.subplots(), results)
+		charts['performance'] = figure
+		return self._save(name, charts)
+
+	def _save(self, name, charts):
+		os.makedirs(self.directory, exist_ok=True)
+		paths = []
+		images = {}
+		for chart, figure in charts.items():
+			buffer = io.BytesIO()
+			figure.savefig(buffer, format='png')
+			images[chart] = buffer.getvalue()
+			if 'png' in self.formats:
+				path = os.path.join(self.directory, f"{name}_{chart}.png")
+				with open(path, 'wb') as file:
+					file.write(images[chart])
+				paths.append(path)
+
+		if 'html' in self.formats:
+			path = os.path.join(self.directory, f"{name}.html")
+			body = "\n".join(
+				f'<h2>{chart}</h2>\n<img src="data:image/png;base64,{base64.b64encode(image).decode("ascii")}">'
+				for chart, image in images.items())
+			with open(path, 'w', encoding='utf-8') as file:
+				file.write(f"<!DOCTYPE html>\n<html><head><meta charset=\"utf-8\"><title>{name}</title></head>\n"
+						f"<body>\n<h1>{name}</h1>\n{body}\n</body></html>\n")
+			paths.append(path)
+		return paths
+
+	def close(self, wait=True):
+		"""Stop the worker, by default after the queued reports are written."""
+		if self.executor is not None:
+			self.executor.shutdown(wait=wait)
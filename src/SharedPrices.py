@@ -0,0 +1,283 @@
+import logging
+import os
+import time
+from datetime import datetime, timezone
+from multiprocessing import shared_memory
+import numpy as np
+from BarStore import RATES_DTYPE, as_rates
+
+
+logger = logging.getLogger(__name__)
+
+# Header slots, int64 each: sequence counter, bars written since creation, capacity, layout version,
+# writer process id and the writer's last sign of life in epoch seconds
+_SEQUENCE, _WRITTEN, _CAPACITY, _VERSION, _WRITER, _HEARTBEAT = range(6)
+HEADER_BYTES = 64
+LAYOUT_VERSION = 2
+
+
+def ring_name(symbol, timeframe, prefix="prices"):
+	"""Shared memory block name of a symbol's ring, so readers attach by symbol without being sent anything."""
+	return f"{prefix}_{symbol}_{timeframe}"
+
+
+def _attach(name):
+	"""Open an existing block without letting this process's resource tracker unlink it at exit."""
+	try:
+		return shared_memory.SharedMemory(name=name, track=False)
+	except TypeError:
+		# Python < 3.13 registers every attach, and would destroy the writer's block when a reader exits
+		from multiprocessing import resource_tracker
+		register = resource_tracker.register
+		resource_tracker.register = lambda name, rtype: None
+		try:
+			return shared_memory.SharedMemory(name=name)
+		finally:
+			resource_tracker.register = register
+
+
+def _alive(pid):
+	"""Whether process `pid` still runs."""
+	if os.name == 'nt':
+		# Windows frees a block with its last handle, one that still exists is mapped by a live process
+		return True
+	try:
+		os.kill(pid, 0)
+	except ProcessLookupError:
+		return False
+	except PermissionError:
+		return True
+	return True
+
+
+class SharedPriceRing:
+	"""
+	Ring buffer of RATES_DTYPE bars in shared memory, one writer and any number of readers.
+
+	Every bar is stored twice, at i and i + capacity, so the newest `count` bars are always one
+	contiguous slice, copied out with a single memcpy or mapped as a NumPy view of the block.
+	The writer makes the sequence counter odd while it writes and even again when done; a reader
+	retries until it reads the same even value before and after, so no lock is ever taken.
+	The counter only guards what is read between those two readings: data that must stay put
+	while the writer runs is read with copy=True, views are for rings that are not being written.
+	"""
+
+	def __init__(self, block, owner=False):
+		self.block = block
+		self.owner = owner
+		self.header = np.ndarray((HEADER_BYTES // 8,), dtype=np.int64, buffer=block.buf)
+		if self.header[_VERSION] != LAYOUT_VERSION:
+			raise ValueError(f"Shared block {block.name} is not a price ring.")
+		self.capacity = int(self.header[_CAPACITY])
+		self.records = np.ndarray((2 * self.capacity,), dtype=RATES_DTYPE, buffer=block.buf, offset=HEADER_BYTES)
+
+	@classmethod
+	def create(cls, name, capacity, stale_after=60.0):
+		"""
+		Allocate a ring for the writer, replacing a stale block of the same name left by a crashed run.
+
+		A block is stale when its writer process is gone or has not written for `stale_after` seconds.
+		:param capacity: Newest bars kept; readers can ask for at most this many.
+		:raises FileExistsError: When the block belongs to a live writer, or is not a ring this version can vouch for.
+		"""
+		size = HEADER_BYTES + 2 * capacity * RATES_DTYPE.itemsize
+		try:
+			block = shared_memory.SharedMemory(name=name, create=True, size=size)
+		except FileExistsError:
+			cls._unlink_stale(name, stale_after)
+			block = shared_memory.SharedMemory(name=name, create=True, size=size)
+		header = np.ndarray((HEADER_BYTES // 8,), dtype=np.int64, buffer=block.buf)
+		header[:] = 0
+		header[_CAPACITY] = capacity
+		header[_VERSION] = LAYOUT_VERSION
+		header[_WRITER] = os.getpid()
+		header[_HEARTBEAT] = int(time.time())
+		del header
+		return cls(block, owner=True)
+
+	@staticmethod
+	def _unlink_stale(name, stale_after):
+		existing = _attach(name)
+		try:
+			header = np.ndarray((HEADER_BYTES // 8,), dtype=np.int64, buffer=existing.buf)
+			version, writer, heartbeat = int(header[_VERSION]), int(header[_WRITER]), int(header[_HEARTBEAT])
+			del header
+		finally:
+			existing.close()
+		if version != LAYOUT_VERSION:
+			raise FileExistsError(f"Shared block {name} exists and is not a price ring of this version, unlink it by hand.")
+		if _alive(writer) and time.time() - heartbeat < stale_after:
+			raise FileExistsError(f"Shared block {name} is written by the running process {writer}.")
+		logger.warning("Replacing the stale shared block %s of process %d.", name, writer)
+		stale = shared_memory.SharedMemory(name=name)
+		stale.close()
+		stale.unlink()
+
+	@classmethod
+	def attach(cls, name):
+		"""Map a ring created by another process, read-only by convention."""
+		return cls(_attach(name))
+
+	@property
+	def sequence(self):
+		"""Even when the ring is stable, bumped by 2 for every write: compare two readings to detect new bars."""
+		return int(self.header[_SEQUENCE])
+
+	def __len__(self):
+		return min(int(self.header[_WRITTEN]), self.capacity)
+
+	def write(self, rates):
+		"""
+		Append bars newer than the ring's last one, from the single writer process.
+
+		A bar with the same time as the last one replaces it, so a bar written while it was still
+		forming gets its final values (as BarStore.append does).
+		:return: Number of bars written.
+		"""
+		# Even a poll with nothing new shows the writer is alive
+		self.header[_HEARTBEAT] = int(time.time())
+		if rates is None or len(rates) == 0:
+			return 0
+		rates = as_rates(rates)
+		written = int(self.header[_WRITTEN])
+		start = written
+		if written:
+			last = self.records[(written - 1) % self.capacity]['time']
+			rates = rates[rates['time'] >= last]
+			if len(rates) == 0:
+				return 0
+			if rates['time'][0] == last:
+				start -= 1
+		if len(rates) > self.capacity:
+			start += len(rates) - self.capacity
+			rates = rates[-self.capacity:]
+
+		positions = (start + np.arange(len(rates))) % self.capacity
+		self.header[_SEQUENCE] += 1
+		self.records[positions] = rates
+		self.records[positions + self.capacity] = rates
+		self.header[_WRITTEN] = start + len(rates)
+		self.header[_SEQUENCE] += 1
+		return len(rates)
+
+	def read(self, count=None, copy=False):
+		"""
+		The newest bars, oldest first.
+
+		:param count: Bars wanted, all the ring holds by default.
+		:param copy: Return a private copy, taken inside the sequence check, instead of a read-only
+			view of the shared block. A view is not safe to use on a live ring: the next write
+			can overwrite its oldest bars (at once when it spans the whole capacity) or its last
+			one in place, so use views only while the writer is stopped and check `sequence` after.
+		:return: RATES_DTYPE array, as mt5.copy_rates_* returns.
+		"""
+		while True:
+			sequence = self.header[_SEQUENCE]
+			if sequence & 1:
+				time.sleep(0)
+				continue
+			written = int(self.header[_WRITTEN])
+			n = min(written, self.capacity) if count is None else min(count, written, self.capacity)
+			start = (written - n) % self.capacity if n else 0
+			bars = self.records[start:start + n]
+			if copy:
+				bars = bars.copy()
+			if self.header[_SEQUENCE] == sequence:
+				break
+		if not copy:
+			bars = bars.view()
+			bars.flags.writeable = False
+		return bars
+
+	def last_time(self):
+		"""Time of the newest bar, or None while the ring is empty."""
+		bars = self.read(1, copy=True)
+		return int(bars['time'][0]) if len(bars) else None
+
+	def close(self):
+		"""Unmap the block; views returned by read() must be dropped first. The writer also frees it."""
+		del self.header, self.records
+		self.block.close()
+		if self.owner:
+			self.block.unlink()
+
+
+# Rings already attached in this process, by block name
+_attached = {}
+
+
+def attach_ring(symbol, timeframe, prefix="prices"):
+	"""Ring of a symbol published by a PriceIngestor, attached once per process."""
+	name = ring_name(symbol, timeframe, prefix)
+	if name not in _attached:
+		_attached[name] = SharedPriceRing.attach(name)
+	return _attached[name]
+
+
+class PriceIngestor:
+	"""
+	The one process that fetches rates from the terminal and publishes them in shared rings.
+
+	Strategy processes attach to the rings with attach_ring() and copy the bars they need straight
+	out of shared memory, so the prices are held once and never pickled between processes.
+	"""
+
+	def __init__(self, client, symbols, timeframe, capacity=10_000, prefix="prices"):
+		"""
+		:param client: A connected MetaTrader5Client.
+		:param symbols: Symbols to publish.
+		:param timeframe: Timeframe of the bars (e.g., mt5.TIMEFRAME_H1).
+		:param capacity: Newest bars kept per symbol.
+		:param prefix: Block name prefix, to run several ingestors side by side.
+		"""
+		self.client = client
+		self.symbols = list(symbols)
+		self.timeframe = timeframe
+		self.capacity = capacity
+		self.prefix = prefix
+		self.rings = {}
+
+	def start(self, end_time=None):
+		"""Create the rings and fill them with the newest `capacity` bars of every symbol."""
+		end_time = end_time or datetime.now()
+		for symbol in self.symbols:
+			ring = SharedPriceRing.create(ring_name(symbol, self.timeframe, self.prefix), self.capacity)
+			self.rings[symbol] = ring
+			rates = self.client.get_rates_from(symbol, self.timeframe, end_time, self.capacity)
+			ring.write(rates)
+			logger.info("Published %d %s bars in %s.", len(ring), symbol, ring.block.name)
+
+	def poll(self, end_time=None):
+		"""
+		Fetch the bars since each ring's last one and publish them.
+
+		:return: dict of symbol to the number of bars written.
+		"""
+		end_time = end_time or datetime.now()
+		written = {}
+		for symbol, ring in self.rings.items():
+			last = ring.last_time()
+			if last is None:
+				rates = self.client.get_rates_from(symbol, self.timeframe, end_time, self.capacity)
+			else:
+				# From the last bar on, it may have still been forming when it was written
+				rates = self.client.get_rates_range(symbol, self.timeframe, datetime.fromtimestamp(last, tz=timezone.utc), end_time)
+			written[symbol] = ring.write(rates)
+		return written
+
+	def run(self, interval=1.0, should_stop=None):
+		"""
+		Poll every `interval` seconds until `should_stop()` returns True.
+
+		:param should_stop: Callable checked before each poll, runs forever when None.
+		"""
+		while should_stop is None or not should_stop():
+			started = time.monotonic()
+			self.poll()
+			time.sleep(max(0.0, interval - (time.monotonic() - started)))
+
+	def close(self):
+		"""Free every ring; readers still attached keep their mapping until they close it."""
+		for ring in self.rings.values():
+			ring.close()
+		self.rings = {}
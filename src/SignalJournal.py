@@ -0,0 +1,137 @@
+import os
+import sqlite3
+import threading
+import numpy as np
+import pandas as pd
+import Metrics
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS signals (
+	symbol TEXT NOT NULL,
+	time INTEGER NOT NULL,
+	side INTEGER NOT NULL,
+	level REAL NOT NULL,
+	strategy TEXT NOT NULL,
+	fast_period INTEGER,
+	slow_period INTEGER
+);
+CREATE INDEX IF NOT EXISTS signals_symbol_time ON signals (symbol, time);
+"""
+
+# One row per signal and strategy; NULL periods compare equal here, unlike in a plain UNIQUE column list
+UNIQUE_INDEX = """
+CREATE UNIQUE INDEX IF NOT EXISTS signals_unique
+ON signals (symbol, time, strategy, IFNULL(fast_period, -1), IFNULL(slow_period, -1));
+"""
+
+# Journals written before the unique index existed may hold repeated runs, keep the first copy
+DEDUPLICATE = """
+DELETE FROM signals WHERE rowid NOT IN (
+	SELECT MIN(rowid) FROM signals GROUP BY symbol, time, strategy, fast_period, slow_period
+);
+"""
+
+
+def to_epoch_seconds(times):
+	"""Datetime-like values (Timestamps, datetime64, epoch seconds) as an int64 array of epoch seconds."""
+	times = np.asarray(times)
+	if np.issubdtype(times.dtype, np.integer):
+		return times.astype(np.int64)
+	return pd.to_datetime(times).to_numpy().astype('datetime64[s]').astype(np.int64)
+
+
+class SignalJournal:
+	"""
+	Append-only signal store in SQLite, one typed row per signal and an index on (symbol, time).
+
+	Rows are (symbol, time in epoch seconds, side 1 buy / -1 sell, level, strategy, fast_period, slow_period).
+	A signal is stored once per (symbol, time, strategy, fast_period, slow_period): appending the
+	whole history again on every run only adds the signals that are new.
+	"""
+
+	def __init__(self, path="Logs/signals.db"):
+		self.path = path
+		if os.path.dirname(path):
+			os.makedirs(os.path.dirname(path), exist_ok=True)
+		self.connection = sqlite3.connect(path, check_same_thread=False)
+		# WAL turns every append into a sequential log write and lets readers query meanwhile
+		self.connection.execute("PRAGMA journal_mode=WAL")
+		self.connection.execute("PRAGMA synchronous=NORMAL")
+		self.connection.executescript(SCHEMA)
+		with self.connection:
+			if not self.connection.execute(
+					"SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'signals_unique'").fetchone():
+				self.connection.execute(DEDUPLICATE)
+				self.connection.execute(UNIQUE_INDEX)
+		self.lock = threading.Lock()
+
+	def append(self, symbol, times, sides, levels, strategy="ma_crossover", fast_period=None, slow_period=None):
+		"""
+		Append signals of one symbol in a single transaction, skipping the ones already stored.
+
+		:param times: Signal bar times (Timestamps, datetime64 or epoch seconds).
+		:param sides: 1 for buy, -1 for sell.
+		:param levels: Entry price levels.
+		:return: Number of new rows written.
+		"""
+		times = to_epoch_seconds(times)
+		rows = zip(
+			[symbol] * len(times),
+			times.tolist(),
+			np.asarray(sides, dtype=np.int64).tolist(),
+			np.asarray(levels, dtype=np.float64).tolist(),
+			[strategy] * len(times),
+			[fast_period] * len(times),
+			[slow_period] * len(times),
+		)
+		with Metrics.timer('persistence', symbol) as record, self.lock, self.connection:
+			written = self.connection.executemany("INSERT OR IGNORE INTO signals VALUES (?, ?, ?, ?, ?, ?, ?)", rows).rowcount
+			record['items'] = written
+		return written
+
+	def append_frame(self, signals, strategy="ma_crossover", fast_period=None, slow_period=None):
+		"""Append a frame with symbol, time, side and level columns, as built by identify_entry_levels()."""
+		written = 0
+		for symbol, group in signals.groupby('symbol', sort=False):
+			written += self.append(symbol, group['time'].to_numpy(), group['side'].to_numpy(),
+					group['level'].to_numpy(), strategy, fast_period, slow_period)
+		return written
+
+	def since(self, symbol, start_time=0, end_time=None, side=None):
+		"""
+		Signals for a symbol from `start_time` on, served from the (symbol, time) index.
+
+		:param start_time: First signal time, datetime-like or epoch seconds.
+		:param end_time: Optional last signal time.
+		:param side: Optional 1 or -1 to return only buys or sells.
+		:return: DataFrame ordered by time, with `time` as datetime64.
+		"""
+		query = "SELECT symbol, time, side, level, strategy, fast_period, slow_period FROM signals WHERE symbol = ? AND time >= ?"
+		params = [symbol, int(to_epoch_seconds([start_time])[0])]
+		if end_time is not None:
+			query += " AND time <= ?"
+			params.append(int(to_epoch_seconds([end_time])[0]))
+		if side is not None:
+			query += " AND side = ?"
+			params.append(int(side))
+		query += " ORDER BY time"
+		with self.lock:
+			frame = pd.read_sql_query(query, self.connection, params=params)
+		frame['time'] = pd.to_datetime(frame['time'], unit='s')
+		return frame
+
+	def last_time(self, symbol):
+		"""Time of the newest signal stored for the symbol, in epoch seconds, or None."""
+		with self.lock:
+			row = self.connection.execute("SELECT MAX(time) FROM signals WHERE symbol = ?", (symbol,)).fetchone()
+		return row[0]
+
+	def close(self):
+		self.connection.close()
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *exc_info):
+		self.close()
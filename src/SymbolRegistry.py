@@ -0,0 +1,127 @@
+import logging
+import threading
+import time
+import MetaTrader5 as mt5
+import Metrics
+
+
+logger = logging.getLogger(__name__)
+
+
+class SymbolRegistry:
+	"""
+	Broker symbols, their contract specifications and a short-lived quote per symbol.
+
+	symbols_get() is called once and kept as a dict of name to symbol info, so availability checks
+	are set lookups and the static contract fields (digits, point, volume limits, contract size...)
+	never go back to the terminal. Quotes are kept for `quote_ttl` seconds, which bounds an order
+	to one symbol_info_tick() call and lets orders sent back to back share it. A symbol the
+	broker does not know is remembered as missing for `missing_ttl` seconds.
+	"""
+
+	def __init__(self, quote_ttl=0.25, missing_ttl=60.0):
+		"""
+		:param quote_ttl: Seconds a quote is served from the snapshot before it is fetched again.
+		:param missing_ttl: Seconds an unknown symbol is reported missing before the terminal is asked again.
+		"""
+		self.quote_ttl = quote_ttl
+		self.missing_ttl = missing_ttl
+		self.infos = None
+		self.names = frozenset()
+		self.quotes = {}
+		self.unknown = {}
+		self.lock = threading.Lock()
+
+	def load(self):
+		"""(Re)load every symbol the terminal offers, e.g. after reconnecting. False when the terminal fails."""
+		symbols = Metrics.timed_call('fetch_symbols', None, mt5.symbols_get)
+		if symbols is None:
+			logger.error("symbols_get() failed, error code: %s", mt5.last_error())
+			return False
+		with self.lock:
+			self.infos = {info.name: info for info in symbols}
+			self.names = frozenset(self.infos)
+			self.quotes.clear()
+			self.unknown.clear()
+		return True
+
+	def _ensure_loaded(self):
+		if self.infos is None:
+			self.load()
+
+	def __contains__(self, symbol):
+		"""Whether the broker offers `symbol`, asking the terminal about symbols missing from the loaded list."""
+		return self.info(symbol) is not None
+
+	def missing(self, symbols):
+		"""The given symbols the broker does not offer, in their order."""
+		return [symbol for symbol in symbols if symbol not in self]
+
+	def info(self, symbol):
+		"""
+		Static symbol info, as symbol_info() returns it.
+
+		A symbol missing from the loaded list (e.g. added to Market Watch since) is asked for once
+		when the broker has it, and at most every `missing_ttl` seconds while it does not.
+		:return: The info, or None when the broker does not know the symbol.
+		"""
+		self._ensure_loaded()
+		info = self.infos.get(symbol) if self.infos is not None else None
+		if info is not None:
+			return info
+		with self.lock:
+			checked = self.unknown.get(symbol)
+		if checked is not None and time.monotonic() - checked < self.missing_ttl:
+			return None
+		info = mt5.symbol_info(symbol)
+		with self.lock:
+			if info is None:
+				self.unknown[symbol] = time.monotonic()
+			else:
+				if self.infos is None:
+					self.infos = {}
+				self.infos[symbol] = info
+				self.names = self.names | {symbol}
+				self.unknown.pop(symbol, None)
+		return info
+
+	def quote(self, symbol, max_age=None):
+		"""
+		Latest tick of `symbol`, fetched only when the snapshot is older than `max_age`.
+
+		:param max_age: Seconds, `quote_ttl` by default; 0 forces a fetch.
+		:return: The tick, or None when the terminal has no quote.
+		"""
+		max_age = self.quote_ttl if max_age is None else max_age
+		now = time.monotonic()
+		with self.lock:
+			snapshot = self.quotes.get(symbol)
+		if snapshot is not None and now - snapshot[0] <= max_age:
+			return snapshot[1]
+
+		tick = Metrics.timed_call('fetch_quote', symbol, mt5.symbol_info_tick, symbol, count=lambda tick: 1)
+		if tick is None:
+			logger.error("No quote for %s, error code: %s", symbol, mt5.last_error())
+			return None
+		with self.lock:
+			self.quotes[symbol] = (time.monotonic(), tick)
+		return tick
+
+	def price(self, symbol, action, max_age=None):
+		"""Price a market order of `action` ('buy' or 'sell') fills at: the ask for buys, the bid for sells."""
+		tick = self.quote(symbol, max_age)
+		if tick is None:
+			return None
+		return tick.ask if action == 'buy' else tick.bid
+
+	def invalidate_quotes(self, symbol=None):
+		"""Forget the quote of `symbol`, or every quote when None."""
+		with self.lock:
+			if symbol is None:
+				self.quotes.clear()
+			else:
+				self.quotes.pop(symbol, None)
+
+
+# Process-wide registry the client and the trading algorithms share
+REGISTRY = SymbolRegistry()
@@ -0,0 +1,174 @@
+import numpy as np
+import SymbolRegistry
+from BarStore import RATES_DTYPE
+from IncrementalMA import IncrementalMovingAverageCrossover
+import MovingAverage as MA
+
+
+class BarAggregator:
+	"""
+	Builds OHLC bars of any length from ticks, one vectorized pass per chunk of ticks.
+
+	Bars are aligned on multiples of `seconds` since the epoch, like the terminal's own bars.
+	Only the newest `max_bars` completed bars are kept.
+	"""
+
+	def __init__(self, seconds, price='bid', point=0.0, max_bars=5000):
+		"""
+		:param seconds: Bar length in seconds, e.g. 15 for sub-minute bars or 3600 for H1.
+		:param price: Tick field the bars are built from, 'bid' like the terminal's charts, or 'ask'.
+		:param point: Symbol point size, used to express the spread in points.
+		:param max_bars: Completed bars kept in memory.
+		"""
+		self.seconds = int(seconds)
+		self.price = price
+		self.point = point
+		self.max_bars = max_bars
+		self.completed = np.empty(0, dtype=RATES_DTYPE)
+		self.current = None
+
+	@property
+	def bars(self):
+		"""Completed bars in the copy_rates_* layout, oldest first."""
+		return self.completed
+
+	def add(self, ticks):
+		"""
+		Fold a chunk of ticks (oldest first) into the bars.
+
+		:return: Bars completed by this chunk, in RATES_DTYPE.
+		"""
+		prices = ticks[self.price]
+		ticks = ticks[prices > 0]
+		if len(ticks) == 0:
+			return np.empty(0, dtype=RATES_DTYPE)
+		prices = ticks[self.price]
+		seconds = ticks['time_msc'] // 1000
+		buckets = seconds - seconds % self.seconds
+
+		starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+		ends = np.r_[starts[1:], len(ticks)] - 1
+		bars = np.zeros(len(starts), dtype=RATES_DTYPE)
+		bars['time'] = buckets[starts]
+		bars['open'] = prices[starts]
+		bars['close'] = prices[ends]
+		bars['high'] = np.maximum.reduceat(prices, starts)
+		bars['low'] = np.minimum.reduceat(prices, starts)
+		bars['tick_volume'] = np.diff(np.r_[starts, len(ticks)])
+		if self.point:
+			bars['spread'] = np.rint((ticks['ask'][ends] - ticks['bid'][ends]) / self.point)
+
+		if self.current is not None:
+			if self.current['time'][0] == bars['time'][0]:
+				# The chunk continues the bar that was still open
+				bars['open'][0] = self.current['open'][0]
+				bars['high'][0] = max(bars['high'][0], self.current['high'][0])
+				bars['low'][0] = min(bars['low'][0], self.current['low'][0])
+				bars['tick_volume'][0] += self.current['tick_volume'][0]
+			else:
+				bars = np.concatenate([self.current, bars])
+
+		# The newest bar stays open until a tick from a later bucket arrives
+		closed = bars[:-1]
+		self.current = bars[-1:].copy()
+		self._keep(closed)
+		return closed
+
+	def flush(self):
+		"""Close the open bar, e.g. once the clock has passed its end without new ticks."""
+		if self.current is None:
+			return np.empty(0, dtype=RATES_DTYPE)
+		closed = self.current
+		self.current = None
+		self._keep(closed)
+		return closed
+
+	def _keep(self, closed):
+		if len(closed) == 0:
+			return
+		self.completed = np.concatenate([self.completed, closed])
+		if len(self.completed) > self.max_bars:
+			self.completed = self.completed[-self.max_bars:].copy()
+
+
+class TickStream:
+	"""
+	Streams a symbol's ticks from the terminal in chunks and turns them into bars on the fly.
+
+	Every poll resumes after the last tick already seen, folds the new ticks into one
+	BarAggregator per bar length and feeds each completed bar to that length's incremental
+	moving-average state.
+	"""
+
+	def __init__(self, client, symbol, start_time, bar_seconds=(60,), chunk_size=10_000, max_bars=5000,
+			fast_period=50, slow_period=200):
+		"""
+		:param client: A connected MetaTrader5Client.
+		:param symbol: The symbol to stream (e.g., 'EURUSD').
+		:param start_time: Time of the first tick to fetch (datetime or epoch seconds).
+		:param bar_seconds: Bar lengths to build, in seconds.
+		:param chunk_size: Ticks requested per terminal call, more while a single second holds more ticks than that.
+		:param max_bars: Completed bars kept per bar length.
+		"""
+		self.client = client
+		self.symbol = symbol
+		self.start_time = start_time
+		self.chunk_size = chunk_size
+		self.fast_period = fast_period
+		self.slow_period = slow_period
+		self.last_msc = None
+		self.seen_at_last = 0
+
+		info = SymbolRegistry.REGISTRY.info(symbol)
+		point = info.point if info is not None else 0.0
+		self.aggregators = {seconds: BarAggregator(seconds, point=point, max_bars=max_bars) for seconds in bar_seconds}
+		self.states = {seconds: IncrementalMovingAverageCrossover(symbol, fast_period, slow_period) for seconds in bar_seconds}
+
+	def _new_ticks(self, ticks):
+		"""Drop the ticks of the resume second that were already processed."""
+		if self.last_msc is None or len(ticks) == 0:
+			return ticks
+		ticks = ticks[ticks['time_msc'] >= self.last_msc]
+		at_last = np.count_nonzero(ticks['time_msc'] == self.last_msc)
+		skip = min(self.seen_at_last, at_last)
+		return ticks[skip:]
+
+	def _remember(self, ticks):
+		newest = ticks['time_msc'][-1]
+		at_newest = np.count_nonzero(ticks['time_msc'] == newest)
+		self.seen_at_last = at_newest + (self.seen_at_last if newest == self.last_msc else 0)
+		self.last_msc = newest
+
+	def poll(self):
+		"""
+		Fetch every tick since the last poll, chunk by chunk, and update the bars.
+
+		:return: dict of bar length to the list of indicator rows of the bars completed by this poll.
+		"""
+		rows = {seconds: [] for seconds in self.aggregators}
+		count = self.chunk_size
+		while True:
+			start = self.start_time if self.last_msc is None else int(self.last_msc // 1000)
+			ticks = self.client.get_ticks_from(self.symbol, start, count)
+			if ticks is None or len(ticks) == 0:
+				break
+			fresh = self._new_ticks(ticks)
+			if len(fresh) == 0:
+				if len(ticks) < count:
+					break
+				# A full chunk inside the resume second: the terminal resumes by seconds, so ask for
+				# a larger chunk from the same second until it reaches past the ticks already seen
+				count *= 2
+				continue
+			self._remember(fresh)
+			for seconds, aggregator in self.aggregators.items():
+				state = self.states[seconds]
+				rows[seconds].extend(state.update(bar) for bar in aggregator.add(fresh))
+			if len(ticks) < count:
+				break
+			count = self.chunk_size
+		return rows
+
+	def strategy(self, seconds):
+		"""A MovingAverageCrossover over the bars kept for one bar length, for the batch strategy steps."""
+		return MA.MovingAverageCrossover(self.symbol, self.aggregators[seconds].bars, self.fast_period, self.slow_period)
@@ -1,21 +1,172 @@
+import logging
 import MetaTrader5 as mt5
+import numpy as np
 import pandas as pd
+import queue
+import threading
 import time
+from concurrent.futures import Future
+import Metrics
+import SymbolRegistry
+import PositionBook
+
+logger = logging.getLogger(__name__)
+
+POSITION_SIDES = {'buy': 1, 'sell': -1, None: 0}
+
+
+def signal_transitions(signal, current_side=0):
+    """
+    Find the bars where the wanted position changes, in one NumPy pass over a Signal column.
+
+    A positive signal wants to be long and a negative one short, zero keeps whatever is held:
+    the same rule execute_trades applies row by row.
+    :param signal: Array-like of signals (1, -1 or 0).
+    :param current_side: Position held before the first bar, 1 (buy), -1 (sell) or 0 (none).
+    :return: (bar indices, sides) as int arrays, side 1 meaning buy and -1 sell.
+    """
+    signal = np.asarray(signal)
+    sides = (signal > 0).astype(np.int8) - (signal < 0).astype(np.int8)
+    bars = np.flatnonzero(sides)
+    sides = sides[bars]
+    previous = np.empty_like(sides)
+    if len(sides):
+        previous[0] = current_side
+        previous[1:] = sides[:-1]
+    changed = sides != previous
+    return bars[changed], sides[changed]
+
+
+class TokenBucket:
+    """Token bucket rate limiter: refills `rate` tokens per second, bursts up to `capacity`."""
+
+    def __init__(self, rate, capacity=1):
+        """
+        :param rate: Tokens added per second.
+        :param capacity: Largest number of tokens that can be spent back to back.
+        """
+        if rate <= 0 or capacity < 1:
+            raise ValueError("rate must be positive and capacity at least 1.")
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_acquire(self, tokens=1):
+        """Take tokens if they are available right now, without waiting."""
+        with self.lock:
+            self._refill()
+            if self.tokens >= tokens:
+                self.tokens -= tokens
+                return True
+            return False
+
+    def acquire(self, tokens=1):
+        """Block only as long as it takes for `tokens` to become available, then take them."""
+        while True:
+            with self.lock:
+                self._refill()
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return
+                wait = (tokens - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class OrderDispatcher:
+    """
+    Places orders on a worker thread, no faster than the rate limiter allows.
+
+    The worker blocks on the queue, so it only wakes up when there is an order to send.
+    """
+
+    def __init__(self, place_order, orders_per_second=1, burst=1):
+        """
+        :param place_order: Callable taking the action ('buy' or 'sell') and returning True on success.
+        :param orders_per_second: Sustained order rate allowed by the broker.
+        :param burst: Orders that may go out back to back before the rate applies.
+        """
+        self.place_order = place_order
+        self.limiter = TokenBucket(orders_per_second, burst)
+        self.orders = queue.Queue()
+        self.worker = threading.Thread(target=self._run, name="order-dispatcher", daemon=True)
+        self.worker.start()
+
+    def submit(self, action):
+        """Queue an order and return a Future resolved with place_order's result."""
+        future = Future()
+        self.orders.put((action, future))
+        return future
+
+    def join(self):
+        """Wait until every queued order has been sent."""
+        self.orders.join()
+
+    def close(self):
+        """Send the remaining orders and stop the worker."""
+        self.orders.put(None)
+        self.worker.join()
+
+    def _run(self):
+        while True:
+            item = self.orders.get()
+            if item is None:
+                self.orders.task_done()
+                return
+            action, future = item
+            try:
+                self.limiter.acquire()
+                future.set_result(self.place_order(action))
+            except Exception as e:
+                future.set_exception(e)
+            finally:
+                self.orders.task_done()
+
 
 class MT5TradingAlgorithm:
-    def __init__(self, data, symbol, lot_size=0.1, magic_number=1000, market_Bias=int):
+    def __init__(self, data, symbol, lot_size=0.1, magic_number=1000, market_Bias=int, orders_per_second=1, burst=1,
+            symbols=None, book=None):
         """
         Initialize the MT5 trading algorithm.
         :param symbol: The trading symbol (e.g., 'USDJPY').
         :param lot_size: The size of each trade.
         :param magic_number: Unique identifier for this strategy's trades.
+        :param orders_per_second: Order rate the dispatcher keeps to, to stay within broker limits.
+        :param burst: Orders that may be sent back to back.
+        :param symbols: SymbolRegistry serving symbol info and quotes, the process-wide one by default.
+        :param book: PositionBook holding the account's positions and limits, the process-wide one by default.
+            Nothing is read from the terminal here: call load_position() once connected.
         """
         self.data = data
         self.symbol = symbol
         self.lot_size = lot_size
         self.magic_number = magic_number
+        self.book = book or PositionBook.BOOK
         self.current_position = None  # Track 'buy', 'sell', or None
+        self.target_position = None  # Position once the queued orders are filled
+        self.orders_per_second = orders_per_second
+        self.burst = burst
+        self.dispatcher = None
         self.market_Bias = None
+        self.symbols = symbols or SymbolRegistry.REGISTRY
+
+    def load_position(self):
+        """
+        Load the account's open positions into the book (once per book) and start from this symbol's one,
+        so a restarted strategy does not open the same position again. Call it at start-up, once connected.
+        :raises RuntimeError: When the terminal cannot list the open positions.
+        """
+        if not self.book.ensure_loaded():
+            raise RuntimeError(f"Open positions could not be loaded, {self.symbol} does not know what it holds.")
+        self.current_position = self.book.side(self.symbol)
+        self.target_position = self.current_position
+        return self.current_position
 
     def place_order(self, action):
         """
@@ -25,14 +176,34 @@ class MT5TradingAlgorithm:
         # Define order type
         order_type = mt5.ORDER_TYPE_BUY if action == 'buy' else mt5.ORDER_TYPE_SELL
 
-        # Get symbol info
-        symbol_info = mt5.symbol_info(self.symbol)
-        if not symbol_info:
-            print(f"Symbol {self.symbol} not found, cannot place order.")
+        # Symbol info is cached by the registry, the quote is fetched at most once per order
+        if self.symbol not in self.symbols:
+            logger.error("Symbol %s not found, cannot place order.", self.symbol)
             return False
 
         # Prepare order request
-        price = mt5.symbol_info_tick(self.symbol).ask if action == 'buy' else mt5.symbol_info_tick(self.symbol).bid
+        price = self.symbols.price(self.symbol, action)
+        if price is None:
+            logger.error("No quote for %s, cannot place order.", self.symbol)
+            return False
+
+        # Risk limits are checked against the local book, no terminal round trip. The order is reserved
+        # in the book until it is filled, so orders sent meanwhile by other dispatchers count it
+        with Metrics.timer('risk_check', self.symbol):
+            breach = self.book.check(self.symbol, action, self.lot_size, price, reserve=True)
+        if breach:
+            logger.warning("%s order rejected: %s", action.capitalize(), breach)
+            return False
+        filled = False
+        try:
+            filled = self._send_order(action, order_type, price)
+        finally:
+            if not filled:
+                self.book.release(self.symbol, action, self.lot_size, price)
+        return filled
+
+    def _send_order(self, action, order_type, price):
+        """The order_send() half of place_order(), True once the fill is in the book."""
         request = {
             "action": mt5.TRADE_ACTION_DEAL,
             "symbol": self.symbol,
@@ -46,33 +217,69 @@ class MT5TradingAlgorithm:
             "type_filling": mt5.ORDER_FILLING_IOC,
         }
 
-        # Send order
-        result = mt5.order_send(request)
+        # Send order, timing the round trip to the trade server
+        with Metrics.timer('order_send', self.symbol) as record:
+            result = mt5.order_send(request)
+            record['items'] = 1
+        if result is None:
+            # No answer from the terminal (IPC failure), nothing was sent
+            logger.error("Order send failed, error code: %s", mt5.last_error())
+            return False
         if result.retcode != mt5.TRADE_RETCODE_DONE:
-            print(f"Order failed: {result.retcode}")
+            logger.error("Order failed: %s", result.retcode)
             return False
 
-        print(f"{action.capitalize()} order placed at {price}.")
+        self.book.fill(self.symbol, action, result.volume or self.lot_size, result.price or price,
+                reserved=(self.lot_size, price))
+        logger.info("%s order placed at %s.", action.capitalize(), price)
         self.current_position = action
         return True
 
-    def execute_trades(self, data):
+    def submit_order(self, action):
+        """Queue an order on the dispatcher, the calling thread does not wait for the broker."""
+        if self.dispatcher is None:
+            self.dispatcher = OrderDispatcher(self._dispatch, self.orders_per_second, self.burst)
+        self.target_position = action
+        return self.dispatcher.submit(action)
+
+    def _dispatch(self, action):
+        placed = False
+        try:
+            placed = self.place_order(action)
+        finally:
+            if not placed:
+                # Later signals are compared against what we actually hold
+                self.target_position = self.current_position
+        return placed
+
+    def execute_trades(self, data, wait=False):
         """
         Execute trades based on signals in the data.
+
+        The bars where the wanted position changes are found with signal_transitions(), only those
+        queue an order and nothing sleeps here: the dispatcher paces the orders.
         :param data: Pandas DataFrame with a 'Signal' column.
+        :param wait: Block until every queued order has been sent.
+        :return: List of Futures, one per queued order.
+        :raises RuntimeError: When load_position() has not been called.
         """
-        for index, row in data.iterrows():
-            signal = row['Signal']
-            if signal == 1 and self.current_position != 'buy':
-                self.place_order('buy')
-            elif signal == -1 and self.current_position != 'sell':
-                self.place_order('sell')
-            time.sleep(1)  # Avoid API rate limits or overloading
+        if not self.book.loaded:
+            raise RuntimeError("The position book is not loaded, call load_position() first.")
+        if self.dispatcher is None or self.dispatcher.orders.unfinished_tasks == 0:
+            self.target_position = self.current_position
+        _, sides = signal_transitions(data['Signal'].to_numpy(), POSITION_SIDES[self.target_position])
+        orders = [self.submit_order('buy' if side == 1 else 'sell') for side in sides]
+        if wait and self.dispatcher is not None:
+            self.dispatcher.join()
+        return orders
 
     def close(self):
-        """Shutdown MT5 connection."""
+        """Send any queued orders, then shutdown MT5 connection."""
+        if self.dispatcher is not None:
+            self.dispatcher.close()
+            self.dispatcher = None
         mt5.shutdown()
-        print("Disconnected from MetaTrader 5.")
+        logger.info("Disconnected from MetaTrader 5.")
 
 # Example usage
 '''if __name__ == "__main__":
@@ -92,6 +299,7 @@ class MT5TradingAlgorithm:
     # Initialize and execute trading algorithm
     mt5_algo = MT5TradingAlgorithm(symbol="USDJPY")
     try:
+        mt5_algo.load_position()
         mt5_algo.execute_trades(df)
     finally:
         mt5_algo.close()
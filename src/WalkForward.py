@@ -0,0 +1,210 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import numpy as np
+import pandas as pd
+from ParameterSweep import sweep_moving_averages
+
+
+def walk_forward_folds(n, train_bars, test_bars, step=None):
+	"""
+	Rolling (train, test) windows over `n` bars, each test window right after its train window.
+
+	:param step: Bars between the starts of consecutive folds, `test_bars` (back to back test windows) by default.
+	:return: List of (train_start, train_end, test_start, test_end) index tuples, ends exclusive.
+	"""
+	step = step or test_bars
+	folds = []
+	start = 0
+	while start + train_bars + test_bars <= n:
+		folds.append((start, start + train_bars, start + train_bars, start + train_bars + test_bars))
+		start += step
+	return folds
+
+
+def _close_prices(data):
+	"""Close prices of a rates array or frame, or the prices themselves, as float64."""
+	if isinstance(data, pd.DataFrame) or getattr(getattr(data, 'dtype', None), 'names', None):
+		data = data['close']
+	return np.ascontiguousarray(data, dtype=np.float64)
+
+
+# Shared close arrays already attached in this worker process, by block name
+_attached = {}
+
+
+def _shared_close(name, length):
+	"""View of a close array published by WalkForwardRunner, attached once per worker process."""
+	if name not in _attached:
+		_attached[name] = shared_memory.SharedMemory(name=name)
+	return np.ndarray((length,), dtype=np.float64, buffer=_attached[name].buf)
+
+
+def run_fold(symbol, name, length, fold, fast_periods, slow_periods, metric, periods_per_year, reference):
+	"""
+	Sweep one train window, then evaluate the best pair and the reference pair on the test window.
+
+	Module level so it can be pickled into a process pool worker; only the shared block's name
+	travels with the task, never the prices.
+	:return: dict describing the fold.
+	"""
+	close = _shared_close(name, length)
+	train_start, train_end, test_start, test_end = fold
+	row = {'symbol': symbol, 'train_start': train_start, 'test_start': test_start, 'test_end': test_end}
+
+	sweep = sweep_moving_averages(close[train_start:train_end], fast_periods, slow_periods, periods_per_year)
+	sweep = sweep.dropna(subset=[metric])
+	if sweep.empty:
+		row['error'] = 'no pair could be evaluated on the train window'
+		return row
+	best = sweep.loc[sweep[metric].idxmax()]
+	fast, slow = int(best['fast_period']), int(best['slow_period'])
+	row.update({'fast_period': fast, 'slow_period': slow, 'train_' + metric: best[metric],
+			'train_return': best['total_return']})
+
+	for prefix, (f, s) in (('test', (fast, slow)), ('reference', reference)):
+		# Warm the averages up on the bars just before the test window, so every test bar is traded
+		warm_start = test_start - max(f, s) - 1
+		if warm_start < 0:
+			continue
+		evaluated = sweep_moving_averages(close[warm_start:test_end], [f], [s], periods_per_year)
+		if evaluated.empty:
+			continue
+		evaluated = evaluated.iloc[0]
+		row[prefix + '_' + metric] = evaluated[metric]
+		row[prefix + '_return'] = evaluated['total_return']
+		row[prefix + '_trades'] = int(evaluated['trades'])
+	row['market_return'] = close[test_end - 1] / close[test_start - 1] - 1
+	return row
+
+
+class WalkForwardRunner:
+	"""
+	Walk-forward validation of the moving-average crossover periods.
+
+	Each symbol's history is cut into rolling train/test folds. The (fast, slow) grid is swept on
+	every train window and the winner is traded on the following test window, next to a fixed
+	reference pair (the production 50/200 by default). Folds x symbols run on a process pool that
+	reads the close prices from shared memory.
+	"""
+
+	def __init__(self, fast_periods, slow_periods, train_bars, test_bars, step=None, metric='sharpe',
+			periods_per_year=None, reference=(50, 200), max_workers=None):
+		"""
+		:param fast_periods: Candidate fast-moving average periods.
+		:param slow_periods: Candidate slow-moving average periods.
+		:param train_bars: Bars in each train window, more than the longest slow period.
+		:param test_bars: Bars in each test window.
+		:param step: Bars between fold starts, `test_bars` by default.
+		:param metric: sweep_moving_averages() column the best pair is chosen by.
+		:param periods_per_year: Annualisation factor for the Sharpe ratio.
+		:param reference: (fast, slow) pair evaluated on every test window for comparison.
+		:param max_workers: Pool size, defaults to the number of CPUs.
+		"""
+		if train_bars <= max(slow_periods) + 1:
+			raise ValueError("train_bars must exceed the longest slow period by at least 2 bars.")
+		self.fast_periods = list(fast_periods)
+		self.slow_periods = list(slow_periods)
+		self.train_bars = train_bars
+		self.test_bars = test_bars
+		self.step = step
+		self.metric = metric
+		self.periods_per_year = periods_per_year
+		self.reference = tuple(reference)
+		self.max_workers = max_workers or os.cpu_count() or 1
+
+	def run(self, rates):
+		"""
+		Run every fold of every symbol.
+
+		:param rates: dict of symbol to rates (a structured array or DataFrame with 'close') or plain close prices.
+		:return: (folds DataFrame with one row per symbol and fold, stability report DataFrame indexed by symbol)
+		"""
+		blocks = {}
+		try:
+			tasks = []
+			for symbol, data in rates.items():
+				if data is None or len(data) == 0:
+					continue
+				close = _close_prices(data)
+				block = shared_memory.SharedMemory(create=True, size=max(close.nbytes, 1))
+				blocks[symbol] = block
+				np.ndarray(close.shape, dtype=np.float64, buffer=block.buf)[:] = close
+				for fold in walk_forward_folds(len(close), self.train_bars, self.test_bars, self.step):
+					tasks.append((symbol, block.name, len(close), fold))
+
+			rows = []
+			with ProcessPoolExecutor(max_workers=self.max_workers) as pool:
+				futures = [pool.submit(run_fold, symbol, name, length, fold, self.fast_periods, self.slow_periods,
+						self.metric, self.periods_per_year, self.reference) for symbol, name, length, fold in tasks]
+				for (symbol, _, _, fold), future in zip(tasks, futures):
+					try:
+						rows.append(future.result())
+					except Exception as e:
+						rows.append({'symbol': symbol, 'train_start': fold[0], 'test_start': fold[2],
+								'test_end': fold[3], 'error': repr(e)})
+		finally:
+			for block in blocks.values():
+				block.close()
+				block.unlink()
+
+		folds = pd.DataFrame(rows)
+		return folds, self.stability_report(folds)
+
+	def stability_report(self, folds):
+		"""
+		Summarise the folds per symbol: how often the same pair wins, how the winners hold up out of
+		sample, and how they compare with the reference pair.
+		"""
+		metric = self.metric
+		rows = []
+		for symbol, group in folds.groupby('symbol', sort=False):
+			chosen = group.dropna(subset=['fast_period', 'slow_period']) if 'fast_period' in group else group.iloc[:0]
+			row = {'symbol': symbol, 'folds': len(group), 'evaluated': len(chosen)}
+			if len(chosen):
+				pairs = list(zip(chosen['fast_period'].astype(int), chosen['slow_period'].astype(int)))
+				counts = pd.Series(pairs).value_counts()
+				train = chosen['train_' + metric]
+				test = chosen['test_' + metric]
+				row.update({
+					'top_pair': counts.index[0],
+					'top_pair_share': counts.iloc[0] / len(pairs),
+					'distinct_pairs': len(counts),
+					'fast_mean': chosen['fast_period'].mean(),
+					'fast_std': chosen['fast_period'].std(ddof=0),
+					'slow_mean': chosen['slow_period'].mean(),
+					'slow_std': chosen['slow_period'].std(ddof=0),
+					'train_' + metric: train.mean(),
+					'test_' + metric: test.mean(),
+					# Out-of-sample over in-sample performance, near 1 when the fit carries over
+					'efficiency': test.mean() / train.mean() if train.mean() else np.nan,
+					'test_positive_share': (chosen['test_return'] > 0).mean(),
+					'test_return': (1 + chosen['test_return']).prod() - 1,
+					'reference_' + metric: chosen['reference_' + metric].mean() if 'reference_' + metric in chosen else np.nan,
+					'reference_return': (1 + chosen['reference_return']).prod() - 1 if 'reference_return' in chosen else np.nan,
+					'market_return': (1 + chosen['market_return']).prod() - 1,
+				})
+			rows.append(row)
+		if not rows:
+			return pd.DataFrame(columns=['symbol', 'folds', 'evaluated']).set_index('symbol')
+		return pd.DataFrame(rows).set_index('symbol')
+
+
+if __name__ == "__main__":
+	import logging
+	from datetime import datetime
+	import MetaTrader5 as mt5
+	from Advisor import MetaTrader5Client
+	import Pipeline
+
+	logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+	symbols = ["USDJPY", "USDCHF", "USDCAD", "USDZAR", "EURUSD"]
+	client = MetaTrader5Client(symbols)
+	if not client.initialize():
+		exit()
+	rates = Pipeline.SymbolPipeline(client).fetch(symbols, mt5.TIMEFRAME_H1, datetime(2024, 8, 1), datetime.now())
+	client.shutdown()
+
+	runner = WalkForwardRunner(range(10, 101, 10), range(50, 301, 25), train_bars=1500, test_bars=250)
+	folds, report = runner.run(rates)
+	print(report)
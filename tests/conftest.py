@@ -0,0 +1,9 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+import FakeMetaTrader5  # noqa: E402
+
+# Every module under test imports MetaTrader5, so the fake has to be registered before they are
+FakeMetaTrader5.install(synthetic=True, latency=0.0, jitter=0.0)
@@ -0,0 +1,56 @@
+import asyncio
+import time
+from datetime import datetime, timezone
+import MetaTrader5 as mt5
+from Advisor import MetaTrader5Client
+from AsyncClient import AsyncMetaTrader5Client
+
+
+class SlowClient(MetaTrader5Client):
+	"""Client whose SLOW symbol hangs well past the async client's timeout."""
+
+	def get_ticks_from(self, symbol, start_time, count):
+		if symbol == 'SLOW':
+			time.sleep(1.5)
+			return None
+		return super().get_ticks_from(symbol, start_time, count)
+
+
+def test_timed_out_call_does_not_block_the_next_ones():
+	mt5.initialize()
+	client = AsyncMetaTrader5Client(SlowClient(['EURUSD', 'USDJPY']), max_concurrency=1, timeout=0.3, retries=0)
+	start = datetime.now(timezone.utc)
+
+	async def fetch():
+		return await client.gather('get_ticks_from', ['SLOW', 'EURUSD', 'USDJPY'], start, 10)
+
+	started = time.monotonic()
+	results = asyncio.run(fetch())
+	elapsed = time.monotonic() - started
+	client.close()
+
+	assert results['SLOW'] is None
+	assert results['EURUSD'] is not None and results['USDJPY'] is not None
+	assert elapsed < 1.0
+
+
+def test_calls_run_one_at_a_time():
+	mt5.initialize()
+	running = []
+	peak = []
+
+	def tracked():
+		running.append(1)
+		peak.append(len(running))
+		time.sleep(0.02)
+		running.pop()
+		return True
+
+	client = AsyncMetaTrader5Client(MetaTrader5Client([]), max_concurrency=1)
+
+	async def fetch():
+		return await asyncio.gather(*(client.call(tracked) for _ in range(5)))
+
+	assert asyncio.run(fetch()) == [True] * 5
+	assert max(peak) == 1
+	client.close()
@@ -0,0 +1,39 @@
+import time
+import MetaTrader5 as mt5
+import FakeMetaTrader5
+
+
+def timed(call, *args):
+	started = time.perf_counter()
+	result = call(*args)
+	return result, time.perf_counter() - started
+
+
+def test_latency_is_paid_once_per_call():
+	mt5.initialize()
+	FakeMetaTrader5.reset_positions()
+	FakeMetaTrader5.configure(latency=0.05)
+	try:
+		request = {'action': mt5.TRADE_ACTION_DEAL, 'symbol': 'EURUSD', 'volume': 0.1, 'type': mt5.ORDER_TYPE_BUY}
+		result, elapsed = timed(mt5.order_send, request)
+		assert result.retcode == mt5.TRADE_RETCODE_DONE
+		assert elapsed < 0.09
+		symbols, elapsed = timed(mt5.symbols_get)
+		assert len(symbols) > 1
+		assert elapsed < 0.09
+	finally:
+		FakeMetaTrader5.configure(latency=0.0)
+		FakeMetaTrader5.reset_positions()
+
+
+def test_opposite_deal_nets_the_position():
+	mt5.initialize()
+	FakeMetaTrader5.reset_positions()
+	request = {'action': mt5.TRADE_ACTION_DEAL, 'symbol': 'EURUSD', 'volume': 0.1, 'type': mt5.ORDER_TYPE_BUY}
+	mt5.order_send(request)
+	assert mt5.positions_get()[0].type == mt5.POSITION_TYPE_BUY
+	mt5.order_send(dict(request, type=mt5.ORDER_TYPE_SELL))
+	assert mt5.positions_get() == ()
+	mt5.order_send(dict(request, type=mt5.ORDER_TYPE_SELL, volume=0.2))
+	position, = mt5.positions_get()
+	assert position.type == mt5.POSITION_TYPE_SELL and position.volume == 0.2
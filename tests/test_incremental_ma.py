@@ -0,0 +1,33 @@
+import numpy as np
+import MetaTrader5 as mt5
+import FakeMetaTrader5
+from IncrementalMA import IncrementalMovingAverageCrossover
+from MovingAverage import MovingAverageCrossover
+
+
+def test_streamed_bars_match_the_batch_columns():
+	rates = FakeMetaTrader5.synthetic_rates(1000, mt5.TIMEFRAME_H1, end_time=1_700_000_000, seed=11)
+	batch = MovingAverageCrossover('EURUSD', rates, 20, 50)
+	batch.run_moving_average_strategy('EURUSD', None, None, None, save_signals=False)
+	expected = batch.results
+
+	state = IncrementalMovingAverageCrossover('EURUSD', 20, 50)
+	rows = [state.update(bar) for bar in rates]
+	assert state.ready
+	# backtest_strategy keeps the bars from max(fast, slow) + 1 on
+	streamed = rows[51:]
+	assert len(streamed) == len(expected)
+	np.testing.assert_allclose([row['Fast_MA'] for row in streamed], expected['Fast_MA'], rtol=1e-12)
+	np.testing.assert_allclose([row['Slow_MA'] for row in streamed], expected['Slow_MA'], rtol=1e-12)
+	np.testing.assert_array_equal([row['Signal'] for row in streamed], expected['Signal'])
+	np.testing.assert_array_equal([row['Crossover'] for row in streamed], expected['Crossover'])
+
+
+def test_warm_up_continues_where_the_history_stops():
+	rates = FakeMetaTrader5.synthetic_rates(300, mt5.TIMEFRAME_H1, end_time=1_700_000_000, seed=12)
+	whole = IncrementalMovingAverageCrossover('EURUSD', 10, 30)
+	last = whole.warm_up(rates)
+
+	resumed = IncrementalMovingAverageCrossover('EURUSD', 10, 30)
+	resumed.warm_up(rates[:-1])
+	assert resumed.update(rates[-1]) == last
@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+import pytest
+import MetaTrader5 as mt5
+import FakeMetaTrader5
+import Kernels
+from MovingAverage import MovingAverageCrossover
+from ParameterSweep import sweep_moving_averages
+
+
+FAST, SLOW = 20, 50
+
+
+@pytest.fixture(scope='module')
+def rates():
+	return FakeMetaTrader5.synthetic_rates(3000, mt5.TIMEFRAME_H1, end_time=1_700_000_000, seed=7)
+
+
+@pytest.fixture(scope='module')
+def reference(rates):
+	"""The pandas path: calculate_moving_averages, generate_signals and backtest_strategy."""
+	strategy = MovingAverageCrossover('EURUSD', rates, FAST, SLOW)
+	return strategy.run_moving_average_strategy('EURUSD', None, None, None, save_signals=False)
+
+
+def frame(rates):
+	data = pd.DataFrame(rates)
+	data['time'] = pd.to_datetime(data['time'], unit='s')
+	return data.set_index('time')
+
+
+@pytest.mark.parametrize('engine', sorted(Kernels.ENGINES))
+def test_fused_backtest_matches_the_pandas_path(rates, reference, engine):
+	strategy = MovingAverageCrossover('EURUSD', frame(rates), FAST, SLOW)
+	strategy.calculate_moving_averages()
+	results, stats = strategy.fused_backtest(engine=engine)
+
+	assert results.index.equals(reference.index)
+	np.testing.assert_array_equal(results['Signal'], reference['Signal'])
+	np.testing.assert_array_equal(results['Crossover'], reference['Crossover'])
+	np.testing.assert_array_equal(results['Position'], reference['Position'])
+	np.testing.assert_allclose(results['Cumulative_Strategy_Returns'], reference['Cumulative_Strategy_Returns'], rtol=1e-10)
+	assert stats['total_return'] == pytest.approx(reference['Cumulative_Strategy_Returns'].iloc[-1] - 1, rel=1e-10)
+	assert stats['market_return'] == pytest.approx(reference['Cumulative_Market_Returns'].iloc[-1] - 1, rel=1e-10)
+
+
+@pytest.mark.parametrize('engine', sorted(Kernels.ENGINES))
+def test_engines_agree_on_their_own_averages(rates, engine):
+	expected = Kernels.crossover_backtest(rates['close'], FAST, SLOW, 252, 'python')
+	got = Kernels.crossover_backtest(rates['close'], FAST, SLOW, 252, engine)
+	for key in ('signal', 'crossover', 'position'):
+		np.testing.assert_array_equal(got[key], expected[key])
+	np.testing.assert_allclose(got['equity'], expected['equity'], rtol=1e-10)
+	for key in ('total_return', 'market_return', 'sharpe', 'max_drawdown'):
+		assert got[key] == pytest.approx(expected[key], rel=1e-9)
+	assert got['trades'] == expected['trades']
+
+
+def test_sweep_row_matches_backtest_strategy(rates, reference):
+	sweep = sweep_moving_averages(rates['close'], [10, FAST], [SLOW, 100], 252)
+	row = sweep[(sweep['fast_period'] == FAST) & (sweep['slow_period'] == SLOW)].iloc[0]
+	kernel = Kernels.crossover_backtest(rates['close'], FAST, SLOW, 252, 'numpy')
+
+	assert row['bars'] == len(reference)
+	assert row['total_return'] == pytest.approx(reference['Cumulative_Strategy_Returns'].iloc[-1] - 1, rel=1e-9)
+	assert row['market_return'] == pytest.approx(reference['Cumulative_Market_Returns'].iloc[-1] - 1, rel=1e-9)
+	for key in ('sharpe', 'max_drawdown', 'trades'):
+		assert row[key] == pytest.approx(kernel[key], rel=1e-9)
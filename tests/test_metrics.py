@@ -0,0 +1,26 @@
+import MetaTrader5 as mt5
+import Metrics
+from Advisor import MetaTrader5Client
+from Metrics import MetricsRegistry
+
+
+def series(registry, stage, symbol=None):
+	return next(entry for entry in registry.snapshot()['series'] if entry['stage'] == stage and entry['symbol'] == symbol)
+
+
+def test_timed_call_counts_the_items_returned():
+	registry = MetricsRegistry()
+	assert registry.timed_call('fetch', 'EURUSD', lambda count: list(range(count)), 3) == [0, 1, 2]
+	assert registry.timed_call('fetch', 'EURUSD', lambda: None) is None
+	assert registry.timed_call('fetch', 'EURUSD', lambda: (1, 2, 3), count=lambda result: 1) == (1, 2, 3)
+	entry = series(registry, 'fetch', 'EURUSD')
+	assert entry['count'] == 3 and entry['items'] == 4
+
+
+def test_client_fetches_are_recorded():
+	mt5.initialize()
+	Metrics.REGISTRY.reset()
+	rates = MetaTrader5Client(['EURUSD']).get_rates_from_pos('EURUSD', mt5.TIMEFRAME_H1, 0, 25)
+	assert len(rates) == 25
+	entry = series(Metrics.REGISTRY, 'fetch', 'EURUSD')
+	assert entry['count'] == 1 and entry['items'] == 25
@@ -0,0 +1,43 @@
+import pandas as pd
+import pytest
+import MetaTrader5 as mt5
+import FakeMetaTrader5
+from MovingAverage import MovingAverageCrossover
+
+
+def rates(count=2000, seed=3):
+	return FakeMetaTrader5.synthetic_rates(count, mt5.TIMEFRAME_H1, end_time=1_700_000_000, seed=seed)
+
+
+def frame(count=2000, seed=3):
+	"""Rates as run_moving_average_strategy() hands them to the strategy, indexed by time."""
+	data = pd.DataFrame(rates(count, seed))
+	data['time'] = pd.to_datetime(data['time'], unit='s')
+	return data.set_index('time')
+
+
+@pytest.mark.parametrize('low_memory', [False, True])
+def test_strategy_runs_again_on_the_same_rates(low_memory):
+	strategy = MovingAverageCrossover('EURUSD', rates(), 20, 50, low_memory=low_memory)
+	first = strategy.run_moving_average_strategy('EURUSD', None, None, None, save_signals=False, save_rates=False)
+	second = strategy.run_moving_average_strategy('EURUSD', None, None, None, save_signals=False, save_rates=False)
+	assert len(first) == len(second) == 2000 - 51
+	assert first['Cumulative_Strategy_Returns'].iloc[-1] == second['Cumulative_Strategy_Returns'].iloc[-1]
+
+
+def test_default_run_leaves_the_recorded_rates_alone(tmp_path, monkeypatch):
+	monkeypatch.chdir(tmp_path)
+	strategy = MovingAverageCrossover('EURUSD', rates(), 20, 50)
+	strategy.run_moving_average_strategy('EURUSD', None, None, None, save_signals=False)
+	assert not (tmp_path / 'Logs').exists()
+
+
+def test_fused_backtest_refuses_a_trimmed_frame():
+	strategy = MovingAverageCrossover('EURUSD', frame(), 20, 50)
+	strategy.calculate_moving_averages()
+	strategy.fused_backtest()
+	strategy.generate_signals()
+	with pytest.raises(ValueError):
+		strategy.fused_backtest()
+	with pytest.raises(ValueError):
+		strategy.sweep_parameters([10], [30])
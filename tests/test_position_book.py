@@ -0,0 +1,77 @@
+import threading
+import pytest
+import MetaTrader5 as mt5
+import FakeMetaTrader5
+from PositionBook import PositionBook
+from TradesAlgo import MT5TradingAlgorithm
+
+
+@pytest.fixture
+def book():
+	mt5.initialize()
+	FakeMetaTrader5.reset_positions()
+	book = PositionBook()
+	assert book.load()
+	return book
+
+
+def test_lot_limit_only_blocks_orders_that_grow_the_position(book):
+	book.set_limits(max_lots=0.2)
+	book.fill('EURUSD', 'buy', 0.2, 1.1)
+	assert book.check('EURUSD', 'buy', 0.1, 1.1) is not None
+	assert book.check('EURUSD', 'sell', 0.3, 1.1) is None
+	assert book.check('EURUSD', 'sell', 0.5, 1.1) is not None
+	assert book.side('EURUSD') == 'buy'
+
+
+def test_exposure_limit_sums_currencies_across_symbols(book):
+	book.set_limits(max_exposure={'USD': 25_000})
+	book.fill('EURUSD', 'buy', 0.2, 1.1)
+	assert book.exposures()['USD'] == pytest.approx(-22_000)
+	assert book.check('EURUSD', 'buy', 0.1, 1.1) is not None
+	# Buying USD against the Canadian dollar brings the USD exposure back towards zero
+	assert book.check('USDCAD', 'buy', 0.1, 1.35) is None
+	book.fill('USDCAD', 'buy', 0.1, 1.35)
+	assert book.exposures()['USD'] == pytest.approx(-12_000)
+	assert book.check('EURUSD', 'buy', 0.1, 1.1) is None
+
+
+def test_reservation_is_released_or_replaced(book):
+	book.set_limits(max_lots=0.1)
+	assert book.check('EURUSD', 'buy', 0.1, 1.1, reserve=True) is None
+	assert book.check('EURUSD', 'buy', 0.1, 1.1, reserve=True) is not None
+	book.release('EURUSD', 'buy', 0.1, 1.1)
+	assert book.lots('EURUSD') == 0.0
+	assert book.check('EURUSD', 'buy', 0.1, 1.1, reserve=True) is None
+	book.fill('EURUSD', 'buy', 0.1, 1.2, reserved=(0.1, 1.1))
+	assert book.lots('EURUSD') == pytest.approx(0.1)
+	assert book.exposures()['USD'] == pytest.approx(-12_000)
+
+
+def test_concurrent_orders_stay_within_the_lot_limit(book):
+	FakeMetaTrader5.configure(latency=0.02)
+	try:
+		book.set_limits(max_lots=0.1)
+		algos = [MT5TradingAlgorithm(None, 'EURUSD', book=book) for _ in range(4)]
+		placed = []
+		threads = [threading.Thread(target=lambda algo=algo: placed.append(algo.place_order('buy'))) for algo in algos]
+		for thread in threads:
+			thread.start()
+		for thread in threads:
+			thread.join()
+	finally:
+		FakeMetaTrader5.configure(latency=0.0)
+	assert sorted(placed) == [False, False, False, True]
+	assert book.lots('EURUSD') == pytest.approx(0.1)
+	assert sum(position.volume for position in mt5.positions_get()) == pytest.approx(0.1)
+
+
+def test_restarted_strategy_resumes_the_open_position(book):
+	first = MT5TradingAlgorithm(None, 'EURUSD', book=book)
+	assert first.place_order('sell')
+
+	restarted = MT5TradingAlgorithm(None, 'EURUSD', book=PositionBook())
+	assert restarted.current_position is None
+	with pytest.raises(RuntimeError):
+		restarted.execute_trades(None)
+	assert restarted.load_position() == 'sell'
@@ -0,0 +1,48 @@
+import time
+from datetime import datetime, timezone
+import pytest
+import MetaTrader5 as mt5
+import FakeMetaTrader5
+from Advisor import MetaTrader5Client
+from BarStore import BarStore
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+	# Server time three hours ahead of UTC, as most brokers run
+	FakeMetaTrader5.configure(history=500, now=int(time.time()) + 3 * 3600)
+	mt5.initialize()
+	calls = []
+	fetch = mt5.copy_rates_range
+
+	def copy_rates_range(*args):
+		calls.append(args)
+		return fetch(*args)
+
+	monkeypatch.setattr(mt5, 'copy_rates_range', copy_rates_range)
+	client = MetaTrader5Client(['EURUSD'], bar_store=BarStore(str(tmp_path)))
+	client.calls = calls
+	yield client
+	FakeMetaTrader5.configure(history=5000)
+	FakeMetaTrader5._state.now = None
+
+
+def test_cache_serves_up_to_the_newest_bar(client):
+	newest = FakeMetaTrader5.copy_rates_from_pos('EURUSD', mt5.TIMEFRAME_H1, 0, 1)['time'][-1]
+	start = datetime.fromtimestamp(int(newest) - 100 * 3600, tz=timezone.utc)
+	rates = client.get_rates_cached('EURUSD', mt5.TIMEFRAME_H1, start)
+	assert rates['time'][-1] == newest
+	assert len(rates) == 101
+
+
+def test_history_before_the_broker_is_asked_for_once(client):
+	start = datetime(2000, 1, 1, tzinfo=timezone.utc)
+	first = client.get_rates_cached('EURUSD', mt5.TIMEFRAME_H1, start)
+	assert len(first) == 500
+	# A later start only tops up, an earlier one back-fills once more
+	for _ in range(3):
+		client.get_rates_cached('EURUSD', mt5.TIMEFRAME_H1, start)
+	assert len(client.calls) == 4
+	client.get_rates_cached('EURUSD', mt5.TIMEFRAME_H1, datetime(1999, 1, 1, tzinfo=timezone.utc))
+	client.get_rates_cached('EURUSD', mt5.TIMEFRAME_H1, datetime(1999, 1, 1, tzinfo=timezone.utc))
+	assert len(client.calls) == 7
@@ -0,0 +1,83 @@
+import os
+import threading
+import numpy as np
+import pytest
+import MetaTrader5 as mt5
+import FakeMetaTrader5
+from SharedPrices import _HEARTBEAT, SharedPriceRing
+
+
+@pytest.fixture
+def ring(request):
+	ring = SharedPriceRing.create(f"test_{os.getpid()}_{request.node.name}"[:30], 5)
+	yield ring
+	ring.close()
+
+
+def bars(count, timeframe=mt5.TIMEFRAME_H1):
+	return FakeMetaTrader5.synthetic_rates(count, timeframe, end_time=1_700_000_000, seed=1)
+
+
+def test_ring_keeps_the_newest_bars_in_order(ring):
+	history = bars(12)
+	assert ring.write(history[:3]) == 3
+	np.testing.assert_array_equal(ring.read(copy=True)['time'], history['time'][:3])
+	# More bars than the capacity: only the newest ones are written
+	assert ring.write(history[2:9]) == 5
+	np.testing.assert_array_equal(ring.read(copy=True)['time'], history['time'][4:9])
+	assert ring.write(history[:9]) == 1
+	assert ring.write(history) == 4
+	np.testing.assert_array_equal(ring.read(3, copy=True)['time'], history['time'][9:12])
+	assert ring.last_time() == history['time'][-1]
+	assert len(ring) == 5
+
+
+def test_rewritten_bar_replaces_the_forming_one(ring):
+	history = bars(4)
+	ring.write(history)
+	final = history[-1:].copy()
+	final['close'] = 2.0
+	assert ring.write(final) == 1
+	latest = ring.read(copy=True)
+	assert latest['close'][-1] == 2.0 and len(latest) == 4
+
+
+def test_views_are_read_only(ring):
+	ring.write(bars(3))
+	view = ring.read()
+	assert not view.flags.writeable
+	del view
+
+
+def test_reads_never_see_a_torn_write():
+	history = bars(50_000, mt5.TIMEFRAME_M1)
+	step = int(history['time'][1] - history['time'][0])
+	ring = SharedPriceRing.create(f"test_{os.getpid()}_torn", 1000)
+	writer = threading.Thread(target=lambda: [ring.write(history[i:i + 7]) for i in range(0, len(history), 7)])
+	torn = 0
+	writer.start()
+	while writer.is_alive():
+		window = ring.read(500, copy=True)
+		if len(window) > 1 and not (np.diff(window['time']) == step).all():
+			torn += 1
+	writer.join()
+	ring.close()
+	assert torn == 0
+
+
+def test_create_refuses_a_live_ring_and_replaces_a_stale_one():
+	name = f"test_{os.getpid()}_live"
+	live = SharedPriceRing.create(name, 5)
+	live.write(bars(3))
+	with pytest.raises(FileExistsError):
+		SharedPriceRing.create(name, 5)
+	assert len(live) == 3
+
+	# A writer that stopped beating is taken over
+	live.header[_HEARTBEAT] -= 3600
+	replacement = SharedPriceRing.create(name, 5)
+	assert len(replacement) == 0
+	# The name now belongs to the replacement, the old writer only unmaps its block
+	live.owner = False
+	live.close()
+	replacement.close()
@@ -0,0 +1,45 @@
+import os
+import pytest
+import MetaTrader5 as mt5
+import FakeMetaTrader5
+from MovingAverage import MovingAverageCrossover
+from SignalJournal import SignalJournal
+
+
+@pytest.fixture
+def strategy():
+	rates = FakeMetaTrader5.synthetic_rates(1500, mt5.TIMEFRAME_H1, end_time=1_700_000_000, seed=5)
+	strategy = MovingAverageCrossover('EURUSD', rates, 20, 50)
+	strategy.run_moving_average_strategy('EURUSD', None, None, None, save_signals=False, save_rates=False)
+	assert len(strategy.signals) > 0
+	return strategy
+
+
+def test_appending_the_same_signals_again_writes_nothing(tmp_path, strategy):
+	with SignalJournal(str(tmp_path / 'signals.db')) as journal:
+		assert strategy.save_signals_to_journal(journal) == len(strategy.signals)
+		assert strategy.save_signals_to_journal(journal) == 0
+		# Other periods are another strategy, their signals are kept apart
+		strategy.fast_period = 10
+		assert strategy.save_signals_to_journal(journal) == len(strategy.signals)
+		stored = journal.since('EURUSD')
+	assert len(stored) == 2 * len(strategy.signals)
+
+
+def test_signals_csv_appends_under_the_same_header(tmp_path, strategy):
+	path = str(tmp_path / 'signals.csv')
+	strategy.save_signals_to_csv(path)
+	strategy.save_signals_to_csv(path)
+	with open(path) as file:
+		lines = file.read().splitlines()
+	assert lines[0] == 'symbol,time,side,level'
+	assert len(lines) == 1 + 2 * len(strategy.signals)
+
+
+def test_signals_csv_refuses_the_legacy_layout(tmp_path, strategy):
+	path = str(tmp_path / 'Signal_log.csv')
+	with open(path, 'w') as file:
+		file.write('time,Buy_Level,time,Sell_Level\n,,2024-11-18 03:15:00,155.064\n')
+	with pytest.raises(ValueError):
+		strategy.save_signals_to_csv(path)
+	assert os.path.getsize(path) == len('time,Buy_Level,time,Sell_Level\n,,2024-11-18 03:15:00,155.064\n')
@@ -0,0 +1,44 @@
+import MetaTrader5 as mt5
+from SymbolRegistry import SymbolRegistry
+
+
+def counting(monkeypatch, name):
+	calls = []
+	function = getattr(mt5, name)
+
+	def counted(*args):
+		calls.append(args)
+		return function(*args)
+
+	monkeypatch.setattr(mt5, name, counted)
+	return calls
+
+
+def test_known_symbols_are_served_from_the_loaded_list(monkeypatch):
+	mt5.initialize()
+	registry = SymbolRegistry()
+	assert registry.load()
+	calls = counting(monkeypatch, 'symbol_info')
+	assert 'EURUSD' in registry
+	assert registry.info('EURUSD').currency_base == 'EUR'
+	assert registry.missing(['EURUSD', 'USDJPY']) == []
+	assert calls == []
+
+
+def test_unknown_symbols_are_remembered_for_a_while(monkeypatch):
+	mt5.initialize()
+	registry = SymbolRegistry(missing_ttl=60.0)
+	assert registry.load()
+	calls = counting(monkeypatch, 'symbol_info')
+	for _ in range(3):
+		assert 'XAUUSD' not in registry
+	assert len(calls) == 1
+
+	registry.missing_ttl = 0.0
+	assert registry.info('XAUUSD') is None
+	assert len(calls) == 2
+	# A reload forgets what was missing, the new connection may offer it
+	registry.missing_ttl = 60.0
+	registry.load()
+	assert registry.info('XAUUSD') is None
+	assert len(calls) == 3
@@ -0,0 +1,35 @@
+import time
+import numpy as np
+import pytest
+import MetaTrader5 as mt5
+import FakeMetaTrader5
+from Advisor import MetaTrader5Client
+from TickStream import TickStream
+
+
+@pytest.fixture
+def busy_market():
+	# 600 ticks per minute bar, ten in every second
+	now = int(time.time()) // 60 * 60
+	FakeMetaTrader5.configure(ticks_per_bar=600, now=now)
+	mt5.initialize()
+	yield now
+	FakeMetaTrader5.configure(ticks_per_bar=4)
+	FakeMetaTrader5._state.now = None
+
+
+def stream(start, chunk_size):
+	ticks = TickStream(MetaTrader5Client(['EURUSD']), 'EURUSD', start, bar_seconds=(15, 60), chunk_size=chunk_size,
+			fast_period=2, slow_period=3)
+	ticks.poll()
+	return ticks
+
+
+def test_chunks_smaller_than_a_second_still_reach_every_tick(busy_market):
+	start = busy_market - 10 * 60
+	expected = stream(start, 100_000)
+	small = stream(start, 4)
+	assert small.last_msc == expected.last_msc
+	for seconds in (15, 60):
+		np.testing.assert_array_equal(small.aggregators[seconds].bars, expected.aggregators[seconds].bars)
+	assert len(expected.aggregators[60].bars) >= 9